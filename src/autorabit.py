@@ -7,6 +7,13 @@ and use the code below
     >>> autorabit.init(endpoint=[your endpoint], token=[your token])
     >>> autorabit.service_handler.service_function(**kwargs)
 
+or, to work with several AutoRABIT instances at once, create a client for each of them
+    >>> uat = autorabit.RabitClient(endpoint=[your endpoint], token=[your token])
+    >>> uat.service_handler.service_function(**kwargs)
+
+or from the shell
+    $ python -m autorabit service_function [arguments]
+
 Available service functions:
     - cijobs.history
     - cijobs.poll
@@ -21,7 +28,35 @@ Available service functions:
 Full documentation of the AutoRABIT API can be found in the Knowledge Base:
 https://knowledgebase.autorabit.com/docs/get-allcijoblist
 """
+import array
+import asyncio
+import bisect
+import codecs
+import collections
+import contextvars
+import copy
+import datetime
+import email.utils
+import heapq
+import hmac
+import importlib
+import io
+import itertools
+import json
+import math
+import os
+import random
+import re
+import statistics
+import sys
+import threading
+import time
+import urllib.parse
+# csv, gzip, sqlite3 and tracemalloc are imported by the functions using them,
+# so that importing the module does not pay for them
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
 import requests
+import urllib3
 
 __author__ = 'Jakub Platek'
 __version__ = '1.2.0'
@@ -34,44 +69,1085 @@ STATUS_COMPLETE = ['Completed', 'Success', 'Successful']
 STATUS_OK = ['Inprogress', 'Completed', 'Success', 'Successful']
 
 
+# transport defaults
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 10
+ASYNC_POOL_LIMIT = 100
+ASYNC_MAX_CONCURRENCY = 100
+BATCH_MAX_WORKERS = 8
+HISTORY_CHUNK_SIZE = 100
+
+# wording of the status of the update responses telling the revision is already the baseline
+UPDATE_ALREADY_SET = re.compile(r'\balready\b', re.IGNORECASE)
+# outcomes of the bulk baseline revision update
+UPDATE_OUTCOMES = ['updated', 'unchanged', 'skipped', 'failed']
+
+# read and write services, by service function name
+READ_SERVICES = ['poll', 'history', 'rollback_details', 'rollback_history']
+WRITE_SERVICES = ['trigger', 'update', 'quick_deploy', 'rollback']
+
+# upper bounds of the request latency histogram buckets, in seconds
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+
+# JSON libraries used to decode response bodies, in order of preference
+JSON_BACKENDS = ['orjson', 'ujson', 'json']
+# size of the chunks read from streamed response bodies, in bytes
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# response cache defaults: time to live of cached responses per service, in seconds
+CACHE_TTL = {
+    'poll': 1,
+    'history': 5,
+    'rollback_details': 1,
+    'rollback_history': 5
+}
+CACHE_MAXSIZE = 1024
+
+# retry policy defaults
+RETRY_MAX_ATTEMPTS = 4
+RETRY_BACKOFF = 0.5
+RETRY_MAX_BACKOFF = 30
+RETRY_STATUS_CODES = [429, 502, 503, 504]
+# status codes returned before the request is processed, safe to retry for write services
+RETRY_WRITE_STATUS_CODES = [429, 503]
+RETRY_BUDGET = 10
+RETRY_BUDGET_RATIO = 0.1
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 30
+
+# request hedging defaults
+HEDGE_QUANTILE = 0.95
+HEDGE_MIN_DELAY = 0.05
+HEDGE_MAX_DELAY = 2
+HEDGE_WINDOW = 200
+HEDGE_MIN_SAMPLES = 20
+HEDGE_BUDGET = 10
+HEDGE_BUDGET_RATIO = 0.05
+HEDGE_MAX_WORKERS = 32
+
+# request timeout defaults: connect timeout, and read timeout per service function, in seconds
+TIMEOUT_CONNECT = 10
+TIMEOUT_READ = {
+    'trigger': 60,
+    'update': 60,
+    'quick_deploy': 60,
+    'rollback': 120,
+    'poll': 30,
+    'history': 120,
+    'rollback_details': 60,
+    'rollback_history': 60
+}
+# shortest timeout of a request sent just before the deadline, in seconds
+DEADLINE_MIN_TIMEOUT = 0.001
+
+# caching gateway defaults, and the service functions of the cijobs v1 write paths
+GATEWAY_HOST = '127.0.0.1'
+GATEWAY_PORT = 8700
+GATEWAY_BACKLOG = 1024
+GATEWAY_PREFIX = '/api/cijobs/v1/'
+GATEWAY_WRITE_PATHS = {
+    'trigger': 'trigger',
+    'update': 'update',
+    'triggerquickdeploy': 'quick_deploy',
+    'rollback': 'rollback'
+}
+
+# build watcher defaults
+WATCH_MIN_INTERVAL = 2
+WATCH_MAX_INTERVAL = 60
+WATCH_MAX_ERRORS = 3
+WATCH_HISTORY_SIZE = 20
+WATCH_BACKOFF = 0.25
+
+# rollback pipeline stages, in order, and the final ones
+ROLLBACK_STATES = ['pending', 'details', 'rollback', 'watching', 'succeeded', 'failed', 'skipped']
+ROLLBACK_FINAL_STATES = ['succeeded', 'failed', 'skipped']
+# rollback_details fields holding the rollback package manifest
+ROLLBACK_MANIFEST_KEYS = ['constructiveChanges', 'destructiveChangesPre', 'destructiveChangesPost']
+# rollback arguments set by the rollback pipeline for every build
+ROLLBACK_PIPELINE_ARGUMENTS = ['projectName', 'buildNumber', 'cyclenum', 'validateDeployment'] + ROLLBACK_MANIFEST_KEYS
+
+# outbox states, the final ones, and the dispatcher defaults
+OUTBOX_STATES = ['pending', 'sending', 'sent', 'failed']
+OUTBOX_FINAL_STATES = ['sent', 'failed']
+OUTBOX_RATE = 1
+OUTBOX_BACKOFF = 1
+OUTBOX_MAX_BACKOFF = 60
+OUTBOX_LEASE = 60
+
+# ciJobHistoryList fields written by the CSV history export
+EXPORT_COLUMNS = ['projectName', 'buildNumber', 'overAllStatus', 'startTime', 'endTime', 'duration']
+
+# record/replay cassette format version, and the response headers recorded
+CASSETTE_VERSION = 1
+CASSETTE_HEADERS = ['Content-Type', 'Retry-After']
+
+# ciJobHistoryList fields holding the start and end time of a build
+BUILD_START_KEYS = ['startTime', 'buildStartTime', 'startDate', 'createdDate']
+BUILD_END_KEYS = ['endTime', 'buildEndTime', 'endDate', 'completedDate']
+TIMESTAMP_FORMATS = ['%Y-%m-%d %H:%M:%S', '%m/%d/%Y %H:%M:%S', '%d-%m-%Y %H:%M:%S', '%b %d, %Y %I:%M:%S %p']
+
+_default_client = None
+metrics_registry = None
+_optional_modules = {}
+# Deadline of the running code, inherited by asyncio tasks and propagated to worker threads
+_deadline = contextvars.ContextVar('autorabit_deadline', default=None)
+
+
+def _optional(name):
+    """
+    Import an optional dependency (aiohttp, numpy) on first use, to keep the module quick to import
+
+    Returns:
+        module: the imported module, None if it is not installed
+    """
+    if name not in _optional_modules:
+        try:
+            _optional_modules[name] = importlib.import_module(name)
+        except ImportError:
+            _optional_modules[name] = None
+    return _optional_modules[name]
+
+
 def init(endpoint='http://localhost', token=None, **kwargs):
     """
     Authentication initialization for AutoRABIT instance
 
     Has to be called before using any service handlers
+    Sets up the default RabitClient, whose service handlers are available as module attributes
+    (autorabit.cijobs); calling it again replaces (and closes) the previous default client
+
+    To work with several AutoRABIT instances at once, create a RabitClient for each of them instead
 
     Parameters:
         endpoint (str): full URL of the AutoRABIT instance (including https://)
         token (str): authentication token string
+        **kwargs: connection pool, cache, retry, timeout, rate limit and metrics settings, see RabitClient;
+            the metrics registry is available as autorabit.metrics_registry
 
     Raises:
         RabitError: if token is not provided
+        TypeError: unknown setting
     """
-    # set properties
+    global _default_client
     global _endpoint
     global _token
-    _endpoint = endpoint
-    if token is None:
-        raise RabitError('Please provide a valid AutoRABIT TOKEN')
-    _token = token
-    # init global service handlers
+    global metrics_registry
     global cijobs
-    cijobs = CIJobService()
+    client = RabitClient(endpoint=endpoint, token=token, **kwargs)
+    previous = _default_client
+    # set properties
+    _default_client = client
+    _endpoint = client.endpoint
+    _token = client.token
+    metrics_registry = client.metrics
+    # init global service handlers
+    cijobs = client.cijobs
+    if previous is not None:
+        previous.close()
 # END init
 
+class RabitClient:
+    """
+    Client of a single AutoRABIT instance
+
+    Owns the endpoint, token, connection pool, response cache, retry and hedging policies, timeouts, rate limits
+    and metrics of the instance, and the service handlers using them; clients share no state,
+    so any number of them (e.g. prod, UAT and sandboxes) can be used concurrently in one process
+
+    Example:
+        >>> with autorabit.RabitClient(endpoint=prod_url, token=prod_token, cache=True) as prod:
+        >>>     prod.cijobs.poll(projectName=job)
+    """
+    def __init__(self, endpoint='http://localhost', token=None, pool_connections=POOL_CONNECTIONS,
+                 pool_maxsize=POOL_MAXSIZE, keep_alive=True, cache=None, retry=None, rate_limit=None,
+                 metrics=None, hedge=None, timeout=True, transport=None, async_transport=None):
+        """
+        Parameters:
+            endpoint (str): full URL of the AutoRABIT instance (including https://)
+            token (str): authentication token string
+            pool_connections (int): number of per-host connection pools to keep (default 10)
+            pool_maxsize (int): maximum number of connections kept open per host (default 10)
+            keep_alive (bool): reuse connections between requests (default True)
+            cache (bool or ResponseCache): cache the responses of the read services (default None - no caching);
+                pass True for a cache with the default settings
+            retry (bool or RetryPolicy): retry failed requests (default None - no retries);
+                pass True for a retry policy with the default settings
+            rate_limit (RateLimiter): client-side rate and concurrency limits
+                for the read and write services (default None - no limits)
+            metrics (bool or Metrics): record the latency, size, status and errors of every request
+                (default None - nothing is recorded); pass True for a new registry
+            hedge (bool or HedgePolicy): send a duplicate of the read requests answered slower than usual
+                (default None - no hedging); pass True for a hedging policy with the default settings
+            timeout (bool or Timeouts): connect and read timeouts of the requests, per service function
+                (default True - the default timeouts, see autorabit.TIMEOUT_READ); pass False to wait forever
+            transport (HTTPTransport): transport to send the requests with, e.g. a RecordingTransport
+                or a ReplayTransport (default None - a new connection pool)
+            async_transport (AsyncHTTPTransport): transport to send the asyncio requests with
+                (default None - a new asyncio connection pool)
+
+        Raises:
+            RabitError: if token is not provided
+            TypeError: unknown setting
+        """
+        if token is None:
+            raise RabitError('Please provide a valid AutoRABIT TOKEN')
+        self.endpoint = endpoint
+        self.token = token
+        if transport is None:
+            transport = HTTPTransport(
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                keep_alive=keep_alive
+            )
+        if async_transport is None:
+            async_transport = AsyncHTTPTransport(pool_maxsize=pool_maxsize, keep_alive=keep_alive)
+        self.transport = transport
+        self.async_transport = async_transport
+        self.cache = _resolve(cache, ResponseCache)
+        self.retry = _resolve(retry, RetryPolicy)
+        self.limiter = rate_limit
+        self.metrics = _resolve(metrics, Metrics)
+        self.hedge = _resolve(hedge, HedgePolicy)
+        self.timeouts = _resolve(timeout, Timeouts)
+        # init service handlers
+        self.cijobs = CIJobService(client=self)
+    # END constructor
+
+    def async_cijobs(self, max_concurrency=ASYNC_MAX_CONCURRENCY):
+        """
+        Create an asyncio handler for the cijobs service,
+        sharing the cache, retry policy, rate limits and metrics of the client
+
+        The asyncio connection pool is bound to the running event loop;
+        close it with `await client.aclose()` before the loop ends
+
+        Parameters:
+            max_concurrency (int): maximum number of requests the handler keeps in flight (default 100)
+
+        Returns:
+            AsyncCIJobService: the handler
+        """
+        return AsyncCIJobService(client=self, max_concurrency=max_concurrency)
+    # END async_cijobs function
+
+    def close(self):
+        """
+        Close the connection pools of the client and the worker threads of its hedging policy
+        """
+        self.transport.close()
+        if self.hedge is not None:
+            self.hedge.close()
+        fallback = getattr(self.async_transport, '_fallback', None)
+        if fallback is not None:
+            fallback.close()
+    # END close function
+
+    async def aclose(self):
+        """
+        Close the connection pools of the client, including the asyncio one
+        """
+        self.close()
+        await self.async_transport.close()
+    # END aclose function
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+# END RabitClient class
+
+def _resolve(setting, factory):
+    # True stands for the default settings; an empty cache or registry is falsy, so test identity
+    if setting is True:
+        return factory()
+    if setting is False:
+        return None
+    return setting
+
+class HTTPTransport:
+    """
+    Connection-pooled HTTP transport shared by the service handlers
+
+    All threads share one set of keep-alive connection pools;
+    each thread gets its own lightweight session on top of it,
+    so session state (cookies, default headers) is never shared between threads
+    """
+    def __init__(self, pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE,
+                 keep_alive=True, pool_block=False):
+        """
+        Parameters:
+            pool_connections (int): number of per-host connection pools to keep
+            pool_maxsize (int): maximum number of connections kept open per host
+            keep_alive (bool): if False, every connection is closed after its response
+            pool_block (bool): if True, wait for a free connection instead of
+                opening a throwaway one when the pool of a host is exhausted
+        """
+        self._adapter = requests.adapters.HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block
+        )
+        self._keep_alive = keep_alive
+        self._local = threading.local()
+    # END constructor
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.mount('https://', self._adapter)
+            session.mount('http://', self._adapter)
+            if not self._keep_alive:
+                session.headers['Connection'] = 'close'
+            self._local.session = session
+        return session
+    # END _session function
+
+    def request(self, method, url, **kwargs):
+        """
+        Send a single HTTP request over the pooled connections
+
+        Parameters:
+            method (str): HTTP method
+            url (str): full URL of the request
+            **kwargs: passed to requests.Session.request
+
+        Raises:
+            requests.exceptions.RequestException: the request could not be completed
+
+        Returns:
+            requests.Response: the HTTP response
+        """
+        return self._session().request(method, url, **kwargs)
+    # END request function
+
+    def close(self):
+        """
+        Close all pooled connections
+        """
+        self._adapter.close()
+    # END close function
+# END HTTPTransport class
+
+class AsyncHTTPTransport:
+    """
+    Connection-pooled asyncio HTTP transport
+
+    Uses aiohttp when it is installed; otherwise every request is sent
+    from a worker thread over a pooled HTTPTransport, so the event loop is never blocked
+
+    Responses are returned as fully read requests.Response objects,
+    so they can be handled exactly like the ones of HTTPTransport
+
+    The aiohttp connections are bound to the event loop they were opened from, so a transport used
+    from several loops keeps a pool per loop; the pool of a loop is closed when asyncio.run() shuts it down,
+    and all of them by close()
+    """
+    def __init__(self, pool_limit=ASYNC_POOL_LIMIT, pool_maxsize=POOL_MAXSIZE, keep_alive=True):
+        """
+        Parameters:
+            pool_limit (int): maximum number of connections open in total
+            pool_maxsize (int): maximum number of connections open per host
+            keep_alive (bool): if False, every connection is closed after its response
+        """
+        self._pool_limit = pool_limit
+        self._pool_maxsize = pool_maxsize
+        self._keep_alive = keep_alive
+        # aiohttp sessions and their closers, by event loop
+        self._sessions = {}
+        self._fallback = None
+    # END constructor
+
+    async def _get_session(self):
+        # the session has to be created from within the running event loop,
+        # and is bound to it; a transport owned by a RabitClient may outlive several loops
+        aiohttp = _optional('aiohttp')
+        loop = asyncio.get_running_loop()
+        entry = self._sessions.get(loop)
+        if entry is not None and not entry[0].closed:
+            return entry[0]
+        # the sessions of loops closed without shutting down their async generators cannot be closed any more
+        for stale in [stale for stale in self._sessions if stale.is_closed()]:
+            del self._sessions[stale]
+        connector = aiohttp.TCPConnector(
+            limit=self._pool_limit,
+            limit_per_host=self._pool_maxsize,
+            force_close=not self._keep_alive
+        )
+        session = aiohttp.ClientSession(connector=connector)
+        # an async generator is finalized by loop.shutdown_asyncgens(), which asyncio.run() calls
+        # before closing the loop, so the session is closed while its loop can still run
+        closer = _session_closer(session)
+        self._sessions[loop] = (session, closer)
+        await closer.asend(None)
+        return session
+    # END _get_session function
+
+    async def request(self, method, url, headers=None, params=None, json=None, timeout=None, **kwargs):
+        """
+        Send a single HTTP request over the pooled connections
+
+        Parameters:
+            method (str): HTTP method
+            url (str): full URL of the request
+            headers (dict): request headers
+            params (dict): query string parameters
+            json (dict): JSON-serializable request body
+            timeout (float or tuple): total timeout, or (connect, read) timeouts as in requests, in seconds
+
+        Raises:
+            requests.exceptions.RequestException: the request could not be completed
+
+        Returns:
+            requests.Response: the HTTP response, with the body already read
+        """
+        # aiohttp is only imported on the first request, it is slow to import
+        if self._fallback is None and _optional('aiohttp') is None:
+            self._fallback = HTTPTransport(
+                pool_maxsize=self._pool_maxsize,
+                keep_alive=self._keep_alive,
+                pool_block=True
+            )
+        if self._fallback is not None:
+            return await asyncio.to_thread(
+                self._fallback.request, method, url,
+                headers=headers, params=params, json=json, timeout=timeout, **kwargs
+            )
+        if params is not None:
+            params = {key: str(value) for key, value in params.items()}
+        options = {}
+        if isinstance(timeout, tuple):
+            options['timeout'] = _optional('aiohttp').ClientTimeout(sock_connect=timeout[0], sock_read=timeout[1])
+        elif timeout is not None:
+            options['timeout'] = _optional('aiohttp').ClientTimeout(total=timeout)
+        try:
+            session = await self._get_session()
+            async with session.request(
+                method, url, headers=headers, params=params, json=json, **options
+            ) as resp:
+                content = await resp.read()
+        except (_optional('aiohttp').ClientError, asyncio.TimeoutError) as e:
+            raise requests.exceptions.ConnectionError(e) from e
+        return _build_response(str(resp.url), resp.status, resp.reason, resp.headers, content)
+    # END request function
+
+    async def close(self):
+        """
+        Close all pooled connections, including the ones opened from event loops running in other threads;
+        the connections of a loop that is not running are closed when it next runs, or shuts down
+        """
+        running = asyncio.get_running_loop()
+        sessions, self._sessions = self._sessions, {}
+        for loop, (session, closer) in sessions.items():
+            if loop is running:
+                await closer.aclose()
+            elif loop.is_running():
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(closer.aclose(), loop))
+        if self._fallback is not None:
+            self._fallback.close()
+    # END close function
+# END AsyncHTTPTransport class
+
+async def _session_closer(session):
+    """
+    Async generator closing an aiohttp session when it is finalized
+    """
+    try:
+        yield
+    finally:
+        await session.close()
+# END _session_closer function
+
+def _build_response(url, status, reason, headers, content):
+    """
+    Wrap a fully read HTTP response into a requests.Response object
+    """
+    response = requests.Response()
+    response.url = url
+    response.status_code = status
+    response.reason = reason
+    response.headers = requests.structures.CaseInsensitiveDict(headers)
+    response._content = content
+    # the content is fully read, iter_content() serves it from memory
+    response._content_consumed = True
+    return response
+# END _build_response function
+
+class RecordingTransport:
+    """
+    Transport recording the requests and responses of another transport to a cassette file
+
+    Every interaction is written as one JSON line: the request method, URL (without the host) and body,
+    the response status, headers and body, or the connection error raised,
+    and the timing - start time since the beginning of the recording and duration, in seconds;
+    authentication headers are never recorded
+    Cassettes with a .gz suffix are gzip-compressed
+
+    Example:
+        >>> recorder = autorabit.RecordingTransport('prod.jsonl.gz')
+        >>> with autorabit.RabitClient(endpoint=url, token=token, transport=recorder) as prod:
+        >>>     prod.cijobs.poll(projectName=job)
+    """
+    def __init__(self, path, transport=None):
+        """
+        Parameters:
+            path (str): cassette file to write, replaced if it exists
+            transport (HTTPTransport): transport to send the requests with (default None - a new connection pool)
+        """
+        self._transport = transport if transport is not None else HTTPTransport()
+        self._file = _open_cassette(path, 'wt')
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._write({'cassette': CASSETTE_VERSION, 'recorded': datetime.datetime.now(datetime.timezone.utc).isoformat()})
+    # END constructor
+
+    def request(self, method, url, **kwargs):
+        """
+        Send a single HTTP request over the wrapped transport and record it
+
+        Parameters:
+            method (str): HTTP method
+            url (str): full URL of the request
+            **kwargs: passed to the wrapped transport
+
+        Raises:
+            requests.exceptions.RequestException: the request could not be completed
+
+        Returns:
+            requests.Response: the HTTP response, with the body already read
+        """
+        started = time.monotonic()
+        try:
+            response = self._transport.request(method, url, **kwargs)
+            # streamed bodies are read as well, so the duration covers the whole transfer
+            response.content
+        except requests.exceptions.RequestException as e:
+            self._record(method, url, kwargs, started, error=e)
+            raise
+        self._record(method, url, kwargs, started, response=response)
+        return response
+    # END request function
+
+    def close(self):
+        """
+        Close the cassette file and the wrapped transport
+        """
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+        self._transport.close()
+    # END close function
+
+    def _record(self, method, url, kwargs, started, response=None, error=None):
+        interaction = {
+            'time': round(started - self._started, 6),
+            'duration': round(time.monotonic() - started, 6),
+            'method': method,
+            'url': _cassette_url(url, kwargs.get('params')),
+            'body': kwargs.get('json')
+        }
+        if error is not None:
+            interaction['error'] = f'{type(error).__name__}: {error}'
+        else:
+            interaction.update({
+                'status': response.status_code,
+                'reason': response.reason,
+                'headers': {name: response.headers[name] for name in CASSETTE_HEADERS if name in response.headers},
+                'content': response.content.decode('utf-8', 'surrogateescape')
+            })
+        self._write(interaction)
+    # END _record function
+
+    def _write(self, line):
+        line = json.dumps(line, separators=(',', ':')) + '\n'
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(line)
+    # END _write function
+# END RecordingTransport class
+
+class AsyncRecordingTransport(RecordingTransport):
+    """
+    Asyncio version of the RecordingTransport, wrapping an AsyncHTTPTransport
+    """
+    def __init__(self, path, transport=None):
+        """
+        Parameters:
+            path (str): cassette file to write, replaced if it exists
+            transport (AsyncHTTPTransport): transport to send the requests with
+                (default None - a new asyncio connection pool)
+        """
+        super().__init__(path, transport if transport is not None else AsyncHTTPTransport())
+    # END constructor
+
+    async def request(self, method, url, **kwargs):
+        started = time.monotonic()
+        try:
+            response = await self._transport.request(method, url, **kwargs)
+        except requests.exceptions.RequestException as e:
+            self._record(method, url, kwargs, started, error=e)
+            raise
+        self._record(method, url, kwargs, started, response=response)
+        return response
+    # END request function
+
+    async def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+        await self._transport.close()
+    # END close function
+# END AsyncRecordingTransport class
+
+class ReplayTransport:
+    """
+    Transport serving the responses recorded in a cassette file, without any network access
+
+    Requests are matched with the recorded ones by method, URL (without the host) and body;
+    the responses recorded for the same request are served in the recorded order,
+    and once all of them are served, the last one is repeated (e.g. the final status of a polled build)
+    Every response takes its recorded duration divided by the speed,
+    so the timing of the recorded instance is reproduced at 1x, Nx or maximum speed
+
+    Example:
+        >>> replay = autorabit.ReplayTransport('prod.jsonl.gz', speed=10)
+        >>> with autorabit.RabitClient(endpoint=url, token='replay', transport=replay) as offline:
+        >>>     offline.cijobs.poll(projectName=job)
+    """
+    def __init__(self, path, speed=1.0):
+        """
+        Parameters:
+            path (str): cassette file to read
+            speed (float): replay speed - 1 for the recorded timing, N for N times faster,
+                0 or None for maximum speed, without waiting (default 1)
+
+        Raises:
+            RabitError: the file is not a cassette
+        """
+        self.speed = speed
+        self.interactions = []
+        self._recorded = collections.defaultdict(list)
+        self._served = collections.Counter()
+        self._lock = threading.Lock()
+        with _open_cassette(path, 'rt') as source:
+            header = json.loads(source.readline() or '{}')
+            if header.get('cassette') != CASSETTE_VERSION:
+                raise RabitError(f'{path} is not a cassette file')
+            for line in source:
+                interaction = json.loads(line)
+                self.interactions.append(interaction)
+                key = _cassette_key(interaction['method'], interaction['url'], interaction['body'])
+                self._recorded[key].append(interaction)
+    # END constructor
+
+    def request(self, method, url, **kwargs):
+        """
+        Serve the recorded response to a single HTTP request
+
+        Parameters:
+            method (str): HTTP method
+            url (str): full URL of the request
+            **kwargs: params and json of the request are matched, the rest is ignored
+
+        Raises:
+            requests.exceptions.ConnectionError: the request was not recorded, or failed when recorded
+
+        Returns:
+            requests.Response: the recorded HTTP response
+        """
+        interaction = self._next(method, url, kwargs)
+        delay = self._delay(interaction)
+        if delay > 0:
+            time.sleep(delay)
+        return _replayed_response(url, interaction)
+    # END request function
+
+    def close(self):
+        pass
+
+    def _next(self, method, url, kwargs):
+        key = _cassette_key(method, _cassette_url(url, kwargs.get('params')), kwargs.get('json'))
+        with self._lock:
+            recorded = self._recorded.get(key)
+            if not recorded:
+                raise requests.exceptions.ConnectionError(f'No recorded response to {key[0]} {key[1]}')
+            index = min(self._served[key], len(recorded) - 1)
+            self._served[key] += 1
+        return recorded[index]
+    # END _next function
+
+    def _delay(self, interaction):
+        if not self.speed:
+            return 0
+        return interaction['duration'] / self.speed
+# END ReplayTransport class
+
+class AsyncReplayTransport(ReplayTransport):
+    """
+    Asyncio version of the ReplayTransport, to be used with AsyncCIJobService
+    """
+    async def request(self, method, url, **kwargs):
+        interaction = self._next(method, url, kwargs)
+        delay = self._delay(interaction)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return _replayed_response(url, interaction)
+    # END request function
+
+    async def close(self):
+        pass
+# END AsyncReplayTransport class
+
+def _open_cassette(path, mode):
+    import gzip
+    if str(path).endswith('.gz'):
+        return gzip.open(path, mode, encoding='utf-8')
+    return open(path, mode[0], encoding='utf-8')
+
+def _cassette_url(url, params=None):
+    """
+    Path and sorted query string of a request URL, without the scheme and host
+    """
+    parts = urllib.parse.urlsplit(url)
+    query = urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+    if params:
+        query.extend((key, str(value)) for key, value in params.items())
+    if not query:
+        return parts.path
+    return f'{parts.path}?{urllib.parse.urlencode(sorted(query))}'
+
+def _cassette_key(method, url, body):
+    return method.upper(), url, json.dumps(body, sort_keys=True)
+
+def _replayed_response(url, interaction):
+    if 'error' in interaction:
+        raise requests.exceptions.ConnectionError(interaction['error'])
+    return _build_response(
+        url, interaction['status'], interaction['reason'], interaction['headers'],
+        interaction['content'].encode('utf-8', 'surrogateescape')
+    )
+# END _replayed_response function
+
+
+# response parsers shared by the sync and async service handlers
+def _parse_trigger(res_body):
+    status = res_body['status']
+    if not status in STATUS_OK:
+        raise RabitStatusError(res_body)
+    return res_body
+
+def _parse_poll(res_body):
+    return res_body
+
+def _parse_history(res_body):
+    if 'ciJobHistoryList' in res_body:
+        return res_body['ciJobHistoryList']
+    raise RabitStatusError(res_body)
+
+def _parse_update(res_body):
+    status = res_body['status']
+    if 'Success' != status:
+        # the response only tells the revision was already set in the wording of its status,
+        # the other fields (e.g. an error message about the CI Job) do not count
+        if isinstance(status, str) and UPDATE_ALREADY_SET.search(status):
+            raise RabitAlreadySetError(res_body)
+        raise RabitStatusError(res_body)
+    return res_body
+
+def _parse_quick_deploy(res_body):
+    status = res_body['status']
+    if not status.startswith('Quick deploy initiated successfully'):
+        raise RabitStatusError(status)
+    return res_body
+
+def _parse_rollback(res_body):
+    return res_body
+
+def _parse_rollback_details(res_body):
+    return res_body
+
+def _parse_rollback_history(res_body):
+    if 'revertDeployments' in res_body:
+        return res_body['revertDeployments']
+    raise RabitStatusError(res_body)
+# END response parsers
+
 class CIJobService:
-    def __init__(self):
+    def __init__(self, client=None, transport=None, cache=None, retry=None, limiter=None, metrics=None,
+                 hedge=None, timeout=None):
         """
         Handler for the cijobs service implementation v1
+
+        Parameters:
+            client (RabitClient): optional
+                client of the AutoRABIT instance to be called;
+                if not provided, the default client set up by init() will be used
+            transport (HTTPTransport): optional
+                transport to send the requests with, instead of the connection pool of the client
+            cache (ResponseCache): optional
+                cache for the responses of the read services (poll, history, rollback_details, rollback_history),
+                instead of the cache of the client
+            retry (RetryPolicy): optional
+                policy for retrying failed requests, instead of the policy of the client
+            limiter (RateLimiter): optional
+                client-side rate and concurrency limits, instead of the limits of the client
+            metrics (Metrics): optional
+                registry recording every request sent, instead of the registry of the client
+            hedge (HedgePolicy): optional
+                policy for hedging slow read requests, instead of the policy of the client
+            timeout (Timeouts): optional
+                connect and read timeouts of the requests, instead of the timeouts of the client
+
+        Raises:
+            RabitError: client is not provided and init() was not called
         """
-        self._url = f'{_endpoint}/api/cijobs/v1'
+        if client is None:
+            client = _default_client
+        if client is None:
+            raise RabitError('Please call autorabit.init() or provide a RabitClient')
+        self._client = client
+        self._endpoint = client.endpoint
+        self._url = f'{client.endpoint}/api/cijobs/v1'
         self._headers = {
-            'token': _token,
+            'token': client.token,
             'Content-Type': 'application/json',
             'Accept': 'application/json'
         }
+        self._transport = transport if transport is not None else self._default_transport(client)
+        self._cache = cache if cache is not None else client.cache
+        self._retry = retry if retry is not None else client.retry
+        self._limiter = limiter if limiter is not None else client.limiter
+        self._metrics = metrics if metrics is not None else client.metrics
+        self._hedge = hedge if hedge is not None else client.hedge
+        self._timeouts = timeout if timeout is not None else client.timeouts
+        # last known baseline revision of every CI Job, set by update()
+        self._baselines = {}
     # END constructor
 
+    def _default_transport(self, client):
+        return client.transport
+
+    def _request(self, service, method, endpoint, error, trace=None, **kwargs):
+        """
+        Send a request over the transport and check the HTTP status,
+        retrying failed attempts as allowed by the retry policy and the deadline
+
+        Raises:
+            RabitStatusError:
+                HTTP status other than 20X was returned
+            RabitConnectError:
+                the request could not be completed
+            RabitCircuitOpenError:
+                the circuit breaker of the retry policy is open
+            RabitDeadlineError:
+                the deadline expired before the request was completed
+        """
+        deadline = _deadline.get()
+        attempt = 0
+        while True:
+            attempt += 1
+            if trace is not None:
+                trace.attempts = attempt
+            if deadline is not None:
+                deadline.check(error)
+            probe = self._retry is not None and self._retry.check()
+            try:
+                response = self._send(service, method, endpoint, deadline=deadline, **kwargs)
+            except requests.exceptions.RequestException as e:
+                if deadline is not None and deadline.expired:
+                    raise RabitDeadlineError(error, exc=e) from e
+                delay = None if self._retry is None else self._retry.delay(service, attempt, error=e)
+                probe = False
+                if delay is None:
+                    raise RabitConnectError(error, exc=e) from e
+            else:
+                if trace is not None:
+                    trace.response = response
+                delay = None if self._retry is None else self._retry.delay(service, attempt, response=response)
+                probe = False
+                if delay is None:
+                    break
+            finally:
+                if probe:
+                    # the trial request ended without an outcome (deadline, interruption),
+                    # the circuit breaker must not wait for it
+                    self._retry.release()
+            if deadline is not None and delay >= deadline.remaining():
+                raise RabitDeadlineError(f'{error} [deadline expires before the next attempt]')
+            time.sleep(delay)
+        try:
+            response.raise_for_status()
+        except:
+            raise RabitStatusError(response)
+        return response
+    # END _request function
+
+    def _timeout(self, service, deadline):
+        """
+        (connect, read) timeout of the next attempt of a request, bounded by the time left until the deadline
+        """
+        timeout = None if self._timeouts is None else self._timeouts.get(service)
+        if deadline is None:
+            return timeout
+        # urllib3 rejects a zero timeout
+        remaining = max(deadline.remaining(), DEADLINE_MIN_TIMEOUT)
+        if timeout is None:
+            return remaining
+        return tuple(remaining if value is None else min(value, remaining) for value in timeout)
+    # END _timeout function
+
+    def _send(self, service, method, endpoint, **kwargs):
+        """
+        Send a single attempt of a request over the transport, hedged if the hedging policy applies to it
+        """
+        if self._hedge is not None and self._hedge.hedged(service) and not kwargs.get('stream'):
+            return self._send_hedged(service, method, endpoint, **kwargs)
+        return self._send_once(service, method, endpoint, **kwargs)
+    # END _send function
+
+    def _send_once(self, service, method, endpoint, sent=None, deadline=None, **kwargs):
+        """
+        Send a single request over the transport, within the rate limits and the deadline;
+        the `sent` event, if provided, is set once the request leaves the rate limiter
+
+        Raises:
+            RabitDeadlineError: the deadline expired while waiting for the rate limits
+        """
+        limit = None if self._limiter is None else self._limiter.limit(service)
+        if limit is not None:
+            limit.acquire(deadline)
+        if sent is not None:
+            sent.set()
+        try:
+            # the timeout is bounded by the time left once the rate limits let the request through
+            timeout = self._timeout(service, deadline)
+            return self._transport.request(method, endpoint, headers=self._headers, timeout=timeout, **kwargs)
+        finally:
+            if limit is not None:
+                limit.release()
+    # END _send_once function
+
+    def _send_hedged(self, service, method, endpoint, **kwargs):
+        """
+        Send a request from a worker thread of the hedging policy, and a duplicate of it if it is slow;
+        the first response is returned and the other request is abandoned
+        The request is sent unhedged, from the calling thread, when no worker thread is idle,
+        and the hedging delay runs from the time the request is sent, not from the time it is queued
+        """
+        hedge = self._hedge
+        delay = hedge.delay(service)
+        sent = threading.Event()
+        primary = hedge.submit(self._send_timed, service, method, endpoint, kwargs, sent)
+        if primary is None:
+            return self._send_timed(service, method, endpoint, kwargs)
+        sent.wait()
+        done, _ = wait([primary], timeout=delay)
+        if done or not hedge.spend():
+            return primary.result()
+        secondary = hedge.submit(self._send_timed, service, method, endpoint, kwargs)
+        if secondary is None:
+            hedge.refund()
+            return primary.result()
+        pending = {primary, secondary}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except requests.exceptions.RequestException as e:
+                    error = error or e
+                    continue
+                for other in pending:
+                    if not other.cancel():
+                        other.add_done_callback(_close_abandoned)
+                if future is secondary:
+                    hedge.won()
+                return response
+        raise error
+    # END _send_hedged function
+
+    def _send_timed(self, service, method, endpoint, kwargs, sent=None):
+        started = time.monotonic()
+        try:
+            response = self._send_once(service, method, endpoint, sent=sent, **kwargs)
+        finally:
+            # never leave the caller waiting for a request that failed before it was sent
+            if sent is not None:
+                sent.set()
+        self._hedge.observe(service, time.monotonic() - started)
+        return response
+    # END _send_timed function
+
+    def _stream(self, service, endpoint, error, key, measure_memory, **kwargs):
+        """
+        Send a GET request and return a JSONStream over the array under `key` of its body
+        """
+        trace = None if self._metrics is None else _Trace(service, 'GET', endpoint, kwargs)
+        try:
+            response = self._request(service, 'GET', endpoint, error, trace=trace, stream=True, **kwargs)
+        except Exception as e:
+            if trace is not None:
+                trace.error = e
+                self._metrics.record(trace.event())
+            raise
+        return JSONStream(
+            response.iter_content(STREAM_CHUNK_SIZE), key,
+            measure_memory=measure_memory,
+            on_close=self._stream_closed(response, trace)
+        )
+    # END _stream function
+
+    def _stream_closed(self, response, trace):
+        def on_close(stream, error):
+            response.close()
+            if trace is not None:
+                trace.response_bytes = stream.bytes_read
+                trace.error = error
+                self._metrics.record(trace.event())
+        return on_close
+    # END _stream_closed function
+
+    def _call(self, service, method, endpoint, error, parse, project=None, pinned=False, **kwargs):
+        """
+        Send a request and parse the JSON body of the response with a service-specific parser
+
+        Read services are answered from the response cache, if one is configured;
+        successful write services invalidate the cached responses of their CI Job
+        `pinned` marks requests for specific builds, whose finished results never change
+        """
+        def call():
+            if self._metrics is None:
+                response = self._request(service, method, endpoint, error, **kwargs)
+                # if no exceptions were thrown, parse response JSON
+                return parse(_json_loads(response.content))
+            trace = _Trace(service, method, endpoint, kwargs)
+            try:
+                response = self._request(service, method, endpoint, error, trace=trace, **kwargs)
+                return parse(_json_loads(response.content))
+            except Exception as e:
+                trace.error = e
+                raise
+            finally:
+                self._metrics.record(trace.event())
+        if self._cache is None:
+            return call()
+        if service in WRITE_SERVICES:
+            result = call()
+            self._cache.invalidate(project)
+            return result
+        key = _cache_key(service, project, endpoint, kwargs)
+        return self._cache.get_or_call(service, key, call, pinned)
+    # END _call function
+
     def trigger(self, projectName=None, title='automated-build', **kwargs):
         """
         Service to trigger a build of a pre-configured CI Job
@@ -103,25 +1179,8 @@ class CIJobService:
             'title': title
         }
         # call service
-        try:
-            response = requests.post(
-                endpoint,
-                headers=self._headers,
-                json=data
-            )
-        except requests.exceptions.RequestException as e:
-            raise RabitConnectError('Cannot trigger job', exc=e) from e
-        # parse response
-        try:
-            response.raise_for_status()
-        except:
-            raise RabitStatusError(response)
-        res_body = response.json()
-        status = res_body['status']
-        if not status in STATUS_OK:
-            raise RabitStatusError(res_body)
-        # if no exceptions were thrown, return response JSON
-        return res_body
+        return self._call('trigger', 'POST', endpoint, 'Cannot trigger job', _parse_trigger,
+                          project=projectName, json=data)
     # END trigger function
 
     def poll(self, projectName=None, buildNumber=None, **kwargs):
@@ -149,19 +1208,8 @@ class CIJobService:
         if buildNumber is not None:
             endpoint += f'/{buildNumber}'
         # call service
-        try:
-            response = requests.get(
-                endpoint,
-                headers=self._headers
-            )
-        except requests.exceptions.RequestException as e:
-            raise RabitConnectError('Cannot poll job', exc=e) from e
-        try:
-            response.raise_for_status()
-        except:
-            raise RabitStatusError(response)
-        # if no exceptions were thrown, return response JSON
-        return response.json()
+        return self._call('poll', 'GET', endpoint, 'Cannot poll job', _parse_poll,
+                          project=projectName, pinned=buildNumber is not None)
     # END poll function
 
     def history(self, projectName=None, build_from=-1, build_to=-1, **kwargs):
@@ -201,32 +1249,58 @@ class CIJobService:
             'to': build_to
         }
         # call service
-        try:
-            response = requests.get(
-                endpoint,
-                headers=self._headers,
-                params=parameters
-            )
-        except requests.exceptions.RequestException as e:
-            raise RabitConnectError('Cannot obtain history', exc=e) from e
-        try:
-            response.raise_for_status()
-        except:
-            raise RabitStatusError(response)
-        # if no exceptions were thrown, return response JSON
-        result = response.json()
-        if 'ciJobHistoryList' in result:
-            result = result['ciJobHistoryList']
-        else:
-            raise RabitStatusError(result)
-        return result
+        return self._call('history', 'GET', endpoint, 'Cannot obtain history', _parse_history,
+                          project=projectName, pinned=build_to >= 0, params=parameters)
     # END history function
 
+    def history_stream(self, projectName=None, build_from=-1, build_to=-1, measure_memory=False, **kwargs):
+        """
+        Streaming version of the history service:
+        the response body is decoded incrementally and the builds are yielded one at a time,
+        as they are received, so a long history is never held in memory at once
+
+        Parameters:
+            projectName (str):
+                name of the CI Job to be queried
+            build_from (int):
+                first build number to include in the query
+            build_to (int):
+                last build number to include in the query
+            buildNumber (int):
+                if provided, will override build_to and build_from, and request data for a single build
+            measure_memory (bool): default False
+                if true, the peak memory allocated while decoding is reported in JSONStream.peak_memory
+
+        Raises:
+            RabitError:
+                required parameter is missing
+            RabitStatusError:
+                an unexpected response is received from AutoRABIT (also raised while iterating)
+            RabitConnectError
+                HTTPError was raised due to HTTP request failing (status other then 20X)
+
+        Returns:
+            JSONStream: iterator over the ciJobHistoryList elements of the HTTP response body
+        """
+        if projectName is None:
+            raise RabitError('Please provide a valid AutoRABIT Project')
+        if 'buildNumber' in kwargs:
+            build_from = kwargs['buildNumber']
+            build_to = kwargs['buildNumber']
+        endpoint = f'{self._url}/history/{projectName}'
+        parameters = {
+            'from': build_from,
+            'to': build_to
+        }
+        return self._stream('history', endpoint, 'Cannot obtain history', 'ciJobHistoryList',
+                            measure_memory, params=parameters)
+    # END history_stream function
+
     def update(self, projectName=None, revision=None):
         """
         Service to get the update the configuration of a given CI Job
         Currently only supports the service to update the baseline revision
-        If the requested revision is aready set as baseline on the given CI Job, a RabitError exception is raised
+        If the requested revision is aready set as baseline on the given CI Job, a RabitAlreadySetError exception is raised
 
         Parameters:
             projectName (str): 
@@ -238,6 +1312,8 @@ class CIJobService:
         Raises:
             RabitError: 
                 required parameter is missing
+            RabitAlreadySetError:
+                the revision is already the baseline revision of the CI Job
             RabitStatusError: 
                 a failing status is returned by AutoRABIT
             RabitConnectError:
@@ -256,26 +1332,20 @@ class CIJobService:
             'projectName': projectName,
             'baseLineRevision': revision[0:10]
         }
+
+        def parse(res_body):
+            # remember the baseline, both when it was set and when it already was
+            try:
+                result = _parse_update(res_body)
+            except RabitAlreadySetError:
+                self._baselines[projectName] = data['baseLineRevision']
+                raise
+            self._baselines[projectName] = data['baseLineRevision']
+            return result
+
         # call service
-        try:
-            response = requests.post(
-                endpoint,
-                headers=self._headers,
-                json=data
-            )
-        except requests.exceptions.RequestException as e:
-            raise RabitConnectError('Cannot perform update', exc=e) from e
-        try:
-            response.raise_for_status()
-        except:
-            raise RabitStatusError(response)
-        # if no exceptions were thrown, return response JSON
-        res_body = response.json()
-        status = res_body['status']
-        if 'Success' != status:
-            # TODO: parse if the response indicates the revision was already set
-            raise RabitStatusError(res_body)
-        return response.json()
+        return self._call('update', 'POST', endpoint, 'Cannot perform update', parse,
+                          project=projectName, json=data)
     # END update function
 
     def quick_deploy(self, projectName=None, buildNumber=None):
@@ -307,24 +1377,8 @@ class CIJobService:
         if buildNumber is not None:
             endpoint += f'/{buildNumber}'
         # call service
-        try:
-            response = requests.post(
-                endpoint,
-                headers=self._headers
-            )
-        except requests.exceptions.RequestException as e:
-            raise RabitConnectError('Cannot trigger job', exc=e) from e
-        # parse response
-        try:
-            response.raise_for_status()
-        except:
-            raise RabitStatusError(response)
-        res_body = response.json()
-        status = res_body['status']
-        if not status.startswith('Quick deploy initiated successfully'):
-            raise RabitStatusError(status)
-        # if no exceptions were thrown, return response JSON
-        return res_body
+        return self._call('quick_deploy', 'POST', endpoint, 'Cannot trigger job', _parse_quick_deploy,
+                          project=projectName)
     # END quick_deploy function
 
     def rollback(self, projectName=None, buildNumber=None, **kwargs):
@@ -370,20 +1424,8 @@ class CIJobService:
         # dump the rest of the kwargs into data and hope for the best
         data.update(kwargs)
         # call service
-        try:
-            response = requests.post(
-                endpoint,
-                headers=self._headers,
-                json=data
-            )
-        except requests.exceptions.RequestException as e:
-            raise RabitConnectError('Cannot trigger rollback', exc=e) from e
-        try:
-            response.raise_for_status()
-        except:
-            raise RabitStatusError(response)
-        # if no exceptions were thrown, return response JSON
-        return response.json()
+        return self._call('rollback', 'POST', endpoint, 'Cannot trigger rollback', _parse_rollback,
+                          project=projectName, json=data)
     # END rollback function
 
     def rollback_details(self, projectName=None, buildNumber=None):
@@ -416,19 +1458,8 @@ class CIJobService:
         if buildNumber:
             endpoint = f'{endpoint}/{buildNumber}'
         # call service
-        try:
-            response = requests.get(
-                endpoint,
-                headers=self._headers
-            )
-        except requests.exceptions.RequestException as e:
-            raise RabitConnectError('Cannot obtain rollback details', exc=e) from e
-        try:
-            response.raise_for_status()
-        except:
-            raise RabitStatusError(response)
-        # if no exceptions were thrown, return response JSON
-        return response.json()
+        return self._call('rollback_details', 'GET', endpoint, 'Cannot obtain rollback details',
+                          _parse_rollback_details, project=projectName)
     # END rollback_details function
 
     def rollback_history(self, projectName=None, buildNumber=None):
@@ -460,52 +1491,4666 @@ class CIJobService:
         if buildNumber:
             endpoint = f'{endpoint}/{buildNumber}'
         # call service
+        return self._call('rollback_history', 'GET', endpoint, 'Cannot obtain rollback history',
+                          _parse_rollback_history, project=projectName)
+    # END rollback_history function
+
+    def rollback_history_stream(self, projectName=None, buildNumber=None, measure_memory=False):
+        """
+        Streaming version of the rollback_history service:
+        the response body is decoded incrementally and the revert iterations are yielded one at a time
+
+        Parameters:
+            projectName (str):
+                name of the CI Job to be queried
+            buildNumber (int): optional
+                if not provided, latest available build will be used
+            measure_memory (bool): default False
+                if true, the peak memory allocated while decoding is reported in JSONStream.peak_memory
+
+        Raises:
+            RabitError:
+                required parameter is missing
+            RabitStatusError:
+                an unexpected response is received from AutoRABIT (also raised while iterating)
+            RabitConnectError
+                HTTPError was raised due to HTTP request failing (status other then 20X)
+
+        Returns:
+            JSONStream: iterator over the revertDeployments elements of the HTTP response body
+        """
+        if projectName is None:
+            raise RabitError('Please provide a valid AutoRABIT Project')
+        endpoint = f'{self._url}/rollback/history/{projectName}'
+        if buildNumber:
+            endpoint = f'{endpoint}/{buildNumber}'
+        return self._stream('rollback_history', endpoint, 'Cannot obtain rollback history',
+                            'revertDeployments', measure_memory)
+    # END rollback_history_stream function
+
+    def trigger_many(self, jobs, max_workers=BATCH_MAX_WORKERS, **kwargs):
+        """
+        Trigger builds of many CI Jobs concurrently
+
+        Parameters:
+            jobs (iterable):
+                CI Jobs to trigger; each item is either a project name
+                or a dict of trigger keyword arguments
+            max_workers (int):
+                maximum number of requests in flight (default 8)
+            **kwargs:
+                keyword arguments passed to every trigger call, e.g. title
+
+        Returns:
+            iterator: BatchResult for every job, in order of completion;
+                      RabitErrors are collected in BatchResult.error instead of being raised;
+                      all builds are triggered, even if the iterator is not consumed to the end
+        """
+        return self._run_many(self.trigger, _batch_requests(jobs, kwargs), max_workers)
+    # END trigger_many function
+
+    def poll_many(self, builds, max_workers=BATCH_MAX_WORKERS, **kwargs):
+        """
+        Poll the status of many CI Job builds concurrently
+
+        Parameters:
+            builds (iterable):
+                builds to poll; each item is either a project name (latest build),
+                a (projectName, buildNumber) pair or a dict of poll keyword arguments
+            max_workers (int):
+                maximum number of requests in flight (default 8)
+
+        Returns:
+            iterator: BatchResult for every build, in order of completion;
+                      RabitErrors are collected in BatchResult.error instead of being raised
+        """
+        return self._run_many(self.poll, _batch_requests(builds, kwargs), max_workers)
+    # END poll_many function
+
+    def history_many(self, jobs, max_workers=BATCH_MAX_WORKERS, **kwargs):
+        """
+        Get the build history of many CI Jobs concurrently
+
+        Parameters:
+            jobs (iterable):
+                CI Jobs to query; each item is either a project name
+                or a dict of history keyword arguments
+            max_workers (int):
+                maximum number of requests in flight (default 8)
+            **kwargs:
+                keyword arguments passed to every history call, e.g. build_from, build_to
+
+        Returns:
+            iterator: BatchResult for every job, in order of completion;
+                      RabitErrors are collected in BatchResult.error instead of being raised
+        """
+        return self._run_many(self.history, _batch_requests(jobs, kwargs), max_workers)
+    # END history_many function
+
+    def update_many(self, jobs, revision=None, max_workers=BATCH_MAX_WORKERS, force=False):
+        """
+        Update the baseline revision of many CI Jobs concurrently
+
+        Jobs whose baseline is already known to be the revision (set or found set by an earlier update
+        of this handler) are skipped without a request; a response telling the revision
+        is already the baseline is not an error
+
+        Parameters:
+            jobs (iterable):
+                CI Jobs to update; each item is either a project name,
+                a (projectName, revision) pair or a dict of update keyword arguments
+            revision (str):
+                baseline revision for the jobs not giving their own
+            max_workers (int):
+                maximum number of requests in flight (default 8)
+            force (bool): default False
+                if true, the known baselines are ignored and every job is updated
+
+        Returns:
+            list: UpdateResult for every job, in the order of jobs
+        """
+        results, batch, positions = self._plan_updates(jobs, revision, force)
+        for result in self._run_many(self.update, batch, max_workers):
+            results[positions[id(result.request)]] = _update_result(result)
+        return results
+    # END update_many function
+
+    def _plan_updates(self, jobs, revision, force):
+        """
+        Results of the update_many jobs, with the skipped ones filled in,
+        the update requests of the other jobs, and their positions in the results, by request identity
+        """
+        results = []
+        batch = []
+        positions = {}
+        for index, request in enumerate(_batch_requests(jobs, {'revision': revision}, ('projectName', 'revision'))):
+            known = self._baselines.get(request.get('projectName'))
+            if not force and known is not None and known == (request.get('revision') or '')[0:10]:
+                results.append(UpdateResult(request['projectName'], request['revision'], 'skipped', None, None))
+                continue
+            results.append(None)
+            batch.append(request)
+            positions[id(request)] = index
+        return results, batch, positions
+    # END _plan_updates function
+
+    def iter_history(self, projectName=None, build_from=-1, build_to=-1,
+                     chunk_size=HISTORY_CHUNK_SIZE, newest_first=False, prefetch=False):
+        """
+        Iterate over the history of a range of builds of a given CI Job,
+        requesting it in chunks of bounded size
+
+        Parameters:
+            projectName (str):
+                name of the CI Job to be queried
+            build_from (int):
+                first build number to include; if not provided, the first build is used
+            build_to (int):
+                last build number to include; if not provided, the latest build is used
+            chunk_size (int):
+                maximum number of builds requested at once (default 100)
+            newest_first (bool): default False
+                if true, builds are yielded from the newest to the oldest
+            prefetch (bool): default False
+                if true, the next chunk is requested while the current one is being consumed
+
+        Raises:
+            RabitError:
+                required parameter is missing or the latest build number cannot be determined
+            RabitStatusError:
+                an unexpected response is received from AutoRABIT
+            RabitConnectError:
+                HTTPError was raised due to HTTP request failing (status other then 20X)
+
+        Yields:
+            dict: ciJobHistoryList elements, one build at a time
+        """
+        if projectName is None:
+            raise RabitError('Please provide a valid AutoRABIT Project')
+        if build_to < 0:
+            build_to = _latest_build_number(self.poll(projectName=projectName))
+        chunks = _history_chunks(max(build_from, 1), build_to, chunk_size, newest_first)
+
+        def fetch(chunk):
+            builds = self.history(projectName=projectName, build_from=chunk[0], build_to=chunk[1])
+            return _sort_builds(builds, newest_first)
+
+        if not prefetch:
+            for chunk in chunks:
+                yield from fetch(chunk)
+            return
+        executor = ThreadPoolExecutor(max_workers=1)
         try:
-            response = requests.get(
-                endpoint,
-                headers=self._headers
-            )
-        except requests.exceptions.RequestException as e:
-            raise RabitConnectError('Cannot obtain rollback history', exc=e) from e
+            pending = None
+            for chunk in chunks:
+                following = _propagated(executor, fetch, chunk)
+                if pending is not None:
+                    yield from pending.result()
+                pending = following
+            if pending is not None:
+                yield from pending.result()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+    # END iter_history function
+
+    def _run_many(self, function, batch, max_workers):
+        """
+        Submit every call of a batch at once, and iterate over their results in order of completion
+
+        Abandoning the iterator cancels the read calls not started yet,
+        while the write calls (trigger, update, ...) are all sent anyway
+        """
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        futures = [
+            _propagated(executor, _batch_call, function, request)
+            for request in batch
+        ]
+        # no more calls are submitted, the worker threads exit once the queued calls are done
+        executor.shutdown(wait=False)
+        return _completed(futures, cancel=function.__name__ not in WRITE_SERVICES)
+    # END _run_many function
+# END CIJobService class
+
+class AsyncCIJobService(CIJobService):
+    def __init__(self, client=None, transport=None, max_concurrency=ASYNC_MAX_CONCURRENCY, cache=None,
+                 retry=None, limiter=None, metrics=None, hedge=None, timeout=None):
+        """
+        Asyncio handler for the cijobs service implementation v1
+
+        Provides awaitable versions of all CIJobService service functions,
+        with the same validation and exception semantics;
+        the batch functions (trigger_many etc.) return async iterators
+
+        Parameters:
+            client (RabitClient): optional
+                client of the AutoRABIT instance to be called;
+                if not provided, the default client set up by init() will be used
+            transport (AsyncHTTPTransport): optional
+                transport to send the requests with, instead of the asyncio connection pool of the client
+            max_concurrency (int):
+                maximum number of requests this handler keeps in flight (default 100)
+            cache (ResponseCache): optional
+                cache for the responses of the read services, instead of the cache of the client
+            retry (RetryPolicy): optional
+                policy for retrying failed requests, instead of the policy of the client
+            limiter (RateLimiter): optional
+                client-side rate and concurrency limits, instead of the limits of the client
+            metrics (Metrics): optional
+                registry recording every request sent, instead of the registry of the client
+            hedge (HedgePolicy): optional
+                policy for hedging slow read requests, instead of the policy of the client;
+                the slower of the two requests is cancelled
+            timeout (Timeouts): optional
+                connect and read timeouts of the requests, instead of the timeouts of the client
+        """
+        super().__init__(client=client, transport=transport, cache=cache, retry=retry, limiter=limiter,
+                         metrics=metrics, hedge=hedge, timeout=timeout)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+    # END constructor
+
+    def _default_transport(self, client):
+        return client.async_transport
+
+    async def _request(self, service, method, endpoint, error, trace=None, **kwargs):
+        deadline = _deadline.get()
+        attempt = 0
+        while True:
+            attempt += 1
+            if trace is not None:
+                trace.attempts = attempt
+            if deadline is not None:
+                deadline.check(error)
+            probe = self._retry is not None and self._retry.check()
+            send = self._send(service, method, endpoint, deadline=deadline, **kwargs)
+            try:
+                if deadline is None:
+                    response = await send
+                else:
+                    # bounds the whole request, including the wait for a free slot and the rate limit
+                    response = await asyncio.wait_for(send, deadline.remaining())
+            except asyncio.TimeoutError as e:
+                raise RabitDeadlineError(f'{error} [deadline expired]') from e
+            except requests.exceptions.RequestException as e:
+                if deadline is not None and deadline.expired:
+                    raise RabitDeadlineError(error, exc=e) from e
+                delay = None if self._retry is None else self._retry.delay(service, attempt, error=e)
+                probe = False
+                if delay is None:
+                    raise RabitConnectError(error, exc=e) from e
+            else:
+                if trace is not None:
+                    trace.response = response
+                delay = None if self._retry is None else self._retry.delay(service, attempt, response=response)
+                probe = False
+                if delay is None:
+                    break
+            finally:
+                if probe:
+                    # the trial request ended without an outcome (deadline, cancellation),
+                    # the circuit breaker must not wait for it
+                    self._retry.release()
+            if deadline is not None and delay >= deadline.remaining():
+                raise RabitDeadlineError(f'{error} [deadline expires before the next attempt]')
+            await asyncio.sleep(delay)
         try:
             response.raise_for_status()
         except:
             raise RabitStatusError(response)
-        # if no exceptions were thrown, return response JSON
-        result = response.json()
-        if 'revertDeployments' in result:
-            result = result['revertDeployments']
-        else:
-            raise RabitStatusError(result)
-        return result
+        return response
+    # END _request function
+
+    async def _send(self, service, method, endpoint, **kwargs):
+        if self._hedge is not None and self._hedge.hedged(service):
+            return await self._send_hedged(service, method, endpoint, **kwargs)
+        return await self._send_once(service, method, endpoint, **kwargs)
+    # END _send function
+
+    async def _send_once(self, service, method, endpoint, sent=None, deadline=None, **kwargs):
+        limit = None if self._limiter is None else self._limiter.limit(service)
+        if limit is not None:
+            await limit.acquire_async(deadline)
+        try:
+            async with self._semaphore:
+                if sent is not None:
+                    sent.set()
+                timeout = self._timeout(service, deadline)
+                return await self._transport.request(method, endpoint, headers=self._headers, timeout=timeout, **kwargs)
+        finally:
+            if limit is not None:
+                limit.release()
+    # END _send_once function
+
+    async def _send_hedged(self, service, method, endpoint, **kwargs):
+        hedge = self._hedge
+        sent = asyncio.Event()
+        primary = asyncio.ensure_future(self._send_timed(service, method, endpoint, kwargs, sent))
+        pending = {primary}
+        try:
+            # the hedging delay runs from the time the request is sent, not from the time it is queued
+            waiter = asyncio.ensure_future(sent.wait())
+            try:
+                await asyncio.wait({primary, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                waiter.cancel()
+            done, _ = await asyncio.wait(pending, timeout=hedge.delay(service))
+            if done or not hedge.spend():
+                return await primary
+            secondary = asyncio.ensure_future(self._send_timed(service, method, endpoint, kwargs))
+            pending.add(secondary)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    try:
+                        response = task.result()
+                    except requests.exceptions.RequestException as e:
+                        error = error or e
+                        continue
+                    if task is secondary:
+                        hedge.won()
+                    return response
+            raise error
+        finally:
+            # cancel the slower request (or both, if the caller was cancelled)
+            for task in pending:
+                task.cancel()
+    # END _send_hedged function
+
+    async def _send_timed(self, service, method, endpoint, kwargs, sent=None):
+        started = time.monotonic()
+        response = await self._send_once(service, method, endpoint, sent=sent, **kwargs)
+        self._hedge.observe(service, time.monotonic() - started)
+        return response
+    # END _send_timed function
+
+    async def _stream(self, service, endpoint, error, key, measure_memory, **kwargs):
+        # the async transport reads the body at once; it is still decoded one element at a time
+        trace = None if self._metrics is None else _Trace(service, 'GET', endpoint, kwargs)
+        try:
+            response = await self._request(service, 'GET', endpoint, error, trace=trace, **kwargs)
+        except Exception as e:
+            if trace is not None:
+                trace.error = e
+                self._metrics.record(trace.event())
+            raise
+        return JSONStream(
+            [response.content], key,
+            measure_memory=measure_memory,
+            on_close=self._stream_closed(response, trace)
+        )
+    # END _stream function
+
+    async def _call(self, service, method, endpoint, error, parse, project=None, pinned=False, **kwargs):
+        async def call():
+            if self._metrics is None:
+                response = await self._request(service, method, endpoint, error, **kwargs)
+                return parse(_json_loads(response.content))
+            trace = _Trace(service, method, endpoint, kwargs)
+            try:
+                response = await self._request(service, method, endpoint, error, trace=trace, **kwargs)
+                return parse(_json_loads(response.content))
+            except Exception as e:
+                trace.error = e
+                raise
+            finally:
+                self._metrics.record(trace.event())
+        if self._cache is None:
+            return await call()
+        if service in WRITE_SERVICES:
+            result = await call()
+            self._cache.invalidate(project)
+            return result
+        key = _cache_key(service, project, endpoint, kwargs)
+        return await self._cache.aget_or_call(service, key, call, pinned)
+    # END _call function
+
+    async def trigger(self, projectName=None, title='automated-build', **kwargs):
+        """
+        Awaitable version of CIJobService.trigger
+        """
+        return await super().trigger(projectName=projectName, title=title, **kwargs)
+    # END trigger function
+
+    async def poll(self, projectName=None, buildNumber=None, **kwargs):
+        """
+        Awaitable version of CIJobService.poll
+        """
+        return await super().poll(projectName=projectName, buildNumber=buildNumber, **kwargs)
+    # END poll function
+
+    async def history(self, projectName=None, build_from=-1, build_to=-1, **kwargs):
+        """
+        Awaitable version of CIJobService.history
+        """
+        return await super().history(
+            projectName=projectName, build_from=build_from, build_to=build_to, **kwargs)
+    # END history function
+
+    async def update(self, projectName=None, revision=None):
+        """
+        Awaitable version of CIJobService.update
+        """
+        return await super().update(projectName=projectName, revision=revision)
+    # END update function
+
+    async def update_many(self, jobs, revision=None, max_workers=BATCH_MAX_WORKERS, force=False):
+        """
+        Awaitable version of CIJobService.update_many
+        """
+        results, batch, positions = self._plan_updates(jobs, revision, force)
+        async for result in self._run_many(self.update, batch, max_workers):
+            results[positions[id(result.request)]] = _update_result(result)
+        return results
+    # END update_many function
+
+    async def quick_deploy(self, projectName=None, buildNumber=None):
+        """
+        Awaitable version of CIJobService.quick_deploy
+        """
+        return await super().quick_deploy(projectName=projectName, buildNumber=buildNumber)
+    # END quick_deploy function
+
+    async def rollback(self, projectName=None, buildNumber=None, **kwargs):
+        """
+        Awaitable version of CIJobService.rollback
+        """
+        return await super().rollback(projectName=projectName, buildNumber=buildNumber, **kwargs)
+    # END rollback function
+
+    async def rollback_details(self, projectName=None, buildNumber=None):
+        """
+        Awaitable version of CIJobService.rollback_details
+        """
+        return await super().rollback_details(projectName=projectName, buildNumber=buildNumber)
+    # END rollback_details function
+
+    async def rollback_history(self, projectName=None, buildNumber=None):
+        """
+        Awaitable version of CIJobService.rollback_history
+        """
+        return await super().rollback_history(projectName=projectName, buildNumber=buildNumber)
     # END rollback_history function
-# END CIJobService class
 
-class RabitError(Exception):
+    async def history_stream(self, projectName=None, build_from=-1, build_to=-1, measure_memory=False, **kwargs):
+        """
+        Awaitable version of CIJobService.history_stream
+        """
+        return await super().history_stream(
+            projectName=projectName, build_from=build_from, build_to=build_to,
+            measure_memory=measure_memory, **kwargs)
+    # END history_stream function
+
+    async def rollback_history_stream(self, projectName=None, buildNumber=None, measure_memory=False):
+        """
+        Awaitable version of CIJobService.rollback_history_stream
+        """
+        return await super().rollback_history_stream(
+            projectName=projectName, buildNumber=buildNumber, measure_memory=measure_memory)
+    # END rollback_history_stream function
+
+    async def iter_history(self, projectName=None, build_from=-1, build_to=-1,
+                           chunk_size=HISTORY_CHUNK_SIZE, newest_first=False, prefetch=False):
+        """
+        Async iterator version of CIJobService.iter_history
+        """
+        if projectName is None:
+            raise RabitError('Please provide a valid AutoRABIT Project')
+        if build_to < 0:
+            build_to = _latest_build_number(await self.poll(projectName=projectName))
+        chunks = _history_chunks(max(build_from, 1), build_to, chunk_size, newest_first)
+
+        async def fetch(chunk):
+            builds = await self.history(projectName=projectName, build_from=chunk[0], build_to=chunk[1])
+            return _sort_builds(builds, newest_first)
+
+        pending = None
+        try:
+            for chunk in chunks:
+                if not prefetch:
+                    for build in await fetch(chunk):
+                        yield build
+                    continue
+                following = asyncio.ensure_future(fetch(chunk))
+                if pending is not None:
+                    for build in await pending:
+                        yield build
+                pending = following
+            if pending is not None:
+                for build in await pending:
+                    yield build
+                pending = None
+        finally:
+            if pending is not None:
+                pending.cancel()
+    # END iter_history function
+
+    def _run_many(self, function, batch, max_workers):
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def run(request):
+            async with semaphore:
+                try:
+                    return BatchResult(request, await function(**request), None)
+                except RabitError as e:
+                    return BatchResult(request, None, e)
+
+        # the tasks are started right away, so the write calls are sent even if the iterator is abandoned
+        tasks = [asyncio.ensure_future(run(request)) for request in batch]
+        return _completed_tasks(tasks, cancel=function.__name__ not in WRITE_SERVICES)
+    # END _run_many function
+
+    async def close(self):
+        """
+        Close the handler
+
+        The transport is left open: it belongs to the client, or to the caller who provided it,
+        and may be shared by other handlers; the asyncio connections of the client are closed
+        by `await client.aclose()`, or when asyncio.run() shuts down their event loop
+        """
+    # END close function
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+# END AsyncCIJobService class
+
+class BatchResult(collections.namedtuple('BatchResult', ['request', 'result', 'error'])):
     """
-    Custom AutoRABIT exception type to help with exception handling
+    Outcome of a single call made by a batch service function
 
-    When exception is raised from another exception,
-    the original exception can be passed as an optional parameter `exc`
+    Attributes:
+        request (dict): keyword arguments of the service call
+        result: value returned by the service call, None if it failed
+        error (RabitError): exception raised by the service call, None if it succeeded
     """
-    def __init__(self, *args, **kwargs):
-        original_exception = kwargs.pop('exc', None)
-        msg = args[0] if 0 < len(args) else ''
-        if original_exception is not None:
-            msg += f' [{original_exception}]'
-        super().__init__(msg)
-# END RabitError class
+    __slots__ = ()
 
-class RabitStatusError(RabitError):
+    @property
+    def ok(self):
+        return self.error is None
+# END BatchResult class
+
+def _batch_requests(items, defaults, keys=('projectName', 'buildNumber')):
     """
-    Custom AutoRABIT exception type to help with exception handling
+    Normalize batch items (project names, tuples or dicts) into service keyword arguments
     """
-    pass
-# END RabitStatusError class
+    for item in items:
+        request = dict(defaults)
+        if isinstance(item, dict):
+            request.update(item)
+        elif isinstance(item, (tuple, list)):
+            request.update(zip(keys, item))
+        else:
+            request['projectName'] = item
+        yield request
+# END _batch_requests function
 
-class RabitConnectError(RabitError):
+def _batch_call(function, request):
+    try:
+        return BatchResult(request, function(**request), None)
+    except RabitError as e:
+        return BatchResult(request, None, e)
+# END _batch_call function
+
+def _completed(futures, cancel):
     """
-    Custom AutoRABIT exception type to help with exception handling for HTTP issues
+    Iterate over the results of futures in order of completion, optionally cancelling the rest when abandoned
     """
-    pass
-# END RabitConnectError class
\ No newline at end of file
+    try:
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        if cancel:
+            for future in futures:
+                future.cancel()
+# END _completed function
+
+async def _completed_tasks(tasks, cancel):
+    """
+    Iterate over the results of asyncio tasks in order of completion, optionally cancelling the rest when abandoned
+    """
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        if cancel:
+            for task in tasks:
+                task.cancel()
+# END _completed_tasks function
+
+def _propagated(executor, function, *args):
+    """
+    Submit a function to an executor, to run within the context (e.g. the Deadline) of the caller
+    """
+    return executor.submit(contextvars.copy_context().run, function, *args)
+
+class UpdateResult(collections.namedtuple('UpdateResult', ['projectName', 'revision', 'outcome', 'response', 'error'])):
+    """
+    Outcome of the baseline revision update of a single CI Job made by update_many
+
+    Attributes:
+        projectName (str): name of the CI Job
+        revision (str): requested baseline revision
+        outcome (str): 'updated', 'unchanged' (the revision already was the baseline),
+                       'skipped' (the revision is known to be the baseline, no request was sent) or 'failed'
+        response (dict): JSON-formatted body of the HTTP response, None if no request was sent or it failed
+        error (RabitError): exception raised by the update, None unless the update failed
+    """
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return 'failed' != self.outcome
+# END UpdateResult class
+
+def _update_result(result):
+    """
+    UpdateResult of the BatchResult of an update
+    """
+    projectName = result.request.get('projectName')
+    revision = result.request.get('revision')
+    if result.ok:
+        return UpdateResult(projectName, revision, 'updated', result.result, None)
+    if isinstance(result.error, RabitAlreadySetError):
+        return UpdateResult(projectName, revision, 'unchanged', result.error.response, None)
+    return UpdateResult(projectName, revision, 'failed', None, result.error)
+# END _update_result function
+
+def _history_chunks(build_from, build_to, chunk_size, newest_first):
+    """
+    Split a range of build numbers into (from, to) chunks of at most chunk_size builds
+    """
+    if chunk_size < 1:
+        raise RabitError('Please provide a positive chunk size')
+    starts = range(build_from, build_to + 1, chunk_size)
+    if newest_first:
+        starts = reversed(starts)
+    for start in starts:
+        yield start, min(start + chunk_size - 1, build_to)
+# END _history_chunks function
+
+def _sort_builds(builds, newest_first):
+    def number(build):
+        try:
+            return int(build.get('buildNumber'))
+        except (TypeError, ValueError):
+            return 0
+    return sorted(builds, key=number, reverse=newest_first)
+# END _sort_builds function
+
+def _latest_build_number(response):
+    """
+    Get the build number from the poll service response for the latest build
+    """
+    for key in ('cyclenum', 'buildNumber'):
+        try:
+            return int(response[key])
+        except (KeyError, TypeError, ValueError):
+            pass
+    raise RabitStatusError(response)
+# END _latest_build_number function
+
+class BuildWatcher:
+    """
+    Watches many CI Job builds (or rollback iterations) from a single scheduler thread
+
+    Every watched build is polled on its own adaptive interval:
+    if the expected duration of the job is known (from the durations of its previous builds),
+    the build is polled rarely while far from the expected completion and more often when close to it;
+    otherwise (or once the build overruns) the interval grows with the elapsed time
+
+    Example:
+        >>> with autorabit.BuildWatcher() as watcher:
+        >>>     futures = [watcher.watch(job, build) for job, build in builds]
+        >>>     for future in concurrent.futures.as_completed(futures):
+        >>>         print(future.result()['status'])
+    """
+    def __init__(self, service=None, min_interval=WATCH_MIN_INTERVAL, max_interval=WATCH_MAX_INTERVAL,
+                 max_workers=BATCH_MAX_WORKERS, max_errors=WATCH_MAX_ERRORS, history_size=WATCH_HISTORY_SIZE):
+        """
+        Parameters:
+            service (CIJobService): optional
+                service handler to poll with; if not provided, autorabit.cijobs will be used
+            min_interval (float): shortest time between two polls of a build, in seconds (default 2)
+            max_interval (float): longest time between two polls of a build, in seconds (default 60)
+            max_workers (int): maximum number of polls in flight (default 8)
+            max_errors (int): number of consecutive failed polls after which a build is given up (default 3)
+            history_size (int): number of previous builds used to estimate the duration of a job (default 20);
+                set to 0 to only learn the durations from builds completed while watching
+
+        Raises:
+            RabitError: service is not provided and init() was not called
+        """
+        if service is None:
+            service = globals().get('cijobs')
+        if service is None:
+            raise RabitError('Please call autorabit.init() before using the BuildWatcher')
+        self._service = service
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._max_errors = max_errors
+        self._history_size = history_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._condition = threading.Condition()
+        self._queue = []
+        self._sequence = itertools.count()
+        self._durations = {}
+        # durations measured from the watch() call, for builds polled without a start time; only lower bounds
+        self._watch_durations = {}
+        self._watching = 0
+        self._thread = None
+        self._closed = False
+    # END constructor
+
+    def watch(self, projectName=None, buildNumber=None, rollback=False, iteration=None, callback=None):
+        """
+        Start watching a CI Job build
+
+        Parameters:
+            projectName (str):
+                name of the CI Job
+            buildNumber (int):
+                build number to be watched
+            rollback (bool): default False
+                if true, the rollback status of the build is watched instead of the build status
+            iteration (int): optional
+                rollback iteration (revertId) to be watched; polls reporting another iteration are ignored
+            callback (callable): optional
+                called with (projectName, buildNumber, response) once the build is finished
+
+        Raises:
+            RabitError:
+                required parameter is missing or the watcher is closed
+
+        Returns:
+            concurrent.futures.Future: resolved with the last poll response once the build
+                reaches a complete or failing status; fails with RabitError if it cannot be polled
+        """
+        if projectName is None:
+            raise RabitError('Please provide a valid AutoRABIT Project')
+        if buildNumber is None:
+            raise RabitError('Please provide a valid build number')
+        build = _WatchedBuild(projectName, buildNumber, rollback, iteration, callback)
+        with self._condition:
+            if self._closed:
+                raise RabitError('BuildWatcher is closed')
+            if not rollback and projectName not in self._durations:
+                # the first watched build of a job loads its previous durations; rollbacks do not use them
+                self._durations[projectName] = collections.deque(maxlen=max(self._history_size, 1))
+                self._watch_durations[projectName] = collections.deque(maxlen=max(self._history_size, 1))
+                build.load_durations = True
+            self._watching += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='BuildWatcher', daemon=True)
+                self._thread.start()
+            self._schedule(build, 0)
+        return build.future
+    # END watch function
+
+    def close(self, cancel=True):
+        """
+        Stop the scheduler thread
+
+        Parameters:
+            cancel (bool): cancel the futures of the builds still being watched (default True)
+        """
+        with self._condition:
+            self._closed = True
+            pending = [entry[2] for entry in self._queue]
+            self._queue.clear()
+            self._watching = 0
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        self._executor.shutdown(wait=True)
+        if cancel:
+            for build in pending:
+                build.future.cancel()
+    # END close function
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        # let the remaining builds finish when leaving the block normally
+        if exc_info[0] is None:
+            self.wait()
+        self.close()
+
+    def wait(self, timeout=None):
+        """
+        Block until all watched builds are finished
+
+        Parameters:
+            timeout (float): maximum time to wait, in seconds (default None - wait forever)
+
+        Returns:
+            bool: True if all builds are finished
+        """
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._watching:
+                remaining = None if end is None else end - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+    # END wait function
+
+    def expected_duration(self, projectName):
+        """
+        Returns:
+            float: median duration of the previous builds of a CI Job in seconds, None if unknown;
+                durations measured from the watch() call are only used while no start times are known
+        """
+        durations = self._durations.get(projectName) or self._watch_durations.get(projectName)
+        if not durations:
+            return None
+        return statistics.median(durations)
+    # END expected_duration function
+
+    def _schedule(self, build, delay):
+        heapq.heappush(self._queue, (time.monotonic() + delay, next(self._sequence), build))
+        self._condition.notify_all()
+    # END _schedule function
+
+    def _run(self):
+        with self._condition:
+            while not self._closed:
+                if not self._queue:
+                    self._condition.wait()
+                    continue
+                due, _, build = self._queue[0]
+                delay = due - time.monotonic()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                heapq.heappop(self._queue)
+                self._executor.submit(build.context.run, self._poll, build)
+    # END _run function
+
+    def _poll(self, build):
+        if build.future.cancelled():
+            self._finish(build)
+            return
+        if build.load_durations:
+            build.load_durations = False
+            self._load_durations(build)
+        deadline = _deadline.get()
+        try:
+            if deadline is not None:
+                deadline.check(f'Build {build.projectName}_{build.buildNumber} is not finished')
+            response = self._service.poll(projectName=build.projectName, buildNumber=build.buildNumber)
+            finished = self._finished(build, response)
+            build.errors = 0
+            if not build.rollback:
+                self._align_start(build, response)
+        except RabitError as e:
+            build.errors += 1
+            if build.errors >= self._max_errors or isinstance(e, RabitDeadlineError):
+                self._finish(build, error=e)
+                return
+            finished = False
+        if finished:
+            if not build.rollback:
+                self._learn_duration(build, response)
+            self._finish(build, response=response)
+            return
+        interval = self._interval(build)
+        if deadline is not None:
+            # poll once more at the deadline, to fail the build on time
+            interval = min(interval, deadline.remaining())
+        with self._condition:
+            if not self._closed:
+                self._schedule(build, interval)
+                return
+        build.future.cancel()
+    # END _poll function
+
+    def _finish(self, build, response=None, error=None):
+        with self._condition:
+            if not self._closed:
+                self._watching -= 1
+                self._condition.notify_all()
+        if build.future.cancelled():
+            return
+        if error is not None:
+            build.future.set_exception(error)
+            return
+        build.future.set_result(response)
+        if build.callback is not None:
+            build.callback(build.projectName, build.buildNumber, response)
+    # END _finish function
+
+    def _finished(self, build, response):
+        if build.rollback:
+            status = response.get('rollbackstatus')
+            iteration = response.get('rollbackIternationNumber')
+            if build.iteration is not None and iteration is not None and str(iteration) != str(build.iteration):
+                return False
+        else:
+            status = response.get('status')
+        if status is None:
+            raise RabitStatusError(response)
+        return status in STATUS_COMPLETE or status not in STATUS_OK
+    # END _finished function
+
+    def _interval(self, build):
+        elapsed = time.monotonic() - build.started
+        expected = None if build.rollback else self.expected_duration(build.projectName)
+        if expected is not None and expected > elapsed:
+            # far from the expected completion: halve the remaining time
+            interval = (expected - elapsed) / 2
+        elif expected is not None:
+            # overrun: back off with the time spent over the expected duration
+            interval = (elapsed - expected) * WATCH_BACKOFF
+        else:
+            interval = elapsed * WATCH_BACKOFF
+        return max(self._min_interval, min(self._max_interval, interval))
+    # END _interval function
+
+    def _align_start(self, build, response):
+        """
+        Count the elapsed time of a build from its start time, if the poll response has one,
+        instead of from the watch() call
+        """
+        started = parse_timestamp(_first_of(response, BUILD_START_KEYS))
+        if started is not None:
+            build.started = time.monotonic() - max(0.0, time.time() - started)
+            build.start_known = True
+    # END _align_start function
+
+    def _learn_duration(self, build, response):
+        duration = build_duration(response)
+        if duration is None and build.start_known:
+            duration = time.monotonic() - build.started
+        if duration is not None:
+            self._durations[build.projectName].append(duration)
+        else:
+            # the build may have been running before the watch() call
+            self._watch_durations[build.projectName].append(time.monotonic() - build.started)
+    # END _learn_duration function
+
+    def _load_durations(self, build):
+        durations = []
+        if self._history_size and isinstance(build.buildNumber, int) and build.buildNumber > 1:
+            try:
+                history = self._service.history(
+                    projectName=build.projectName,
+                    build_from=max(1, build.buildNumber - self._history_size),
+                    build_to=build.buildNumber - 1
+                )
+            except RabitError:
+                history = []
+            for previous in history:
+                if previous.get('overAllStatus') in STATUS_COMPLETE:
+                    duration = build_duration(previous)
+                    if duration is not None:
+                        durations.append(duration)
+        self._durations[build.projectName].extend(durations)
+    # END _load_durations function
+# END BuildWatcher class
+
+class _WatchedBuild:
+    __slots__ = ('projectName', 'buildNumber', 'rollback', 'iteration', 'callback',
+                 'future', 'started', 'start_known', 'errors', 'load_durations', 'context')
+
+    def __init__(self, projectName, buildNumber, rollback, iteration, callback):
+        self.projectName = projectName
+        self.buildNumber = buildNumber
+        self.rollback = rollback
+        self.iteration = iteration
+        self.callback = callback
+        self.future = Future()
+        self.started = time.monotonic()
+        self.start_known = False
+        self.errors = 0
+        self.load_durations = False
+        # the polls run within the context of the watch() call, bounded by its Deadline
+        self.context = contextvars.copy_context()
+# END _WatchedBuild class
+
+def build_duration(build):
+    """
+    Duration of a finished build from its ciJobHistoryList entry
+
+    Parameters:
+        build (dict): element of the history service result
+
+    Returns:
+        float: duration in seconds, None if the entry has no start and end time
+    """
+    started = parse_timestamp(_first_of(build, BUILD_START_KEYS))
+    ended = parse_timestamp(_first_of(build, BUILD_END_KEYS))
+    if started is None or ended is None or ended < started:
+        return None
+    return ended - started
+# END build_duration function
+
+def parse_timestamp(value):
+    """
+    Convert an AutoRABIT timestamp to seconds since the epoch
+
+    Parameters:
+        value (int, float or str): epoch time in milliseconds or seconds, or a date-time string
+
+    Returns:
+        float: seconds since the epoch, None if the value cannot be parsed
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        # AutoRABIT uses epoch milliseconds; anything this large cannot be seconds
+        return value / 1000 if value > 1e11 else float(value)
+    value = str(value).strip()
+    if value.isdigit():
+        return parse_timestamp(int(value))
+    for parse in (datetime.datetime.fromisoformat, _parse_timestamp_format):
+        try:
+            parsed = parse(value)
+        except ValueError:
+            continue
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+        return parsed.timestamp()
+    return None
+# END parse_timestamp function
+
+def _parse_timestamp_format(value):
+    for fmt in TIMESTAMP_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    raise ValueError(value)
+
+def _first_of(build, keys):
+    for key in keys:
+        if build.get(key) is not None:
+            return build[key]
+    return None
+
+class RollbackPipeline:
+    """
+    Rolls back many CI Job builds concurrently
+
+    Every build goes through the stages of the rollback as a state machine:
+        pending -> details (rollback_details: backup status and manifest)
+                -> rollback (rollback triggered with the manifest)
+                -> watching (rollback status polled by a BuildWatcher)
+                -> succeeded or failed; skipped if the backup of the build is not usable
+    The stages of different builds overlap: up to max_workers rollback_details and rollback requests
+    are in flight, while the rollbacks already triggered are watched by a single scheduler thread
+
+    Example:
+        >>> with autorabit.RollbackPipeline(callback=print) as pipeline:
+        >>>     for job in pipeline.run([(name, build) for name, build in bad_release]):
+        >>>         print(job.projectName, job.buildNumber, job.state, job.error)
+    """
+    def __init__(self, service=None, validate=True, manifest=None, max_workers=BATCH_MAX_WORKERS,
+                 watcher=None, callback=None, **kwargs):
+        """
+        Parameters:
+            service (CIJobService): optional
+                service handler to call; if not provided, autorabit.cijobs will be used
+            validate (bool): default True
+                if true, the rollbacks run in validate-only mode
+            manifest (callable): optional
+                called with (projectName, buildNumber, manifest) before the rollback is triggered,
+                returns the manifest (dict or RollbackManifest) to roll back with, e.g. with elements removed
+                or moved between destructiveChangesPre and destructiveChangesPost
+            max_workers (int): maximum number of rollback_details and rollback requests in flight (default 8)
+            watcher (BuildWatcher): optional
+                watcher polling the rollback statuses; if not provided, one is created (and closed) by the pipeline
+            callback (callable): optional
+                called with the RollbackJob every time a build moves to another stage
+            **kwargs:
+                keyword arguments passed to every rollback call, e.g. testLevel;
+                the build, validation mode and manifest are set by the pipeline and cannot be passed
+
+        Raises:
+            RabitError: service is not provided and init() was not called,
+                or kwargs hold an argument set by the pipeline
+        """
+        if service is None:
+            service = globals().get('cijobs')
+        if service is None:
+            raise RabitError('Please call autorabit.init() before using the RollbackPipeline')
+        reserved = sorted(set(kwargs).intersection(ROLLBACK_PIPELINE_ARGUMENTS))
+        if reserved:
+            raise RabitError(f'Arguments set by the RollbackPipeline cannot be passed: {", ".join(reserved)}')
+        self._service = service
+        self._validate = validate
+        self._manifest = manifest
+        self._callback = callback
+        self._kwargs = kwargs
+        self._owns_watcher = watcher is None
+        self._watcher = watcher if watcher is not None else BuildWatcher(service=service)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._condition = threading.Condition()
+        self._jobs = []
+        self._running = 0
+        self._closed = False
+    # END constructor
+
+    @property
+    def jobs(self):
+        """
+        list: RollbackJob of every build submitted so far, with its current stage
+        """
+        with self._condition:
+            return list(self._jobs)
+
+    def submit(self, projectName=None, buildNumber=None):
+        """
+        Start rolling back a CI Job build
+
+        Parameters:
+            projectName (str):
+                name of the CI Job
+            buildNumber (int): optional
+                build to roll back; if not provided, latest available build will be used
+
+        Raises:
+            RabitError:
+                required parameter is missing or the pipeline is closed
+
+        Returns:
+            concurrent.futures.Future: resolved with the RollbackJob once it succeeded, failed or was skipped;
+                RabitErrors are collected in RollbackJob.error instead of being raised
+        """
+        if projectName is None:
+            raise RabitError('Please provide a valid AutoRABIT Project')
+        job = RollbackJob(projectName, buildNumber)
+        with self._condition:
+            if self._closed:
+                raise RabitError('RollbackPipeline is closed')
+            self._jobs.append(job)
+            self._running += 1
+        _propagated(self._executor, self._run, self._details, job)
+        return job.future
+    # END submit function
+
+    def run(self, builds):
+        """
+        Roll back many CI Job builds and wait until all of them are finished
+
+        Parameters:
+            builds (iterable):
+                builds to roll back; each item is either a project name (latest build),
+                a (projectName, buildNumber) pair or a dict of submit keyword arguments
+
+        Returns:
+            list: RollbackJob of every build, in the order of builds
+        """
+        futures = [self.submit(**request) for request in _batch_requests(builds, {})]
+        return [future.result() for future in futures]
+    # END run function
+
+    def wait(self, timeout=None):
+        """
+        Block until all submitted builds are finished
+
+        Parameters:
+            timeout (float): maximum time to wait, in seconds (default None - wait forever)
+
+        Returns:
+            bool: True if all builds are finished
+        """
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._running:
+                remaining = None if end is None else end - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+    # END wait function
+
+    def close(self):
+        """
+        Stop the pipeline; builds not finished yet are failed
+        """
+        with self._condition:
+            self._closed = True
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        if self._owns_watcher:
+            self._watcher.close()
+        for job in self.jobs:
+            self._finish(job, 'failed', RabitError('RollbackPipeline is closed'))
+    # END close function
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        # let the remaining builds finish when leaving the block normally
+        if exc_info[0] is None:
+            self.wait()
+        self.close()
+
+    def _run(self, stage, job, *args):
+        try:
+            stage(job, *args)
+        except Exception as e:
+            # also covers the errors raised by the callback, so that no build is left unfinished
+            self._finish(job, 'failed', e)
+    # END _run function
+
+    def _details(self, job):
+        self._advance(job, 'details')
+        details = self._service.rollback_details(projectName=job.projectName, buildNumber=job.buildNumber)
+        job.buildNumber = details.get('cyclenum', job.buildNumber)
+        job.backup_status = details.get('backupStatus')
+        if job.backup_status not in STATUS_OK:
+            self._finish(job, 'skipped', RabitStatusError(f'Backup status {job.backup_status}'))
+            return
+        manifest = {key: details[key] for key in ROLLBACK_MANIFEST_KEYS if key in details}
+        if self._manifest is not None:
+            manifest = self._manifest(job.projectName, job.buildNumber, manifest)
+            if isinstance(manifest, RollbackManifest):
+                manifest = manifest.to_json()
+        job.manifest = manifest
+        self._rollback(job)
+    # END _details function
+
+    def _rollback(self, job):
+        self._advance(job, 'rollback')
+        response = self._service.rollback(
+            projectName=job.projectName, buildNumber=job.buildNumber,
+            validateDeployment=self._validate, **job.manifest, **self._kwargs
+        )
+        job.iteration = response.get('revertId')
+        job.response = response
+        status = response.get('status')
+        if status in STATUS_COMPLETE:
+            self._finish(job, 'succeeded')
+        elif status not in STATUS_OK:
+            self._finish(job, 'failed', RabitStatusError(response))
+        else:
+            self._advance(job, 'watching')
+            future = self._watcher.watch(
+                projectName=job.projectName, buildNumber=job.buildNumber,
+                rollback=True, iteration=job.iteration
+            )
+            future.add_done_callback(lambda future: self._run(self._watched, job, future))
+    # END _rollback function
+
+    def _watched(self, job, future):
+        if future.cancelled():
+            self._finish(job, 'failed', RabitError('Rollback is no longer watched'))
+            return
+        # raises the error of the last poll, if the rollback could not be polled
+        response = future.result()
+        job.response = response
+        if response.get('rollbackstatus') in STATUS_COMPLETE:
+            self._finish(job, 'succeeded')
+        else:
+            self._finish(job, 'failed', RabitStatusError(response))
+    # END _watched function
+
+    def _advance(self, job, state):
+        job.state = state
+        job.updated = time.monotonic()
+        if self._callback is not None:
+            self._callback(job)
+    # END _advance function
+
+    def _finish(self, job, state, error=None):
+        with self._condition:
+            if job.future.done():
+                return
+            job.error = error
+            job.state = state
+            job.updated = time.monotonic()
+            job.future.set_result(job)
+            self._running -= 1
+            self._condition.notify_all()
+        if self._callback is not None:
+            self._callback(job)
+    # END _finish function
+# END RollbackPipeline class
+
+class RollbackJob:
+    """
+    Progress and outcome of the rollback of a single CI Job build
+
+    Attributes:
+        projectName (str): name of the CI Job
+        buildNumber (int): build being rolled back
+        state (str): current stage of the rollback, see autorabit.ROLLBACK_STATES
+        backup_status (str): backupStatus reported by rollback_details
+        manifest (dict): constructive and destructive changes the rollback was triggered with
+        iteration (int): rollback iteration (revertId)
+        response (dict): last rollback or poll response
+        error (Exception): reason of a failed or skipped rollback, None otherwise
+        started (float): time.monotonic() of the submission
+        updated (float): time.monotonic() of the last change of state
+    """
+    __slots__ = ('projectName', 'buildNumber', 'state', 'backup_status', 'manifest', 'iteration',
+                 'response', 'error', 'started', 'updated', 'future')
+
+    def __init__(self, projectName, buildNumber):
+        self.projectName = projectName
+        self.buildNumber = buildNumber
+        self.state = 'pending'
+        self.backup_status = None
+        self.manifest = None
+        self.iteration = None
+        self.response = None
+        self.error = None
+        self.started = self.updated = time.monotonic()
+        self.future = Future()
+
+    @property
+    def ok(self):
+        return 'succeeded' == self.state
+
+    @property
+    def done(self):
+        return self.state in ROLLBACK_FINAL_STATES
+
+    def __repr__(self):
+        error = '' if self.error is None else f' ({self.error})'
+        return f'RollbackJob({self.projectName}_{self.buildNumber}_{self.iteration}: {self.state}{error})'
+# END RollbackJob class
+
+class RollbackManifest:
+    """
+    Indexed rollback package manifest: the constructive and the destructive (pre and post) changes
+
+    Every section keeps the members of every metadata type in an insertion-ordered set,
+    so looking up, adding, removing and moving members takes constant time per member,
+    and manifests of different builds can be compared and combined like sets
+
+    Example:
+        >>> manifest = autorabit.RollbackManifest.from_details(cijobs.rollback_details(projectName=job))
+        >>> manifest.move('CustomObject', ['Invoice__c'], 'destructiveChangesPre', 'destructiveChangesPost')
+        >>> cijobs.rollback(projectName=job, validateDeployment=True, **manifest.to_json())
+    """
+    def __init__(self, constructiveChanges=None, destructiveChangesPre=None, destructiveChangesPost=None):
+        """
+        Parameters:
+            constructiveChanges (dict): optional
+                JSON-formatted package manifest of constructive rollback elements
+            destructiveChangesPre (dict): optional
+                JSON-formatted package manifest of destructive (pre) rollback elements
+            destructiveChangesPost (dict): optional
+                JSON-formatted package manifest of destructive (post) rollback elements
+
+        Raises:
+            RabitError: a manifest is not in the package manifest format
+        """
+        self._sections = {section: {} for section in ROLLBACK_MANIFEST_KEYS}
+        self._versions = dict.fromkeys(ROLLBACK_MANIFEST_KEYS)
+        given = [constructiveChanges, destructiveChangesPre, destructiveChangesPost]
+        for section, package in zip(ROLLBACK_MANIFEST_KEYS, given):
+            if package is not None:
+                self._load(section, package)
+    # END constructor
+
+    @classmethod
+    def from_details(cls, details):
+        """
+        Parameters:
+            details (dict): response of the rollback_details service
+
+        Returns:
+            RollbackManifest: the manifest of the rollback package
+        """
+        return cls(**{section: details.get(section) for section in ROLLBACK_MANIFEST_KEYS})
+
+    def to_json(self):
+        """
+        Returns:
+            dict: package manifests of the non-empty sections, in the format expected by the rollback service
+        """
+        result = {}
+        for section, types in self._sections.items():
+            package = {'types': [{'name': name, 'members': list(members)} for name, members in types.items() if members]}
+            if not package['types']:
+                continue
+            if self._versions[section] is not None:
+                package['version'] = self._versions[section]
+            result[section] = package
+        return result
+    # END to_json function
+
+    def members(self, section, type=None):
+        """
+        Parameters:
+            section (str): constructiveChanges, destructiveChangesPre or destructiveChangesPost
+            type (str): metadata type; if not provided, the members of all types are returned
+
+        Returns:
+            list: members of the type, or (type, member) pairs of all types
+        """
+        types = self._section(section)
+        if type is not None:
+            return list(types.get(type, ()))
+        return [(name, member) for name, members in types.items() for member in members]
+    # END members function
+
+    def sections(self, type, member):
+        """
+        Returns:
+            list: sections holding the member of the metadata type
+        """
+        return [section for section, types in self._sections.items() if member in types.get(type, ())]
+
+    def contains(self, type, member, section=None):
+        """
+        Returns:
+            bool: True if the member of the metadata type is in the section (or in any section)
+        """
+        if section is not None:
+            return member in self._section(section).get(type, ())
+        return bool(self.sections(type, member))
+
+    def add(self, section, type, members):
+        """
+        Add members of a metadata type to a section
+
+        Returns:
+            int: number of members added
+        """
+        target = self._section(section).setdefault(type, {})
+        size = len(target)
+        target.update(dict.fromkeys(_as_members(members)))
+        return len(target) - size
+    # END add function
+
+    def remove(self, type, members, section=None):
+        """
+        Remove members of a metadata type from a section (or from all sections)
+
+        Returns:
+            int: number of members removed
+        """
+        removed = 0
+        for name in ([section] if section is not None else ROLLBACK_MANIFEST_KEYS):
+            existing = self._section(name).get(type)
+            if not existing:
+                continue
+            for member in _as_members(members):
+                if member in existing:
+                    del existing[member]
+                    removed += 1
+        return removed
+    # END remove function
+
+    def move(self, type, members, source, target):
+        """
+        Move members of a metadata type between sections, e.g. from destructiveChangesPre to destructiveChangesPost;
+        members missing from the source section are ignored
+
+        Returns:
+            int: number of members moved
+        """
+        existing = self._section(source).get(type, {})
+        moved = [member for member in _as_members(members) if member in existing]
+        for member in moved:
+            del existing[member]
+        self._section(target).setdefault(type, {}).update(dict.fromkeys(moved))
+        return len(moved)
+    # END move function
+
+    def diff(self, other):
+        """
+        Compare with the manifest of another build
+
+        Returns:
+            tuple: (added, removed) - RollbackManifests of the members only in this manifest
+                   and of the members only in the other one
+        """
+        return self - other, other - self
+
+    def merge(self, other):
+        """
+        Returns:
+            RollbackManifest: members of both manifests; versions of this manifest take precedence
+        """
+        return self | other
+
+    def __or__(self, other):
+        return self._combine(other, lambda mine, theirs: {**mine, **theirs})
+
+    def __and__(self, other):
+        return self._combine(other, lambda mine, theirs: {member: None for member in mine if member in theirs})
+
+    def __sub__(self, other):
+        return self._combine(other, lambda mine, theirs: {member: None for member in mine if member not in theirs})
+
+    def __len__(self):
+        return sum(len(members) for types in self._sections.values() for members in types.values())
+
+    def __eq__(self, other):
+        if not isinstance(other, RollbackManifest):
+            return NotImplemented
+        return all(
+            {name: set(members) for name, members in self._sections[section].items() if members} ==
+            {name: set(members) for name, members in other._sections[section].items() if members}
+            for section in ROLLBACK_MANIFEST_KEYS
+        )
+
+    def __repr__(self):
+        counts = ', '.join(f'{section}={len(self.members(section))}' for section in ROLLBACK_MANIFEST_KEYS)
+        return f'RollbackManifest({counts})'
+
+    def _combine(self, other, combine):
+        result = RollbackManifest()
+        for section in ROLLBACK_MANIFEST_KEYS:
+            mine = self._sections[section]
+            theirs = other._sections[section]
+            for name in {**mine, **theirs}:
+                members = combine(mine.get(name, {}), theirs.get(name, {}))
+                if members:
+                    result._sections[section][name] = members
+            result._versions[section] = self._versions[section] or other._versions[section]
+        return result
+    # END _combine function
+
+    def _section(self, section):
+        try:
+            return self._sections[section]
+        except KeyError:
+            raise RabitError(f'Unknown manifest section {section}')
+
+    def _load(self, section, package):
+        if not isinstance(package, dict):
+            raise RabitError(f'Invalid {section} manifest')
+        self._versions[section] = package.get('version')
+        types = package.get('types') or []
+        # a manifest with a single type may hold it as an object instead of a list
+        for entry in ([types] if isinstance(types, dict) else types):
+            if not isinstance(entry, dict) or 'name' not in entry:
+                raise RabitError(f'Invalid {section} manifest')
+            self.add(section, entry['name'], entry.get('members') or [])
+    # END _load function
+# END RollbackManifest class
+
+def _as_members(members):
+    # a single member may be given (or returned by AutoRABIT) as a string instead of a list
+    return [members] if isinstance(members, str) else members
+
+class RetryPolicy:
+    """
+    Policy for retrying failed requests, with exponential backoff and a circuit breaker
+
+    A failed attempt is retried when it raised a connection error or returned one of the retryable
+    HTTP status codes; the delay before the next attempt grows exponentially with full jitter,
+    or follows the Retry-After header of the response
+
+    Write services (trigger, update, quick_deploy, rollback) are only retried
+    when the request was certainly not processed: the connection could not be established,
+    or the server rejected it with 429 or 503
+
+    Retries are limited by a budget shared by all requests: every request adds a fraction of a retry
+    to the budget (up to its initial size) and every retry takes a whole one
+
+    After a number of consecutive failed attempts the circuit breaker opens,
+    and all requests fail fast with RabitCircuitOpenError until the cooldown has passed;
+    then a single trial request is let through to probe the instance
+
+    A single policy can be shared by many sync and async service handlers of the same instance
+    """
+    def __init__(self, max_attempts=RETRY_MAX_ATTEMPTS, backoff=RETRY_BACKOFF, max_backoff=RETRY_MAX_BACKOFF,
+                 jitter=True, status_codes=RETRY_STATUS_CODES, retry_writes=True,
+                 budget=RETRY_BUDGET, budget_ratio=RETRY_BUDGET_RATIO,
+                 breaker_threshold=BREAKER_THRESHOLD, breaker_cooldown=BREAKER_COOLDOWN):
+        """
+        Parameters:
+            max_attempts (int): maximum number of attempts per request, including the first one (default 4)
+            backoff (float): delay before the first retry, in seconds, doubled for every next one (default 0.5)
+            max_backoff (float): maximum delay before a retry, in seconds (default 30);
+                a Retry-After longer than this ends the retries
+            jitter (bool): randomize the delays between 0 and the exponential backoff (default True)
+            status_codes (list): HTTP status codes to be retried (default 429, 502, 503, 504)
+            retry_writes (bool): retry write services when it is safe (default True)
+            budget (float): maximum number of retries that can be spent at once (default 10)
+            budget_ratio (float): retries earned by every request (default 0.1)
+            breaker_threshold (int): consecutive failed attempts opening the circuit breaker (default 5);
+                set to None to disable the circuit breaker
+            breaker_cooldown (float): time the circuit breaker stays open, in seconds (default 30)
+        """
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.status_codes = set(status_codes)
+        self.retry_writes = retry_writes
+        self.budget_ratio = budget_ratio
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self._budget_max = budget
+        self._budget = budget
+        self._failures = 0
+        self._open_until = None
+        self._probing = False
+        self._lock = threading.Lock()
+        self.retries = 0
+    # END constructor
+
+    @property
+    def circuit_open(self):
+        with self._lock:
+            return self._open_until is not None and time.monotonic() < self._open_until
+
+    def check(self):
+        """
+        Check the circuit breaker before sending an attempt
+
+        Returns:
+            bool: True if the attempt is the trial request of the circuit breaker;
+                  its outcome must be recorded with delay(), or it must be given up with release()
+
+        Raises:
+            RabitCircuitOpenError: the circuit breaker is open
+        """
+        with self._lock:
+            if self._open_until is None:
+                return False
+            if time.monotonic() < self._open_until or self._probing:
+                raise RabitCircuitOpenError('AutoRABIT instance is unavailable, circuit breaker is open')
+            # half-open: let a single trial request through
+            self._probing = True
+            return True
+    # END check function
+
+    def release(self):
+        """
+        Give up the trial request of the circuit breaker without an outcome,
+        e.g. when the deadline expired or the caller was cancelled; the next request probes the instance
+        """
+        with self._lock:
+            self._probing = False
+    # END release function
+
+    def delay(self, service, attempt, error=None, response=None):
+        """
+        Record the outcome of an attempt and decide if it should be retried
+
+        Parameters:
+            service (str): name of the service function
+            attempt (int): number of the attempt, starting at 1
+            error (requests.exceptions.RequestException): exception raised by the attempt
+            response (requests.Response): response of the attempt
+
+        Returns:
+            float: delay before the next attempt in seconds, None if the attempt is not to be retried
+        """
+        failed = error is not None or response.status_code in self.status_codes
+        with self._lock:
+            self._record(failed)
+            if attempt == 1:
+                self._budget = min(self._budget_max, self._budget + self.budget_ratio)
+            if not failed or attempt >= self.max_attempts or not self._retryable(service, error, response):
+                return None
+            if self._open_until is not None or self._budget < 1:
+                return None
+            delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+            if self.jitter:
+                delay = random.uniform(0, delay)
+            retry_after = None if response is None else _retry_after(response)
+            if retry_after is not None:
+                if retry_after > self.max_backoff:
+                    return None
+                delay = retry_after
+            self._budget -= 1
+            self.retries += 1
+            return delay
+    # END delay function
+
+    def _retryable(self, service, error, response):
+        if service not in WRITE_SERVICES:
+            return True
+        if not self.retry_writes:
+            return False
+        if error is not None:
+            return _not_sent(error)
+        return response.status_code in RETRY_WRITE_STATUS_CODES
+    # END _retryable function
+
+    def _record(self, failed):
+        if not failed:
+            self._failures = 0
+            self._open_until = None
+            self._probing = False
+            return
+        self._failures += 1
+        if self._probing or (self.breaker_threshold is not None and self._failures >= self.breaker_threshold):
+            self._open_until = time.monotonic() + self.breaker_cooldown
+            self._probing = False
+    # END _record function
+# END RetryPolicy class
+
+def _retry_after(response):
+    """
+    Parse the Retry-After header of a response into a delay in seconds
+    """
+    value = response.headers.get('Retry-After')
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+# END _retry_after function
+
+def _not_sent(error):
+    """
+    Check if a failed request was certainly not received by the server,
+    i.e. the connection could not be established
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if not isinstance(error, requests.exceptions.ConnectionError):
+        return False
+    cause = error.args[0] if error.args else None
+    # requests wraps urllib3 errors in MaxRetryError
+    cause = getattr(cause, 'reason', cause)
+    if isinstance(cause, (urllib3.exceptions.NewConnectionError, ConnectionRefusedError)):
+        return True
+    # no aiohttp error can be raised before aiohttp is imported by AsyncHTTPTransport
+    aiohttp = sys.modules.get('aiohttp')
+    return aiohttp is not None and isinstance(cause, aiohttp.ClientConnectorError)
+# END _not_sent function
+
+class HedgePolicy:
+    """
+    Policy for hedging slow requests of the read services (poll, history, rollback_details, rollback_history)
+
+    When a request has not been answered within the hedging delay, a duplicate of it is sent,
+    and the response arriving first is used; the other request is cancelled by the asyncio handlers,
+    and abandoned by the sync ones
+    The hedging delay adapts to every service: it is a quantile (default p95) of its recent latencies,
+    so only the slowest requests are hedged; until enough latencies are observed, the maximum delay is used
+
+    The extra load is limited by a budget shared by all requests: every request adds a fraction of a hedge
+    to the budget (up to its initial size) and every hedge takes a whole one
+
+    Sync service handlers send the hedged requests from the worker threads of the policy;
+    the requests made while all of them are busy are sent from the calling thread, without hedging
+    A single policy can be shared by many sync and async service handlers of the same instance
+    """
+    def __init__(self, services=READ_SERVICES, quantile=HEDGE_QUANTILE, min_delay=HEDGE_MIN_DELAY,
+                 max_delay=HEDGE_MAX_DELAY, window=HEDGE_WINDOW, min_samples=HEDGE_MIN_SAMPLES,
+                 budget=HEDGE_BUDGET, budget_ratio=HEDGE_BUDGET_RATIO, max_workers=HEDGE_MAX_WORKERS):
+        """
+        Parameters:
+            services (list): services to be hedged; only idempotent ones should be (default the read services)
+            quantile (float): quantile of the recent latencies of a service used as its hedging delay (default 0.95)
+            min_delay (float): minimum hedging delay, in seconds (default 0.05)
+            max_delay (float): maximum hedging delay, in seconds (default 2)
+            window (int): number of recent latencies kept for every service (default 200)
+            min_samples (int): number of latencies observed before the delay adapts (default 20)
+            budget (float): maximum number of hedges that can be spent at once (default 10)
+            budget_ratio (float): hedges earned by every request, i.e. the maximum extra load (default 0.05)
+            max_workers (int): worker threads sending the requests of sync handlers (default 32);
+                they bound the number of hedged requests in flight, not the number of requests
+        """
+        self.services = set(services)
+        self.quantile = quantile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.budget_ratio = budget_ratio
+        self._window = window
+        self._budget_max = budget
+        self._budget = budget
+        self._latencies = {}
+        self._lock = threading.Lock()
+        self._max_workers = max_workers
+        self._workers = threading.BoundedSemaphore(max_workers)
+        self._executor = None
+        self.requests = 0
+        self.hedges = 0
+        self.wins = 0
+    # END constructor
+
+    def hedged(self, service):
+        """
+        Returns:
+            bool: True if the requests of the service are hedged
+        """
+        return service in self.services
+
+    def delay(self, service):
+        """
+        Record the start of a request and get its hedging delay
+
+        Returns:
+            float: time to wait for the response before sending a duplicate request, in seconds
+        """
+        with self._lock:
+            self.requests += 1
+            self._budget = min(self._budget_max, self._budget + self.budget_ratio)
+            latencies = self._latencies.get(service)
+            if latencies is None or len(latencies) < self.min_samples:
+                return self.max_delay
+            threshold = _interpolate(sorted(latencies), self.quantile * 100)
+        return max(self.min_delay, min(self.max_delay, threshold))
+    # END delay function
+
+    def spend(self):
+        """
+        Take a hedge from the budget
+
+        Returns:
+            bool: True if a duplicate request can be sent
+        """
+        with self._lock:
+            if self._budget < 1:
+                return False
+            self._budget -= 1
+            self.hedges += 1
+            return True
+    # END spend function
+
+    def refund(self):
+        """
+        Return a hedge to the budget, when the duplicate request could not be sent
+        """
+        with self._lock:
+            self._budget = min(self._budget_max, self._budget + 1)
+            self.hedges -= 1
+
+    def won(self):
+        """
+        Record a duplicate request answered before the original one
+        """
+        with self._lock:
+            self.wins += 1
+
+    def observe(self, service, latency):
+        """
+        Record the latency of a request of a service, in seconds
+        """
+        with self._lock:
+            latencies = self._latencies.get(service)
+            if latencies is None:
+                latencies = self._latencies[service] = collections.deque(maxlen=self._window)
+            latencies.append(latency)
+    # END observe function
+
+    def submit(self, function, *args):
+        """
+        Run a request of a sync handler on an idle worker thread of the policy;
+        requests are never queued behind busy workers, so queueing does not delay them
+
+        Returns:
+            concurrent.futures.Future: the result of the function, or None if all the worker threads are busy
+        """
+        if not self._workers.acquire(blocking=False):
+            return None
+        try:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix='HedgePolicy')
+                future = self._executor.submit(function, *args)
+        except BaseException:
+            self._workers.release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+    # END submit function
+
+    def _release(self, future):
+        self._workers.release()
+
+    def close(self):
+        """
+        Stop the worker threads
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+    # END close function
+# END HedgePolicy class
+
+class Timeouts:
+    """
+    Connect and read timeouts of the requests sent to the instance, per service function
+
+    The read timeout bounds every wait for data from the server, not the whole response;
+    to bound the total time of a call, or of a sequence of calls, use a Deadline
+
+    Example:
+        >>> autorabit.init(endpoint=url, token=token, timeout=autorabit.Timeouts(connect=5, read={'history': 600}))
+    """
+    def __init__(self, connect=TIMEOUT_CONNECT, read=None):
+        """
+        Parameters:
+            connect (float or dict): time to establish a connection, in seconds (default 10);
+                a dict sets it per service function, the services missing from it keep the default
+            read (float or dict): time to wait for data from the server, in seconds
+                (default per service function, see autorabit.TIMEOUT_READ);
+                a dict sets it per service function, the services missing from it keep the default
+                None as a value disables the timeout
+        """
+        self.connect = _per_service(connect, TIMEOUT_CONNECT)
+        self.read = _per_service(read, TIMEOUT_READ)
+    # END constructor
+
+    def get(self, service):
+        """
+        Returns:
+            tuple: (connect, read) timeout of a service function, in seconds
+        """
+        return self.connect.get(service), self.read.get(service)
+    # END get function
+# END Timeouts class
+
+def _per_service(value, default):
+    """
+    Setting of every service function, from a single value or a dict of the overridden services
+    """
+    services = READ_SERVICES + WRITE_SERVICES
+    settings = dict(default) if isinstance(default, dict) else dict.fromkeys(services, default)
+    if isinstance(value, dict):
+        settings.update(value)
+    elif value is not None:
+        settings = dict.fromkeys(services, value)
+    return settings
+# END _per_service function
+
+class Deadline:
+    """
+    Time budget of a call or of a sequence of calls, e.g. rollback_details -> rollback -> polling the rollback
+
+    Within the block, every request is sent with timeouts no longer than the time left,
+    and fails fast with RabitDeadlineError once the deadline has expired;
+    the deadline also applies to the requests sent by asyncio tasks started within the block,
+    and by the worker threads of the batch functions, iter_history, BuildWatcher,
+    RollbackPipeline and HistoryExporter for the calls made within the block
+    A nested deadline never extends the enclosing one
+
+    Example:
+        >>> with autorabit.Deadline(900):
+        >>>     for job in pipeline.run(builds):
+        >>>         print(job.projectName, job.state, job.error)
+    """
+    def __init__(self, seconds):
+        """
+        Parameters:
+            seconds (float): time budget, counted from the creation of the deadline
+        """
+        self.expires = time.monotonic() + seconds
+        self._tokens = []
+    # END constructor
+
+    @staticmethod
+    def current():
+        """
+        Returns:
+            Deadline: deadline of the running code, None if there is none
+        """
+        return _deadline.get()
+
+    @property
+    def expired(self):
+        return time.monotonic() >= self.expires
+
+    def remaining(self):
+        """
+        Returns:
+            float: time left until the deadline, in seconds
+        """
+        return max(0.0, self.expires - time.monotonic())
+
+    def check(self, error=None):
+        """
+        Parameters:
+            error (str): description of the interrupted operation
+
+        Raises:
+            RabitDeadlineError: the deadline has expired
+        """
+        if self.expired:
+            raise RabitDeadlineError('Deadline expired' if error is None else f'{error} [deadline expired]')
+    # END check function
+
+    def __enter__(self):
+        outer = _deadline.get()
+        if outer is not None:
+            self.expires = min(self.expires, outer.expires)
+        self._tokens.append(_deadline.set(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        _deadline.reset(self._tokens.pop())
+# END Deadline class
+
+def _close_abandoned(future):
+    # release the connection of the slower of two hedged requests once it is answered
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+class RateLimit:
+    """
+    Token bucket rate limit combined with a limit of requests in flight
+
+    Shared safely by threads and asyncio tasks; requests are let through in the order they arrive:
+    the tokens are handed out in order, and the requests waiting for a free slot are queued,
+    every slot released going to the request queued first
+    A request that stops waiting (e.g. its task is cancelled) gives its token back and leaves the queue
+    """
+    def __init__(self, rate=None, burst=None, max_in_flight=None):
+        """
+        Parameters:
+            rate (float): sustained number of requests per second (default None - no rate limit)
+            burst (int): number of requests that can be sent at once after an idle period (default: rate, at least 1)
+            max_in_flight (int): maximum number of concurrent requests (default None - no limit)
+        """
+        if rate is not None and rate <= 0:
+            raise RabitError('Please provide a positive rate limit')
+        self.rate = rate
+        self.burst = max(1, burst if burst is not None else int(rate or 1))
+        self.max_in_flight = max_in_flight
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._in_flight = 0
+        self._waiters = collections.deque()
+        self._lock = threading.Lock()
+    # END constructor
+
+    def acquire(self, deadline=None):
+        """
+        Block until a request can be sent
+
+        Parameters:
+            deadline (Deadline): optional
+                deadline of the request; the wait gives up when it expires
+
+        Raises:
+            RabitDeadlineError: the deadline expires before the request can be sent
+        """
+        delay = self._reserve()
+        if delay > 0:
+            self._check_deadline(deadline, delay)
+            try:
+                time.sleep(delay)
+            except BaseException:
+                self._refund()
+                raise
+        if self.max_in_flight is None:
+            return
+        admitted = threading.Event()
+        waiter = self._enter(admitted.set)
+        if waiter is None:
+            return
+        try:
+            if not admitted.wait(None if deadline is None else deadline.remaining()):
+                raise RabitDeadlineError('Deadline expired while waiting for the rate limit')
+        except BaseException:
+            self._leave(waiter)
+            raise
+    # END acquire function
+
+    async def acquire_async(self, deadline=None):
+        """
+        Wait until a request can be sent, without blocking the event loop
+
+        Parameters:
+            deadline (Deadline): optional
+                deadline of the request; the wait gives up when it expires
+
+        Raises:
+            RabitDeadlineError: the deadline expires before the request can be sent
+        """
+        delay = self._reserve()
+        if delay > 0:
+            self._check_deadline(deadline, delay)
+            try:
+                await asyncio.sleep(delay)
+            except BaseException:
+                self._refund()
+                raise
+        if self.max_in_flight is None:
+            return
+        loop = asyncio.get_running_loop()
+        admitted = loop.create_future()
+        waiter = self._enter(lambda: loop.call_soon_threadsafe(_admit, admitted))
+        if waiter is None:
+            return
+        try:
+            if deadline is None:
+                await admitted
+            else:
+                await asyncio.wait_for(admitted, deadline.remaining())
+        except asyncio.TimeoutError:
+            self._leave(waiter)
+            raise RabitDeadlineError('Deadline expired while waiting for the rate limit') from None
+        except BaseException:
+            self._leave(waiter)
+            raise
+    # END acquire_async function
+
+    def release(self):
+        """
+        Mark a request acquired with acquire() or acquire_async() as finished
+        """
+        if self.max_in_flight is None:
+            return
+        with self._lock:
+            self._hand_over()
+    # END release function
+
+    def _reserve(self):
+        """
+        Take a token from the bucket, going into debt if it is empty
+
+        Returns:
+            float: time to wait until the token is available, in seconds
+        """
+        if self.rate is None:
+            return 0
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0
+            return -self._tokens / self.rate
+    # END _reserve function
+
+    def _check_deadline(self, deadline, delay):
+        """
+        Give the token back and fail fast if the deadline expires before it is available
+        """
+        if deadline is not None and delay >= deadline.remaining():
+            self._refund()
+            raise RabitDeadlineError('Deadline expired while waiting for the rate limit')
+    # END _check_deadline function
+
+    def _refund(self):
+        """
+        Give back a token taken by a request that was not sent
+        """
+        if self.rate is None:
+            return
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.burst, self._tokens + 1)
+    # END _refund function
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    # END _refill function
+
+    def _enter(self, wake):
+        """
+        Take a free slot, or queue up for one
+
+        Parameters:
+            wake (callable): called, from any thread, when a slot is handed over to the queued request
+
+        Returns:
+            _SlotWaiter: the queued request, None if a slot was taken at once
+        """
+        with self._lock:
+            if not self._waiters and self._in_flight < self.max_in_flight:
+                self._in_flight += 1
+                return None
+            waiter = _SlotWaiter(wake)
+            self._waiters.append(waiter)
+            return waiter
+    # END _enter function
+
+    def _leave(self, waiter):
+        """
+        Stop waiting for a slot; a slot already handed over to the request is passed on to the next one
+        """
+        with self._lock:
+            if waiter.admitted:
+                self._hand_over()
+            else:
+                self._waiters.remove(waiter)
+    # END _leave function
+
+    def _hand_over(self):
+        """
+        Pass the slot of a finished request to the request queued first, or free it; called with the lock held
+        """
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            waiter.admitted = True
+            try:
+                waiter.wake()
+                return
+            except RuntimeError:
+                # the event loop of the queued request is closed
+                continue
+        self._in_flight -= 1
+    # END _hand_over function
+# END RateLimit class
+
+class _SlotWaiter:
+    """
+    Request queued for an in-flight slot of a RateLimit
+    """
+    __slots__ = ('wake', 'admitted')
+
+    def __init__(self, wake):
+        self.wake = wake
+        self.admitted = False
+# END _SlotWaiter class
+
+def _admit(future):
+    if not future.done():
+        future.set_result(None)
+# END _admit function
+
+class RateLimiter:
+    """
+    Client-side rate and concurrency limits for an AutoRABIT instance,
+    with separate budgets for the read services (poll, history, rollback_details, rollback_history)
+    and the write services (trigger, update, quick_deploy, rollback)
+
+    Example:
+        >>> autorabit.init(endpoint=url, token=token, rate_limit=autorabit.RateLimiter(
+        >>>     reads=autorabit.RateLimit(rate=20, max_in_flight=10),
+        >>>     writes=autorabit.RateLimit(rate=1, burst=5)))
+    """
+    def __init__(self, reads=None, writes=None):
+        """
+        Parameters:
+            reads (RateLimit): limits of the read services (default None - no limits)
+            writes (RateLimit): limits of the write services (default None - no limits)
+        """
+        self.reads = reads
+        self.writes = writes
+    # END constructor
+
+    def limit(self, service):
+        """
+        Returns:
+            RateLimit: limits applying to a service function, None if it is not limited
+        """
+        return self.writes if service in WRITE_SERVICES else self.reads
+    # END limit function
+# END RateLimiter class
+
+class RequestEvent(collections.namedtuple('RequestEvent', [
+        'service', 'method', 'url', 'status', 'duration', 'request_bytes', 'response_bytes', 'retries', 'error'])):
+    """
+    Record of a single service request, passed to the Metrics callbacks
+
+    Attributes:
+        service (str): name of the service function
+        method (str): HTTP method
+        url (str): URL of the request
+        status (int): HTTP status of the last response, None if no response was received
+        duration (float): time spent on the request, including all retries, in seconds
+        request_bytes (int): size of the request body
+        response_bytes (int): size of the body of the last response
+        retries (int): number of retried attempts
+        error (str): class name of the exception raised by the service function, None if it succeeded
+    """
+    __slots__ = ()
+# END RequestEvent class
+
+class Metrics:
+    """
+    In-memory registry of request metrics
+
+    Records, per service function, a latency histogram and counters of requests by HTTP status,
+    errors by exception class, retries and transferred bytes;
+    every request is also passed as a RequestEvent to the registered callbacks
+
+    Example:
+        >>> autorabit.init(endpoint=url, token=token, metrics=True)
+        >>> autorabit.metrics_registry.add_callback(lambda event: print(event.service, event.duration))
+        >>> print(autorabit.metrics_registry.prometheus())
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS, callbacks=None, prefix='autorabit'):
+        """
+        Parameters:
+            buckets (list): upper bounds of the latency histogram buckets, in seconds
+            callbacks (list): callables called with a RequestEvent for every request
+            prefix (str): prefix of the metric names in the Prometheus output (default autorabit)
+        """
+        self.buckets = sorted(buckets)
+        self.prefix = prefix
+        self._callbacks = list(callbacks or [])
+        self._lock = threading.Lock()
+        self.reset()
+    # END constructor
+
+    def add_callback(self, callback):
+        """
+        Register a callable to be called with a RequestEvent for every request
+        """
+        self._callbacks.append(callback)
+    # END add_callback function
+
+    def remove_callback(self, callback):
+        """
+        Unregister a callable registered with add_callback
+        """
+        self._callbacks.remove(callback)
+    # END remove_callback function
+
+    def record(self, event):
+        """
+        Record a single request
+
+        Parameters:
+            event (RequestEvent): the request to be recorded
+        """
+        service = event.service
+        with self._lock:
+            histogram = self._latency.get(service)
+            if histogram is None:
+                histogram = self._latency[service] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect.bisect_left(self.buckets, event.duration)
+            if index < len(self.buckets):
+                histogram[0][index] += 1
+            histogram[1] += event.duration
+            histogram[2] += 1
+            self._requests[(service, str(event.status))] += 1
+            if event.error is not None:
+                self._errors[(service, event.error)] += 1
+            self._retries[service] += event.retries
+            self._request_bytes[service] += event.request_bytes
+            self._response_bytes[service] += event.response_bytes
+        for callback in self._callbacks:
+            callback(event)
+    # END record function
+
+    def reset(self):
+        """
+        Drop all recorded metrics
+        """
+        with self._lock:
+            self._latency = {}
+            self._requests = collections.Counter()
+            self._errors = collections.Counter()
+            self._retries = collections.Counter()
+            self._request_bytes = collections.Counter()
+            self._response_bytes = collections.Counter()
+    # END reset function
+
+    def percentile(self, service, quantile):
+        """
+        Estimate a latency percentile of a service function from its histogram
+
+        Parameters:
+            service (str): name of the service function
+            quantile (float): quantile between 0 and 1, e.g. 0.95
+
+        Returns:
+            float: upper bound of the bucket holding the percentile, in seconds;
+                   None if no requests were recorded or the percentile is above the last bucket
+        """
+        with self._lock:
+            histogram = self._latency.get(service)
+            if histogram is None or histogram[2] == 0:
+                return None
+            rank = quantile * histogram[2]
+            seen = 0
+            for bound, count in zip(self.buckets, histogram[0]):
+                seen += count
+                if seen >= rank:
+                    return bound
+        return None
+    # END percentile function
+
+    def summary(self):
+        """
+        Summarize the recorded latencies
+
+        Returns:
+            dict: for every service function, the number of requests, their mean duration
+                  and the estimated p50, p95 and p99, in seconds
+        """
+        with self._lock:
+            totals = {service: (total, count) for service, (_, total, count) in self._latency.items()}
+        return {
+            service: {
+                'requests': count,
+                'mean': total / count if count else None,
+                'p50': self.percentile(service, 0.5),
+                'p95': self.percentile(service, 0.95),
+                'p99': self.percentile(service, 0.99)
+            }
+            for service, (total, count) in sorted(totals.items())
+        }
+    # END summary function
+
+    def prometheus(self):
+        """
+        Dump the recorded metrics in the Prometheus text exposition format
+
+        Returns:
+            str: the metrics
+        """
+        name = self.prefix
+        lines = [
+            f'# HELP {name}_request_duration_seconds Duration of AutoRABIT service requests, including retries',
+            f'# TYPE {name}_request_duration_seconds histogram'
+        ]
+        with self._lock:
+            for service, (counts, total, count) in sorted(self._latency.items()):
+                cumulative = 0
+                for bound, bucket in zip(self.buckets, counts):
+                    cumulative += bucket
+                    lines.append(f'{name}_request_duration_seconds_bucket{{service="{service}",le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_request_duration_seconds_bucket{{service="{service}",le="+Inf"}} {count}')
+                lines.append(f'{name}_request_duration_seconds_sum{{service="{service}"}} {total}')
+                lines.append(f'{name}_request_duration_seconds_count{{service="{service}"}} {count}')
+            counters = [
+                ('requests_total', 'AutoRABIT service requests by HTTP status', self._requests, ('service', 'status')),
+                ('request_errors_total', 'Failed AutoRABIT service requests by exception class', self._errors, ('service', 'error')),
+                ('request_retries_total', 'Retried attempts of AutoRABIT service requests', self._retries, ('service',)),
+                ('request_bytes_total', 'Bytes sent in AutoRABIT request bodies', self._request_bytes, ('service',)),
+                ('response_bytes_total', 'Bytes received in AutoRABIT response bodies', self._response_bytes, ('service',))
+            ]
+            for metric, description, counter, labels in counters:
+                lines.append(f'# HELP {name}_{metric} {description}')
+                lines.append(f'# TYPE {name}_{metric} counter')
+                for key, value in sorted(counter.items()):
+                    values = key if isinstance(key, tuple) else (key,)
+                    label_text = ','.join(f'{label}="{value_}"' for label, value_ in zip(labels, values))
+                    lines.append(f'{name}_{metric}{{{label_text}}} {value}')
+        return '\n'.join(lines) + '\n'
+    # END prometheus function
+# END Metrics class
+
+class _Trace:
+    """
+    Collects the details of a single service request for the metrics
+    """
+    __slots__ = ('service', 'method', 'url', 'kwargs', 'started', 'attempts', 'response', 'response_bytes', 'error')
+
+    def __init__(self, service, method, url, kwargs):
+        self.service = service
+        self.method = method
+        self.url = url
+        self.kwargs = kwargs
+        self.started = time.perf_counter()
+        self.attempts = 0
+        self.response = None
+        self.response_bytes = None
+        self.error = None
+
+    def event(self):
+        response = self.response
+        request_bytes = 0
+        response_bytes = self.response_bytes
+        if response_bytes is None:
+            response_bytes = 0 if response is None else len(response.content)
+        body = getattr(getattr(response, 'request', None), 'body', None)
+        if body is not None:
+            request_bytes = len(body)
+        elif self.kwargs.get('json') is not None:
+            request_bytes = len(json.dumps(self.kwargs['json']).encode())
+        return RequestEvent(
+            self.service,
+            self.method,
+            self.url,
+            None if response is None else response.status_code,
+            time.perf_counter() - self.started,
+            request_bytes,
+            response_bytes,
+            max(0, self.attempts - 1),
+            None if self.error is None else type(self.error).__name__
+        )
+# END _Trace class
+
+class JSONStream:
+    """
+    Iterator over the elements of a JSON array held under a key of a response body,
+    decoding the body incrementally as it is received
+
+    Only the current chunk of the body and the current element are held in memory at once
+
+    Attributes:
+        key (str): key of the array in the response body
+        items (int): number of elements yielded so far
+        bytes_read (int): number of body bytes received so far
+        peak_memory (int): peak memory allocated while decoding, in bytes;
+            available once the stream is exhausted or closed, if requested with measure_memory
+    """
+    def __init__(self, chunks, key, measure_memory=False, on_close=None):
+        """
+        Parameters:
+            chunks (iterable): bytes chunks of the response body
+            key (str): key of the array in the response body
+            measure_memory (bool): trace the memory allocated while decoding (default False);
+                note memory tracing is process-wide, so concurrent work is included in the peak
+            on_close (callable): called with the stream and the exception raised (or None) when it is closed
+        """
+        self.key = key
+        self.items = 0
+        self.bytes_read = 0
+        self.peak_memory = None
+        self._on_close = on_close
+        self._memory = _MemoryProbe() if measure_memory else None
+        self._elements = iter(_ArrayDecoder(self._read(chunks), key))
+        self._closed = False
+    # END constructor
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            element = next(self._elements)
+        except StopIteration:
+            self.close()
+            raise
+        except Exception as e:
+            self.close(error=e)
+            raise
+        self.items += 1
+        return element
+    # END __next__ function
+
+    def close(self, error=None):
+        """
+        Stop decoding and release the connection
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._elements.close()
+        if self._memory is not None:
+            self.peak_memory = self._memory.stop()
+        if self._on_close is not None:
+            self._on_close(self, error)
+    # END close function
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _read(self, chunks):
+        for chunk in chunks:
+            self.bytes_read += len(chunk)
+            yield chunk
+# END JSONStream class
+
+class _MemoryProbe:
+    """
+    Measures the peak memory allocated between its creation and stop(), using tracemalloc
+    """
+    _lock = threading.Lock()
+    _active = 0
+
+    def __init__(self):
+        import tracemalloc
+        with _MemoryProbe._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _MemoryProbe._owner = True
+            elif _MemoryProbe._active == 0:
+                _MemoryProbe._owner = False
+            _MemoryProbe._active += 1
+            tracemalloc.reset_peak()
+            self._base = tracemalloc.get_traced_memory()[0]
+
+    def stop(self):
+        import tracemalloc
+        with _MemoryProbe._lock:
+            peak = tracemalloc.get_traced_memory()[1] - self._base
+            _MemoryProbe._active -= 1
+            if _MemoryProbe._active == 0 and _MemoryProbe._owner:
+                tracemalloc.stop()
+        return max(0, peak)
+# END _MemoryProbe class
+
+def set_json_backend(backend=None):
+    """
+    Select the JSON library used to decode response bodies
+
+    Parameters:
+        backend (str or callable): 'orjson', 'ujson' or 'json', or a function decoding bytes;
+            if not provided, the fastest installed library is selected (see autorabit.JSON_BACKENDS)
+
+    Raises:
+        RabitError: the requested library is not installed
+
+    Returns:
+        str: name of the selected backend
+    """
+    global _json_loads
+    global _json_backend
+    if callable(backend):
+        _json_loads = backend
+        _json_backend = getattr(backend, '__module__', None) or repr(backend)
+        return _json_backend
+    for name in ([backend] if backend is not None else JSON_BACKENDS):
+        try:
+            module = importlib.import_module(name)
+        except ImportError:
+            if backend is not None:
+                raise RabitError(f'JSON backend {backend} is not installed')
+            continue
+        _json_loads = module.loads
+        _json_backend = name
+        return name
+    raise RabitError(f'Unknown JSON backend {backend}')
+# END set_json_backend function
+
+class _ArrayDecoder:
+    """
+    Incremental decoder yielding the elements of the JSON array under a top-level key
+
+    Relies on the C-accelerated json.JSONDecoder.raw_decode to decode one element at a time
+    from a text buffer which is refilled with the next chunk whenever an element is incomplete
+    """
+    def __init__(self, chunks, key):
+        self._chunks = iter(chunks)
+        self._key = key
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def __iter__(self):
+        self._expect('{')
+        while True:
+            char = self._peek()
+            if '}' == char:
+                raise RabitStatusError(f'{self._key} is missing from the response body')
+            if ',' == char:
+                self._pos += 1
+                continue
+            key = self._value()
+            self._expect(':')
+            if key != self._key:
+                # skip the values of the other keys
+                self._value()
+                continue
+            self._expect('[')
+            while True:
+                char = self._peek()
+                if ']' == char:
+                    return
+                if ',' == char:
+                    self._pos += 1
+                    continue
+                yield self._value()
+    # END __iter__ function
+
+    def _fill(self):
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            text = self._text.decode(b'', final=True)
+            self._eof = True
+        else:
+            text = self._text.decode(chunk)
+        # drop the consumed part of the buffer
+        self._buffer = self._buffer[self._pos:] + text
+        self._pos = 0
+    # END _fill function
+
+    def _peek(self):
+        while True:
+            match = _NON_WHITESPACE.search(self._buffer, self._pos)
+            if match is not None:
+                self._pos = match.start()
+                return self._buffer[self._pos]
+            if self._eof:
+                raise RabitStatusError('Unexpected end of the response body')
+            self._pos = len(self._buffer)
+            self._fill()
+    # END _peek function
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise RabitStatusError(f'Malformed response body, expected {char!r} at {self._buffer[self._pos:self._pos + 20]!r}')
+        self._pos += 1
+    # END _expect function
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError as e:
+                if self._eof:
+                    raise RabitStatusError(f'Malformed response body [{e}]') from e
+                self._fill()
+                continue
+            # a value ending with the buffer (e.g. a number) may continue in the next chunk
+            if end < len(self._buffer) or self._eof:
+                self._pos = end
+                return value
+            self._fill()
+    # END _value function
+# END _ArrayDecoder class
+
+_NON_WHITESPACE = re.compile(r'[^ \t\n\r]')
+
+class ResponseCache:
+    """
+    In-process cache for the responses of the read services
+
+    Cached responses expire after a per-service time to live and the least recently used ones
+    are evicted when the cache is full; concurrent identical requests are coalesced into one
+    request whose result is shared. Results of finished builds requested by build number
+    (poll, history) never change and are kept until evicted or invalidated.
+    Successful write services (trigger, rollback, ...) invalidate the cached responses of their CI Job
+
+    A single cache can be shared by many sync and async service handlers
+
+    Every caller gets its own copy of the cached result, so it can be modified freely
+    """
+    def __init__(self, ttl=None, maxsize=CACHE_MAXSIZE, terminal_ttl=None):
+        """
+        Parameters:
+            ttl (dict): optional
+                time to live of the cached responses per service function, in seconds;
+                overrides autorabit.CACHE_TTL; a service mapped to None is not cached
+            maxsize (int):
+                maximum number of cached responses (default 1024)
+            terminal_ttl (float):
+                time to live of the results of finished builds, in seconds (default None - no expiry)
+        """
+        self._ttl = dict(CACHE_TTL)
+        if ttl is not None:
+            self._ttl.update(ttl)
+        self._maxsize = maxsize
+        self._terminal_ttl = terminal_ttl
+        self._entries = collections.OrderedDict()
+        self._in_flight = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+    # END constructor
+
+    def get_or_call(self, service, key, call, pinned=False, terminal=None):
+        """
+        Get a cached result, or call the service and cache its result
+
+        Parameters:
+            service (str): name of the service function
+            key (tuple): cache key of the request
+            call (callable): sends the request and returns the parsed result
+            pinned (bool): the request is for specific builds
+            terminal (callable): optional
+                checks if a result describes only finished builds, for results other than the parsed ones
+
+        Returns:
+            a copy of the (cached) result
+        """
+        if self._ttl.get(service) is None:
+            return call()
+        flight, leader = self._lookup(key)
+        if not leader:
+            return copy.deepcopy(flight.result())
+        generation = self._generation
+        try:
+            result = call()
+        except BaseException as e:
+            self._land(key, flight, error=e)
+            raise
+        self._land(key, flight, service, result, pinned, generation, terminal=terminal)
+        return result
+    # END get_or_call function
+
+    async def aget_or_call(self, service, key, call, pinned=False, terminal=None):
+        """
+        Awaitable version of get_or_call, for a coroutine function `call`
+        """
+        if self._ttl.get(service) is None:
+            return await call()
+        flight, leader = self._lookup(key)
+        if not leader:
+            # shielded, so a cancelled caller does not cancel the request shared with the others
+            return copy.deepcopy(await asyncio.shield(asyncio.wrap_future(flight)))
+        generation = self._generation
+        try:
+            result = await call()
+        except BaseException as e:
+            self._land(key, flight, error=e)
+            raise
+        self._land(key, flight, service, result, pinned, generation, terminal=terminal)
+        return result
+    # END aget_or_call function
+
+    def invalidate(self, projectName=None):
+        """
+        Drop the cached responses of a CI Job
+
+        Parameters:
+            projectName (str): name of the CI Job; if not provided, the whole cache is cleared
+        """
+        with self._lock:
+            self._generation += 1
+            if projectName is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[1] == projectName]:
+                del self._entries[key]
+    # END invalidate function
+
+    def clear(self):
+        """
+        Drop all cached responses
+        """
+        self.invalidate()
+    # END clear function
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _lookup(self, key):
+        """
+        Find a fresh cached result or an identical request in flight
+
+        Returns:
+            tuple: (Future, bool) future of the result, and whether the caller has to send the request
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                result, expires = entry
+                if expires is None or time.monotonic() < expires:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    flight = Future()
+                    flight.set_result(result)
+                    return flight, False
+                del self._entries[key]
+            flight = self._in_flight.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                return flight, False
+            self.misses += 1
+            flight = self._in_flight[key] = Future()
+            return flight, True
+    # END _lookup function
+
+    def _land(self, key, flight, service=None, result=None, pinned=False, generation=None, error=None,
+              terminal=None):
+        """
+        Store the result of a request and hand it over to the coalesced callers
+        """
+        with self._lock:
+            if error is None and generation == self._generation:
+                ttl = self._ttl[service]
+                if pinned and (_is_terminal(service, result) if terminal is None else terminal(result)):
+                    ttl = self._terminal_ttl
+                expires = None if ttl is None else time.monotonic() + ttl
+                self._entries[key] = (copy.deepcopy(result), expires)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self._maxsize:
+                    self._entries.popitem(last=False)
+            del self._in_flight[key]
+        if flight.done():
+            return
+        if error is None:
+            flight.set_result(result)
+        else:
+            flight.set_exception(error)
+    # END _land function
+# END ResponseCache class
+
+def _cache_key(service, project, endpoint, kwargs):
+    return (service, project, endpoint, tuple(sorted((kwargs.get('params') or {}).items())))
+
+def _is_terminal(service, result):
+    """
+    Check if the result of a read service describes only finished builds
+    """
+    if service == 'poll':
+        return (result.get('status') != STATUS_INPROGRESS
+                and result.get('rollbackstatus') != STATUS_INPROGRESS)
+    if service == 'history':
+        return all(build.get('overAllStatus') != STATUS_INPROGRESS for build in result)
+    return False
+# END _is_terminal function
+
+class RabitGateway:
+    """
+    Local caching HTTP gateway to an AutoRABIT instance, shared by many processes on the same host
+
+    Serves the cijobs v1 paths (/api/cijobs/v1/*) of the instance: read requests are answered from
+    a shared ResponseCache, with identical concurrent requests coalesced into a single upstream request,
+    and write requests are forwarded over the pooled connections of the client
+    (with its retry policy, timeouts and rate limits) and invalidate the cached responses of their CI Job;
+    clients have to present the token of the gateway client
+
+    Statistics are served as JSON at /gateway/stats and in the Prometheus text format at /gateway/metrics,
+    to clients presenting the token as well, unless public_stats is set
+
+    Example:
+        >>> with autorabit.RabitGateway(autorabit.RabitClient(endpoint=url, token=token)) as gateway:
+        >>>     gateway.serve_forever()
+        then, in every CI agent process:
+        >>> autorabit.init(endpoint='http://127.0.0.1:8700', token=token)
+    """
+    def __init__(self, client=None, host=GATEWAY_HOST, port=GATEWAY_PORT, cache=None, public_stats=False):
+        """
+        Parameters:
+            client (RabitClient): optional
+                client of the AutoRABIT instance to forward the requests to;
+                if not provided, the default client set up by init() will be used
+            host (str): address to listen on (default 127.0.0.1)
+            port (int): port to listen on (default 8700, 0 - any free port)
+            cache (ResponseCache): optional
+                cache for the responses of the read services (default: a new cache with the default settings)
+            public_stats (bool): serve /gateway/stats and /gateway/metrics without the token (default False),
+                e.g. to a metrics scraper; they reveal the names of the services used and the request rates
+
+        Raises:
+            RabitError: client is not provided and init() was not called
+        """
+        if client is None:
+            client = _default_client
+        if client is None:
+            raise RabitError('Please call autorabit.init() or provide a RabitClient')
+        self._client = client
+        self.public_stats = public_stats
+        self.cache = cache if cache is not None else ResponseCache()
+        # the latency of the upstream requests is recorded even if the client has no metrics registry
+        self.metrics = client.metrics if client.metrics is not None else Metrics()
+        self._service = CIJobService(client=client, cache=self.cache, metrics=self.metrics)
+        self.requests = collections.Counter()
+        self._lock = threading.Lock()
+        self._server = _gateway_server(self, (host, port))
+        self._serving = False
+        self._thread = None
+    # END constructor
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        """
+        Serve the requests from a background thread
+
+        Returns:
+            RabitGateway: the gateway
+        """
+        self._serving = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name='RabitGateway', daemon=True)
+        self._thread.start()
+        return self
+    # END start function
+
+    def serve_forever(self):
+        """
+        Serve the requests until close() is called from another thread or the process is interrupted
+        """
+        self._serving = True
+        self._server.serve_forever()
+    # END serve_forever function
+
+    def close(self):
+        """
+        Stop serving and close the listening socket; the client is not closed
+        """
+        if self._serving:
+            self._server.shutdown()
+            self._serving = False
+        self._server.server_close()
+    # END close function
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def stats(self):
+        """
+        Returns:
+            dict: requests served per service function, cache hits, misses and coalesced requests,
+                and the number and latency of the requests sent upstream per service function
+        """
+        with self._lock:
+            requests_served = dict(self.requests)
+        return {
+            'requests': requests_served,
+            'cache': {
+                'entries': len(self.cache),
+                'hits': self.cache.hits,
+                'misses': self.cache.misses,
+                'coalesced': self.cache.coalesced
+            },
+            'upstream': self.metrics.summary()
+        }
+    # END stats function
+
+    def _respond(self, method, path, token, body):
+        """
+        Answer a single request to the gateway
+
+        Returns:
+            _GatewayResponse: HTTP status, body and headers of the response
+        """
+        url = urllib.parse.urlsplit(path)
+        authorized = token is not None and hmac.compare_digest(token.encode(), self._client.token.encode())
+        if 'GET' == method and url.path in ('/gateway/stats', '/gateway/metrics'):
+            if not (authorized or self.public_stats):
+                return _gateway_json(401, {'status': 'Unauthorized'})
+            if '/gateway/stats' == url.path:
+                return _gateway_json(200, self.stats())
+            return _GatewayResponse(200, self.metrics.prometheus().encode(), {'Content-Type': 'text/plain; version=0.0.4'})
+        route = _gateway_route(method, url.path, url.query)
+        if route is None:
+            return _gateway_json(404, {'status': 'Not Found'})
+        if not authorized:
+            return _gateway_json(401, {'status': 'Unauthorized'})
+        service, projectName, pinned = route
+        upstream = f'{self._service._url}/{url.path[len(GATEWAY_PREFIX):]}'
+        if url.query:
+            upstream += f'?{url.query}'
+        with self._lock:
+            self.requests[service] += 1
+        try:
+            if service in READ_SERVICES:
+                # the query string is part of the URL, the key never matches the keys of the service handlers
+                return self.cache.get_or_call(
+                    service, (service, projectName, upstream, None),
+                    lambda: self._fetch(service, 'GET', upstream),
+                    pinned, terminal=lambda response: _is_terminal_body(service, response.content)
+                )
+            try:
+                payload = _json_loads(body) if body else None
+            except ValueError:
+                return _gateway_json(400, {'status': 'Bad Request'})
+            if projectName is None and isinstance(payload, dict):
+                projectName = payload.get('projectName')
+            response = self._fetch(service, 'POST', upstream, json=payload)
+            self.cache.invalidate(projectName)
+            return response
+        except RabitStatusError as e:
+            response = e.args[0] if e.args else None
+            if isinstance(response, requests.Response):
+                return _gateway_response(response)
+            return _gateway_json(502, {'status': 'Bad Gateway', 'error': str(e)})
+        except RabitCircuitOpenError as e:
+            return _gateway_json(503, {'status': 'Service Unavailable', 'error': str(e)})
+        except RabitError as e:
+            return _gateway_json(502, {'status': 'Bad Gateway', 'error': str(e)})
+    # END _respond function
+
+    def _fetch(self, service, method, url, **kwargs):
+        """
+        Send a request upstream, recording it in the metrics
+
+        Raises:
+            RabitStatusError:
+                HTTP status other than 20X was returned
+            RabitConnectError:
+                the request could not be completed
+        """
+        trace = _Trace(service, method, url, kwargs)
+        try:
+            response = self._service._request(service, method, url, f'Cannot forward {service} request',
+                                              trace=trace, **kwargs)
+            return _gateway_response(response)
+        except Exception as e:
+            trace.error = e
+            raise
+        finally:
+            self.metrics.record(trace.event())
+    # END _fetch function
+# END RabitGateway class
+
+class _GatewayResponse(collections.namedtuple('_GatewayResponse', ['status', 'content', 'headers'])):
+    __slots__ = ()
+
+def _gateway_response(response):
+    headers = {'Content-Type': response.headers.get('Content-Type', 'application/json')}
+    if 'Retry-After' in response.headers:
+        headers['Retry-After'] = response.headers['Retry-After']
+    return _GatewayResponse(response.status_code, response.content, headers)
+
+def _gateway_json(status, body):
+    return _GatewayResponse(status, json.dumps(body).encode(), {'Content-Type': 'application/json'})
+
+def _gateway_route(method, path, query):
+    """
+    Service function, CI Job and pinning of a cijobs v1 request, as sent by the service handlers
+
+    Returns:
+        tuple: (service, projectName, pinned); projectName of trigger, update and rollback is in the body;
+            None if the request is not a cijobs v1 request
+    """
+    if not path.startswith(GATEWAY_PREFIX):
+        return None
+    parts = [urllib.parse.unquote(part) for part in path[len(GATEWAY_PREFIX):].split('/')]
+    name, arguments = parts[0], [part for part in parts[1:] if part]
+    projectName = arguments[0] if arguments else None
+    if 'POST' == method:
+        service = GATEWAY_WRITE_PATHS.get(name)
+        if service is None:
+            return None
+        return service, projectName if 'quick_deploy' == service else None, False
+    if 'pollstatus' == name:
+        return 'poll', projectName, 1 < len(arguments)
+    if 'history' == name:
+        try:
+            build_to = int(urllib.parse.parse_qs(query).get('to', ['-1'])[0])
+        except ValueError:
+            build_to = -1
+        return 'history', projectName, build_to >= 0
+    if 'rollback' == name and 'history' == projectName:
+        return 'rollback_history', arguments[1] if 1 < len(arguments) else None, False
+    if 'rollback' == name:
+        return 'rollback_details', projectName, False
+    return None
+# END _gateway_route function
+
+def _is_terminal_body(service, content):
+    """
+    Check if the JSON body of a read response describes only finished builds
+    """
+    try:
+        result = _json_loads(content)
+        if 'history' == service:
+            result = _parse_history(result)
+        return _is_terminal(service, result)
+    except (RabitError, ValueError, TypeError, AttributeError):
+        return False
+# END _is_terminal_body function
+
+def _gateway_server(gateway, address):
+    """
+    Threading HTTP server of a RabitGateway
+    """
+    # imported here, so that importing the module does not pay for it
+    import http.server
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            self._handle('GET')
+
+        def do_POST(self):
+            self._handle('POST')
+
+        def _handle(self, method):
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length) if length else b''
+            status, content, headers = gateway._respond(method, self.path, self.headers.get('token'), body)
+            lines = [f'HTTP/1.1 {status} {self.responses.get(status, ("",))[0]}', f'Content-Length: {len(content)}']
+            lines.extend(f'{name}: {value}' for name, value in headers.items())
+            if self.close_connection:
+                lines.append('Connection: close')
+            # send the head and the body in a single write, to avoid delayed ACK stalls
+            self.wfile.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + content)
+
+        def log_message(self, *args):
+            pass
+
+    class Server(http.server.ThreadingHTTPServer):
+        daemon_threads = True
+        # a deep listen backlog, so bursts of new connections from many agents are not dropped
+        request_queue_size = GATEWAY_BACKLOG
+
+    return Server(address, Handler)
+# END _gateway_server function
+
+class HistoryStore:
+    """
+    Local SQLite store of CI Job build history
+
+    Builds are keyed by AutoRABIT instance, CI Job and build number;
+    sync() only downloads the builds newer than the stored ones
+    and refreshes the builds that were still in progress,
+    and all queries are answered from the local database
+
+    Example:
+        >>> with autorabit.HistoryStore('history.db') as store:
+        >>>     store.sync(job)
+        >>>     print(store.status_counts(job))
+    """
+    def __init__(self, path, service=None, instance=None):
+        """
+        Parameters:
+            path (str): location of the SQLite database file (':memory:' for a temporary store)
+            service (CIJobService): optional
+                service handler to sync with; if not provided, autorabit.cijobs will be used
+            instance (str): optional
+                key of the AutoRABIT instance in the store; defaults to the endpoint of the service
+        """
+        import sqlite3
+        self._service = service
+        self._instance = instance
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute(_HISTORY_SCHEMA)
+    # END constructor
+
+    @property
+    def service(self):
+        service = self._service if self._service is not None else globals().get('cijobs')
+        if service is None:
+            raise RabitError('Please call autorabit.init() before syncing the HistoryStore')
+        return service
+
+    @property
+    def instance(self):
+        if self._instance is not None:
+            return self._instance
+        return self.service._endpoint
+
+    def sync(self, projectName=None, chunk_size=HISTORY_CHUNK_SIZE):
+        """
+        Download the builds of a CI Job missing from the store
+
+        Requests the builds above the highest stored build number,
+        plus the stored builds which were still in progress
+
+        Parameters:
+            projectName (str):
+                name of the CI Job to be synced
+            chunk_size (int):
+                maximum number of builds requested at once (default 100)
+
+        Raises:
+            RabitError:
+                required parameter is missing
+            RabitStatusError:
+                an unexpected response is received from AutoRABIT
+            RabitConnectError:
+                HTTPError was raised due to HTTP request failing (status other then 20X)
+
+        Returns:
+            int: number of builds added or updated
+        """
+        if projectName is None:
+            raise RabitError('Please provide a valid AutoRABIT Project')
+        service = self.service
+        instance = self.instance
+        with self._lock:
+            high_water_mark = self._scalar(
+                'SELECT MAX(build_number) FROM builds WHERE instance = ? AND project = ?',
+                (instance, projectName))
+            in_progress = [row[0] for row in self._db.execute(
+                'SELECT build_number FROM builds WHERE instance = ? AND project = ? AND status = ?',
+                (instance, projectName, STATUS_INPROGRESS))]
+        synced = 0
+        # refresh the builds which were not finished at the last sync
+        for buildNumber in in_progress:
+            synced += self._save(instance, projectName,
+                                 service.history(projectName=projectName, buildNumber=buildNumber))
+        # fetch the new builds
+        latest = _latest_build_number(service.poll(projectName=projectName))
+        first = (high_water_mark or 0) + 1
+        if first <= latest:
+            chunk = []
+            for build in service.iter_history(projectName, first, latest, chunk_size=chunk_size):
+                chunk.append(build)
+                if len(chunk) >= chunk_size:
+                    synced += self._save(instance, projectName, chunk)
+                    chunk = []
+            synced += self._save(instance, projectName, chunk)
+        return synced
+    # END sync function
+
+    def high_water_mark(self, projectName):
+        """
+        Returns:
+            int: highest build number of a CI Job in the store, None if no builds are stored
+        """
+        with self._lock:
+            return self._scalar(
+                'SELECT MAX(build_number) FROM builds WHERE instance = ? AND project = ?',
+                (self.instance, projectName))
+    # END high_water_mark function
+
+    def history(self, projectName, build_from=-1, build_to=-1):
+        """
+        Stored history of a range of builds of a given CI Job
+
+        Parameters:
+            projectName (str): name of the CI Job
+            build_from (int): first build number to include; if not provided, the first stored build is used
+            build_to (int): last build number to include; if not provided, the last stored build is used
+
+        Returns:
+            list: ciJobHistoryList elements of the stored builds, ordered by build number
+        """
+        rows = self._query(
+            'SELECT data FROM builds', projectName, build_from, build_to, 'ORDER BY build_number')
+        return [json.loads(row[0]) for row in rows]
+    # END history function
+
+    def durations(self, projectName, build_from=-1, build_to=-1):
+        """
+        Durations of the stored finished builds of a given CI Job
+
+        Parameters:
+            projectName (str): name of the CI Job
+            build_from (int): first build number to include
+            build_to (int): last build number to include
+
+        Returns:
+            list: (build number, status, duration in seconds) tuples, ordered by build number
+        """
+        return self._query(
+            'SELECT build_number, status, ended - started FROM builds',
+            projectName, build_from, build_to,
+            'AND started IS NOT NULL AND ended IS NOT NULL AND status != ? ORDER BY build_number',
+            (STATUS_INPROGRESS,))
+    # END durations function
+
+    def status_counts(self, projectName, build_from=-1, build_to=-1):
+        """
+        Number of stored builds of a given CI Job per overall status
+
+        Parameters:
+            projectName (str): name of the CI Job
+            build_from (int): first build number to include
+            build_to (int): last build number to include
+
+        Returns:
+            dict: number of builds for each status
+        """
+        return dict(self._query(
+            'SELECT status, COUNT(*) FROM builds', projectName, build_from, build_to, 'GROUP BY status'))
+    # END status_counts function
+
+    def close(self):
+        """
+        Close the database
+        """
+        with self._lock:
+            self._db.close()
+    # END close function
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _scalar(self, sql, parameters):
+        return self._db.execute(sql, parameters).fetchone()[0]
+
+    def _query(self, select, projectName, build_from, build_to, suffix, extra=()):
+        sql = f'{select} WHERE instance = ? AND project = ?'
+        parameters = [self.instance, projectName]
+        if build_from >= 0:
+            sql += ' AND build_number >= ?'
+            parameters.append(build_from)
+        if build_to >= 0:
+            sql += ' AND build_number <= ?'
+            parameters.append(build_to)
+        with self._lock:
+            return self._db.execute(f'{sql} {suffix}', parameters + list(extra)).fetchall()
+
+    def _save(self, instance, projectName, builds):
+        rows = []
+        for build in builds:
+            try:
+                buildNumber = int(build['buildNumber'])
+            except (KeyError, TypeError, ValueError):
+                continue
+            rows.append((
+                instance, projectName, buildNumber,
+                build.get('overAllStatus'),
+                parse_timestamp(_first_of(build, BUILD_START_KEYS)),
+                parse_timestamp(_first_of(build, BUILD_END_KEYS)),
+                json.dumps(build, separators=(',', ':'))
+            ))
+        with self._lock, self._db:
+            self._db.executemany(
+                'INSERT OR REPLACE INTO builds VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+        return len(rows)
+    # END _save function
+# END HistoryStore class
+
+class HistoryExporter:
+    """
+    Exports the build history of many CI Jobs to an NDJSON or CSV file
+
+    The histories are requested concurrently in chunks of bounded size, and the rows are written
+    as the chunks arrive, so memory use does not depend on the length of the histories
+    After every chunk, the build numbers exported so far and the size of the output file are saved
+    to a checkpoint file; an interrupted export resumes from the checkpoint, and a later export
+    to the same file only adds the builds not exported yet
+    Builds still in progress are not exported, and are picked up by the next export
+
+    Example:
+        >>> exporter = autorabit.HistoryExporter('history.csv')
+        >>> for result in exporter.export(jobs):
+        >>>     print(result.request['projectName'], result.result, result.error)
+    """
+    def __init__(self, path, service=None, format=None, checkpoint=None, chunk_size=HISTORY_CHUNK_SIZE,
+                 max_workers=BATCH_MAX_WORKERS, columns=EXPORT_COLUMNS):
+        """
+        Parameters:
+            path (str): output file
+            service (CIJobService): optional
+                service handler to export with; if not provided, autorabit.cijobs will be used
+            format (str): 'ndjson' or 'csv' (default - csv for .csv files, ndjson otherwise)
+            checkpoint (str): checkpoint file (default - the output file with a .checkpoint suffix)
+            chunk_size (int): maximum number of builds requested at once (default 100)
+            max_workers (int): maximum number of requests in flight (default 8)
+            columns (list): ciJobHistoryList fields written to CSV files, see autorabit.EXPORT_COLUMNS;
+                NDJSON files hold the complete elements
+
+        Raises:
+            RabitError: unknown format
+        """
+        if format is None:
+            format = 'csv' if str(path).lower().endswith('.csv') else 'ndjson'
+        if format not in ('ndjson', 'csv'):
+            raise RabitError(f'Unknown export format {format}')
+        self._path = path
+        self._service = service
+        self._format = format
+        self._checkpoint = checkpoint if checkpoint is not None else f'{path}.checkpoint'
+        self._chunk_size = chunk_size
+        self._max_workers = max_workers
+        self._columns = columns
+    # END constructor
+
+    @property
+    def service(self):
+        service = self._service if self._service is not None else globals().get('cijobs')
+        if service is None:
+            raise RabitError('Please call autorabit.init() before using the HistoryExporter')
+        return service
+
+    def export(self, projectNames, build_from=-1, build_to=-1, resume=True):
+        """
+        Export the history of a range of builds of many CI Jobs
+
+        Parameters:
+            projectNames (iterable): names of the CI Jobs to export
+            build_from (int): first build number to export; if not provided, the first build is used
+            build_to (int): last build number to export; if not provided, the latest build of every job is used
+            resume (bool): default True
+                if true, the builds recorded in the checkpoint are skipped and the output file is appended to;
+                otherwise the output file and the checkpoint are started over;
+                an output file missing or shorter than the checkpoint is started over as well
+
+        Returns:
+            list: BatchResult for every CI Job, in the order of projectNames, with the number of builds exported;
+                  RabitErrors are collected in BatchResult.error instead of being raised,
+                  and the failed chunks are exported by the next export
+        """
+        projectNames = list(projectNames)
+        state = self._load_checkpoint() if resume else None
+        if state is not None and _file_size(self._path) < state['offset']:
+            # the output was deleted or cut short since the checkpoint, its builds have to be exported again
+            state = None
+        if state is None:
+            state = {'offset': 0, 'projects': {}}
+        counts = dict.fromkeys(projectNames, 0)
+        errors = {}
+        service = self.service
+        executor = ThreadPoolExecutor(max_workers=self._max_workers)
+        output = open(self._path, 'r+b' if state['offset'] else 'wb')
+        try:
+            # drop whatever was written after the last checkpoint
+            output.truncate(state['offset'])
+            output.seek(state['offset'])
+            if 0 == state['offset'] and 'csv' == self._format:
+                output.write(self._csv_header())
+            planned = [
+                _propagated(executor, self._plan, service, name, build_from, build_to, state['projects'].get(name, []))
+                for name in projectNames
+            ]
+            chunks = []
+            for name, future in zip(projectNames, planned):
+                try:
+                    chunks.extend(future.result())
+                except RabitError as e:
+                    errors[name] = e
+            pending = set()
+            for chunk in chunks:
+                pending.add(_propagated(executor, self._fetch, service, *chunk))
+                if len(pending) >= 2 * self._max_workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    self._write(output, state, done, counts, errors)
+            self._write(output, state, as_completed(pending), counts, errors)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            output.close()
+        return [BatchResult({'projectName': name}, counts[name], errors.get(name)) for name in projectNames]
+    # END export function
+
+    def _plan(self, service, projectName, build_from, build_to, exported):
+        """
+        Chunks of the build range of a CI Job not exported yet
+        """
+        if build_to < 0:
+            build_to = _latest_build_number(service.poll(projectName=projectName))
+        return [
+            (projectName, start, end)
+            for missing in _missing_ranges(max(build_from, 1), build_to, exported)
+            for start, end in _history_chunks(missing[0], missing[1], self._chunk_size, False)
+        ]
+    # END _plan function
+
+    def _fetch(self, service, projectName, build_from, build_to):
+        try:
+            builds = service.history(projectName=projectName, build_from=build_from, build_to=build_to)
+        except RabitError as e:
+            return projectName, build_from, build_to, None, e
+        return projectName, build_from, build_to, builds, None
+    # END _fetch function
+
+    def _write(self, output, state, futures, counts, errors):
+        for future in futures:
+            projectName, build_from, build_to, builds, error = future.result()
+            if error is not None:
+                errors.setdefault(projectName, error)
+                continue
+            finished = []
+            running = []
+            for build in _sort_builds(builds, False):
+                if STATUS_INPROGRESS != build.get('overAllStatus'):
+                    finished.append(build)
+                elif str(build.get('buildNumber')).isdigit():
+                    running.append([int(build['buildNumber'])] * 2)
+            # running builds are left out of the exported range, to be exported once they are finished
+            exported = _missing_ranges(build_from, build_to, running)
+            output.write(self._render(projectName, finished))
+            output.flush()
+            os.fsync(output.fileno())
+            projects = state['projects']
+            projects[projectName] = _merge_ranges(projects.get(projectName, []) + exported)
+            state['offset'] = output.tell()
+            self._save_checkpoint(state)
+            counts[projectName] += len(finished)
+    # END _write function
+
+    def _render(self, projectName, builds):
+        import csv
+        if 'ndjson' == self._format:
+            return ''.join(json.dumps({'projectName': projectName, **build}) + '\n' for build in builds).encode()
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, self._columns, extrasaction='ignore')
+        for build in builds:
+            writer.writerow({'projectName': projectName, 'duration': build_duration(build), **build})
+        return buffer.getvalue().encode()
+    # END _render function
+
+    def _csv_header(self):
+        import csv
+        buffer = io.StringIO()
+        csv.DictWriter(buffer, self._columns).writeheader()
+        return buffer.getvalue().encode()
+
+    def _load_checkpoint(self):
+        try:
+            with open(self._checkpoint, encoding='utf-8') as source:
+                return json.load(source)
+        except FileNotFoundError:
+            return None
+    # END _load_checkpoint function
+
+    def _save_checkpoint(self, state):
+        # replace the checkpoint atomically, so an interruption never leaves a partial one
+        temporary = f'{self._checkpoint}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as target:
+            json.dump(state, target, separators=(',', ':'))
+        os.replace(temporary, self._checkpoint)
+    # END _save_checkpoint function
+# END HistoryExporter class
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return -1
+
+def _merge_ranges(ranges):
+    """
+    Merge [from, to] build number ranges into the fewest sorted, disjoint ranges
+    """
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+def _missing_ranges(build_from, build_to, exported):
+    """
+    [from, to] ranges of build numbers between build_from and build_to not covered by the exported ranges
+    """
+    missing = []
+    start = build_from
+    for low, high in _merge_ranges(exported):
+        if high < start:
+            continue
+        if low > build_to:
+            break
+        if low > start:
+            missing.append([start, low - 1])
+        start = high + 1
+    if start <= build_to:
+        missing.append([start, build_to])
+    return missing
+# END _missing_ranges function
+
+class Outbox:
+    """
+    Durable SQLite outbox of write operations (trigger, update, quick_deploy, rollback)
+
+    submit() stores an operation and returns a handle at once, even while AutoRABIT is unreachable;
+    a dispatcher thread sends the stored operations at a controlled rate,
+    one at a time per CI Job in the order they were submitted, and records the final response of each.
+    Operations which certainly did not reach AutoRABIT (connection refused, 429 and 503 responses,
+    open circuit breaker) stay queued and are resent after a growing pause,
+    any other error fails the operation; operations left pending by a stopped process
+    are sent when the outbox is opened again
+
+    Many processes can share the outbox file: every operation is claimed by a single dispatcher,
+    which holds a lease on it while sending and renews it; an operation whose lease ran out
+    (its process stopped while sending it) is failed, as it may have been processed
+
+    Example:
+        >>> with autorabit.Outbox('outbox.db') as outbox:
+        >>>     handle = outbox.submit('trigger', projectName=job, title='nightly')
+        >>>     print(handle.result(timeout=600))
+    """
+    def __init__(self, path, service=None, instance=None, rate=OUTBOX_RATE, max_workers=BATCH_MAX_WORKERS,
+                 backoff=OUTBOX_BACKOFF, max_backoff=OUTBOX_MAX_BACKOFF, lease=OUTBOX_LEASE):
+        """
+        Parameters:
+            path (str): location of the SQLite database file (':memory:' for a non-durable outbox)
+            service (CIJobService): optional
+                service handler to send the operations with; if not provided, autorabit.cijobs will be used
+            instance (str): optional
+                key of the AutoRABIT instance in the outbox; defaults to the endpoint of the service
+            rate (float): maximum number of operations sent per second (default 1, None - no limit)
+            max_workers (int): maximum number of operations in flight, each for a different CI Job (default 8)
+            backoff (float): pause after an operation could not be delivered, in seconds (default 1),
+                doubled after every further undelivered operation
+            max_backoff (float): longest pause after undelivered operations, in seconds (default 60)
+            lease (float): time an operation being sent stays claimed without being renewed, in seconds (default 60);
+                the dispatcher renews the leases of its operations in flight three times per lease
+
+        Raises:
+            RabitError: service is not provided and init() was not called
+        """
+        import sqlite3
+        if service is None:
+            service = globals().get('cijobs')
+        if service is None:
+            raise RabitError('Please call autorabit.init() before using the Outbox')
+        self._service = service
+        self.instance = instance if instance is not None else service._endpoint
+        self._limit = RateLimit(rate, burst=1) if rate is not None else None
+        self._max_workers = max_workers
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._lease = lease
+        self._owner = os.urandom(8).hex()
+        self._renew_at = 0
+        self._failures = 0
+        self._paused_until = 0
+        self._in_flight = set()
+        self._closed = False
+        self._condition = threading.Condition()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.executescript(_OUTBOX_SCHEMA)
+            columns = {row[1] for row in self._db.execute('PRAGMA table_info(outbox)')}
+            # outbox files created before the leases were introduced
+            for column, kind in (('owner', 'TEXT'), ('lease', 'REAL')):
+                if column not in columns:
+                    self._db.execute(f'ALTER TABLE outbox ADD COLUMN {column} {kind}')
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._thread = threading.Thread(target=self._run, name='Outbox', daemon=True)
+        self._thread.start()
+    # END constructor
+
+    def submit(self, service, **kwargs):
+        """
+        Store a write operation to be sent to AutoRABIT
+
+        A trigger identical to the last operation still waiting for the same CI Job
+        is not stored again, the handle of the waiting one is returned instead
+
+        Parameters:
+            service (str): name of the service function - 'trigger', 'update', 'quick_deploy' or 'rollback'
+            **kwargs: parameters of the service function, JSON-serializable; projectName is required
+
+        Raises:
+            RabitError:
+                service is not a write service, required parameter is missing or the outbox is closed
+
+        Returns:
+            OutboxHandle: handle of the stored operation
+        """
+        if service not in WRITE_SERVICES:
+            raise RabitError(f'Please provide one of the write services: {", ".join(WRITE_SERVICES)}')
+        projectName = kwargs.get('projectName')
+        if projectName is None:
+            raise RabitError('Please provide a valid AutoRABIT Project')
+        try:
+            arguments = json.dumps(kwargs, sort_keys=True, separators=(',', ':'))
+        except (TypeError, ValueError) as e:
+            raise RabitError('Please provide JSON-serializable parameters', exc=e) from e
+        with self._condition:
+            if self._closed:
+                raise RabitError('Outbox is closed')
+            last = self._db.execute(
+                'SELECT id, service, arguments, state FROM outbox WHERE instance = ? AND project = ?'
+                ' ORDER BY id DESC LIMIT 1', (self.instance, projectName)).fetchone()
+            if last is not None and last[1:] == ('trigger', arguments, 'pending') and 'trigger' == service:
+                return OutboxHandle(self, last[0])
+            with self._db:
+                id = self._db.execute(
+                    'INSERT INTO outbox (instance, project, service, arguments, state, created)'
+                    ' VALUES (?, ?, ?, ?, ?, ?)',
+                    (self.instance, projectName, service, arguments, 'pending', time.time())).lastrowid
+            self._condition.notify_all()
+        return OutboxHandle(self, id)
+    # END submit function
+
+    def handle(self, id):
+        """
+        Handle of an operation submitted earlier, e.g. by a previous process
+
+        Raises:
+            RabitError: the outbox has no operation with this id
+
+        Returns:
+            OutboxHandle
+        """
+        self._row(id)
+        return OutboxHandle(self, id)
+    # END handle function
+
+    def pending(self, projectName=None):
+        """
+        Returns:
+            int: number of operations not sent yet, for a single CI Job or all of them
+        """
+        sql = 'SELECT COUNT(*) FROM outbox WHERE instance = ? AND state IN (?, ?)'
+        parameters = [self.instance, 'pending', 'sending']
+        if projectName is not None:
+            sql += ' AND project = ?'
+            parameters.append(projectName)
+        with self._condition:
+            return self._db.execute(sql, parameters).fetchone()[0]
+    # END pending function
+
+    def wait(self, timeout=None):
+        """
+        Block until all stored operations are sent or failed
+
+        Parameters:
+            timeout (float): maximum time to wait, in seconds (default None - wait forever)
+
+        Returns:
+            bool: True if no operation is left to send
+        """
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self.pending():
+                remaining = None if end is None else end - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                # operations sent by other processes are not notified, count them again at every renewal
+                self._condition.wait(self._lease / 3 if remaining is None else min(remaining, self._lease / 3))
+        return True
+    # END wait function
+
+    def purge(self, age=0):
+        """
+        Delete the sent and failed operations
+
+        Parameters:
+            age (float): only delete the operations finished at least this many seconds ago (default 0)
+
+        Returns:
+            int: number of deleted operations
+        """
+        with self._condition, self._db:
+            return self._db.execute(
+                'DELETE FROM outbox WHERE instance = ? AND state IN (?, ?) AND updated <= ?',
+                (self.instance, 'sent', 'failed', time.time() - age)).rowcount
+    # END purge function
+
+    def close(self):
+        """
+        Stop the dispatcher, wait for the operations in flight and close the database;
+        the operations not sent yet stay stored for the next Outbox opened on the same file
+        """
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+        with self._condition:
+            self._db.close()
+    # END close function
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _row(self, id):
+        with self._condition:
+            row = self._db.execute('SELECT state, response, error FROM outbox WHERE id = ?', (id,)).fetchone()
+        if row is None:
+            raise RabitError(f'Outbox has no operation {id}')
+        return row
+    # END _row function
+
+    def _run(self):
+        while True:
+            # take the token before claiming, so that a claimed operation is not held while waiting for it
+            if self._limit is not None:
+                self._limit.acquire()
+            with self._condition:
+                operation = None
+                while not self._closed:
+                    now = time.monotonic()
+                    if now >= self._renew_at:
+                        # other processes may be waiting for the operations of the expired leases
+                        self._renew()
+                        self._renew_at = now + self._lease / 3
+                    delay = self._paused_until - now
+                    if delay > 0:
+                        self._condition.wait(min(delay, self._renew_at - now))
+                        continue
+                    if len(self._in_flight) < self._max_workers:
+                        operation = self._claim()
+                        if operation is not None:
+                            break
+                    # the operations of other processes are not notified, look for them at every renewal
+                    self._condition.wait(self._renew_at - now)
+                if operation is None:
+                    return
+                self._in_flight.add(operation[1])
+            self._executor.submit(self._dispatch, *operation)
+    # END _run function
+
+    def _claim(self):
+        """
+        Claim the oldest waiting operation of a CI Job with no operation being sent, by any process
+
+        Returns:
+            tuple: (id, projectName, service, arguments) of the claimed operation, None if there is none
+        """
+        heads = self._db.execute(
+            'SELECT id, project, service, arguments FROM outbox WHERE id IN ('
+            ' SELECT MIN(id) FROM outbox WHERE instance = ? AND state = ? GROUP BY project'
+            ') AND project NOT IN (SELECT project FROM outbox WHERE instance = ? AND state = ?) ORDER BY id',
+            (self.instance, 'pending', self.instance, 'sending')).fetchall()
+        for operation in heads:
+            with self._db:
+                # another process may have claimed the operation since it was read
+                claimed = self._db.execute(
+                    'UPDATE outbox SET state = ?, owner = ?, lease = ?, updated = ? WHERE id = ? AND state = ?',
+                    ('sending', self._owner, time.time() + self._lease, time.time(), operation[0], 'pending')
+                ).rowcount
+            if claimed:
+                return operation
+        return None
+    # END _claim function
+
+    def _renew(self):
+        """
+        Extend the leases of the operations in flight, and fail the operations whose lease expired
+        """
+        now = time.time()
+        with self._db:
+            self._db.execute(
+                'UPDATE outbox SET lease = ? WHERE instance = ? AND state = ? AND owner = ?',
+                (now + self._lease, self.instance, 'sending', self._owner))
+            # an operation being sent when its process stopped may have been processed
+            self._db.execute(
+                'UPDATE outbox SET state = ?, updated = ?, error = ? WHERE instance = ? AND state = ?'
+                ' AND (lease IS NULL OR lease < ?)',
+                ('failed', now, 'Interrupted while sending, the operation may have been processed',
+                 self.instance, 'sending', now))
+    # END _renew function
+
+    def _dispatch(self, id, projectName, service, arguments):
+        response = None
+        retry = False
+        try:
+            response = getattr(self._service, service)(**json.loads(arguments))
+            state, error = 'sent', None
+        except RabitError as e:
+            retry = _undelivered(e)
+            state, error = 'pending' if retry else 'failed', _error_message(e)
+        except Exception as e:
+            state, error = 'failed', f'{type(e).__name__}: {e}'
+        with self._condition:
+            with self._db:
+                self._db.execute(
+                    'UPDATE outbox SET state = ?, attempts = attempts + 1, updated = ?, response = ?, error = ?,'
+                    ' owner = NULL, lease = NULL WHERE id = ?',
+                    (state, time.time(), None if response is None else json.dumps(response, default=str), error, id))
+            self._in_flight.discard(projectName)
+            if retry:
+                self._failures += 1
+                pause = min(self._max_backoff, self._backoff * 2 ** (self._failures - 1))
+                self._paused_until = max(self._paused_until, time.monotonic() + pause)
+            else:
+                self._failures = 0
+            self._condition.notify_all()
+    # END _dispatch function
+# END Outbox class
+
+class OutboxHandle:
+    """
+    Handle of an operation stored in the Outbox
+    """
+    __slots__ = ('id', '_outbox')
+
+    def __init__(self, outbox, id):
+        self.id = id
+        self._outbox = outbox
+
+    @property
+    def state(self):
+        """
+        str: one of OUTBOX_STATES - 'pending', 'sending', 'sent' or 'failed'
+        """
+        return self._outbox._row(self.id)[0]
+
+    @property
+    def response(self):
+        """
+        Response of AutoRABIT to the sent operation, None until it is sent
+        """
+        response = self._outbox._row(self.id)[1]
+        return None if response is None else json.loads(response)
+
+    @property
+    def error(self):
+        """
+        str: error of the failed operation, or the last error of an operation still waiting to be resent
+        """
+        return self._outbox._row(self.id)[2]
+
+    def done(self):
+        return self.state in OUTBOX_FINAL_STATES
+
+    def result(self, timeout=None):
+        """
+        Block until the operation is sent or failed
+
+        Parameters:
+            timeout (float): maximum time to wait, in seconds (default None - wait forever)
+
+        Raises:
+            RabitError:
+                the operation failed or is still not sent after the timeout
+
+        Returns:
+            response of AutoRABIT to the operation
+        """
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._outbox._condition:
+            while True:
+                state, response, error = self._outbox._row(self.id)
+                if 'sent' == state:
+                    return None if response is None else json.loads(response)
+                if 'failed' == state:
+                    raise RabitError(f'Outbox operation {self.id} failed: {error}')
+                remaining = None if end is None else end - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise RabitError(f'Outbox operation {self.id} is still {state}')
+                self._outbox._condition.wait(remaining)
+    # END result function
+
+    def __repr__(self):
+        return f'OutboxHandle({self.id})'
+# END OutboxHandle class
+
+def _undelivered(error):
+    """
+    Check if a write operation certainly did not reach AutoRABIT, so it can be sent again
+    """
+    if isinstance(error, RabitCircuitOpenError):
+        return True
+    if isinstance(error, RabitConnectError):
+        return _not_sent(error.__cause__)
+    response = error.args[0] if isinstance(error, RabitStatusError) and error.args else None
+    return isinstance(response, requests.Response) and response.status_code in RETRY_WRITE_STATUS_CODES
+# END _undelivered function
+
+def _error_message(error):
+    response = error.args[0] if error.args else None
+    if isinstance(response, requests.Response):
+        return f'{type(error).__name__}: HTTP {response.status_code} {response.reason}'
+    return f'{type(error).__name__}: {error}'
+
+class BuildRecord:
+    """
+    Compact record of a single build from the history service
+
+    Holds only the fields used for reporting, with interned project names and statuses,
+    so tens of thousands of records take a fraction of the memory of the original dicts
+
+    Attributes:
+        projectName (str): name of the CI Job
+        buildNumber (int): build number
+        status (str): overall status of the build
+        started (float): start time in seconds since the epoch, None if unknown
+        ended (float): end time in seconds since the epoch, None if unknown
+    """
+    __slots__ = ('projectName', 'buildNumber', 'status', 'started', 'ended')
+
+    def __init__(self, projectName, buildNumber, status, started=None, ended=None):
+        self.projectName = sys.intern(projectName) if projectName is not None else None
+        self.buildNumber = buildNumber
+        self.status = sys.intern(status) if status is not None else None
+        self.started = started
+        self.ended = ended
+    # END constructor
+
+    @classmethod
+    def from_history(cls, build, projectName=None):
+        """
+        Build a record from a ciJobHistoryList element
+
+        Parameters:
+            build (dict): element of the history service result
+            projectName (str): optional
+                name of the CI Job, if the element does not hold it in orgProjectName
+
+        Raises:
+            RabitError: the element has no valid buildNumber
+        """
+        try:
+            buildNumber = int(build['buildNumber'])
+        except (KeyError, TypeError, ValueError) as e:
+            raise RabitError(f'History entry has no valid buildNumber: {build!r}', exc=e) from e
+        return cls(
+            build.get('orgProjectName', projectName),
+            buildNumber,
+            build.get('overAllStatus'),
+            parse_timestamp(_first_of(build, BUILD_START_KEYS)),
+            parse_timestamp(_first_of(build, BUILD_END_KEYS))
+        )
+    # END from_history function
+
+    @property
+    def duration(self):
+        if self.started is None or self.ended is None or self.ended < self.started:
+            return None
+        return self.ended - self.started
+
+    @property
+    def succeeded(self):
+        return self.status in STATUS_COMPLETE
+
+    @property
+    def failed(self):
+        return self.status not in STATUS_OK
+
+    def __repr__(self):
+        return f'BuildRecord({self.projectName!r}, {self.buildNumber!r}, {self.status!r})'
+
+    def __eq__(self, other):
+        if not isinstance(other, BuildRecord):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in BuildRecord.__slots__)
+# END BuildRecord class
+
+class HistoryFrame:
+    """
+    Columnar container of build history
+
+    Every field is kept in its own typed array (build numbers, start and end times,
+    project and status codes into tables of interned strings), instead of one dict per build;
+    the aggregations are vectorised with NumPy when it is installed,
+    and computed over the plain arrays otherwise
+
+    Example:
+        >>> frame = autorabit.HistoryFrame.from_history(autorabit.cijobs.history_stream(projectName=job))
+        >>> print(frame.success_rate(), frame.duration_percentiles([50, 95]))
+    """
+    def __init__(self):
+        self._numbers = array.array('q')
+        self._started = array.array('d')
+        self._ended = array.array('d')
+        self._projects = array.array('H')
+        self._statuses = array.array('H')
+        self._project_names = []
+        self._status_names = []
+        self._project_codes = {}
+        self._status_codes = {}
+    # END constructor
+
+    @classmethod
+    def from_history(cls, builds, projectName=None):
+        """
+        Build a frame from history service results
+
+        Parameters:
+            builds (iterable): ciJobHistoryList elements (dicts) or BuildRecords,
+                e.g. the result of history, iter_history, history_stream or HistoryStore.history
+            projectName (str): optional
+                name of the CI Job, for elements which do not hold it in orgProjectName
+
+        Returns:
+            HistoryFrame: the new frame
+        """
+        frame = cls()
+        frame.extend(builds, projectName)
+        return frame
+    # END from_history function
+
+    def append(self, build, projectName=None):
+        """
+        Add a single build
+
+        Parameters:
+            build (dict or BuildRecord): ciJobHistoryList element or record
+            projectName (str): optional
+                name of the CI Job, if the element does not hold it in orgProjectName
+
+        Raises:
+            RabitError: the element has no valid buildNumber
+        """
+        if not isinstance(build, BuildRecord):
+            build = BuildRecord.from_history(build, projectName)
+        self._numbers.append(build.buildNumber)
+        self._started.append(math.nan if build.started is None else build.started)
+        self._ended.append(math.nan if build.ended is None else build.ended)
+        self._projects.append(_code(build.projectName, self._project_names, self._project_codes))
+        self._statuses.append(_code(build.status, self._status_names, self._status_codes))
+    # END append function
+
+    def extend(self, builds, projectName=None):
+        """
+        Add many builds; elements without a valid buildNumber are skipped, like in the HistoryStore
+
+        Parameters:
+            builds (iterable): ciJobHistoryList elements (dicts) or BuildRecords
+            projectName (str): optional
+                name of the CI Job, for elements which do not hold it in orgProjectName
+        """
+        for build in builds:
+            try:
+                self.append(build, projectName)
+            except RabitError:
+                continue
+    # END extend function
+
+    def __len__(self):
+        return len(self._numbers)
+
+    def __getitem__(self, index):
+        started = self._started[index]
+        ended = self._ended[index]
+        return BuildRecord(
+            self._project_names[self._projects[index]],
+            self._numbers[index],
+            self._status_names[self._statuses[index]],
+            None if math.isnan(started) else started,
+            None if math.isnan(ended) else ended
+        )
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    @property
+    def projects(self):
+        """
+        Returns:
+            list: names of the CI Jobs in the frame
+        """
+        return list(self._project_names)
+
+    def select(self, projectName):
+        """
+        Returns:
+            HistoryFrame: new frame holding only the builds of a given CI Job
+        """
+        frame = HistoryFrame()
+        if projectName not in self._project_names:
+            return frame
+        code = self._project_names.index(projectName)
+        for index, project in enumerate(self._projects):
+            if project == code:
+                frame.append(self[index])
+        return frame
+    # END select function
+
+    def status_counts(self):
+        """
+        Returns:
+            dict: number of builds for each status
+        """
+        counts = collections.Counter(self._statuses)
+        return {self._status_names[code]: count for code, count in counts.items()}
+    # END status_counts function
+
+    def success_rate(self):
+        """
+        Share of successful builds among the finished ones
+
+        Returns:
+            float: success rate between 0 and 1, None if there are no finished builds
+        """
+        numpy = _optional('numpy')
+        complete = self._status_mask(STATUS_COMPLETE)
+        running = self._status_mask([STATUS_INPROGRESS])
+        if numpy is not None:
+            statuses = self._column(self._statuses)
+            finished = numpy.count_nonzero(~numpy.isin(statuses, running))
+            succeeded = numpy.count_nonzero(numpy.isin(statuses, complete))
+        else:
+            finished = sum(1 for code in self._statuses if code not in running)
+            succeeded = sum(1 for code in self._statuses if code in complete)
+        if finished == 0:
+            return None
+        return succeeded / finished
+    # END success_rate function
+
+    def durations(self):
+        """
+        Returns:
+            list: durations of the builds with known start and end times, in seconds
+        """
+        numpy = _optional('numpy')
+        if numpy is not None:
+            return self._durations().tolist()
+        return self._durations()
+    # END durations function
+
+    def duration_percentiles(self, percentiles=(50, 95, 99)):
+        """
+        Percentiles of the build durations, linearly interpolated
+
+        Parameters:
+            percentiles (iterable): percentiles between 0 and 100 (default 50, 95, 99)
+
+        Returns:
+            dict: duration in seconds for every percentile, None if no durations are known
+        """
+        numpy = _optional('numpy')
+        durations = self._durations()
+        if 0 == len(durations):
+            return {percentile: None for percentile in percentiles}
+        if numpy is not None:
+            values = numpy.percentile(durations, list(percentiles))
+            return {percentile: float(value) for percentile, value in zip(percentiles, values)}
+        durations = sorted(durations)
+        return {percentile: _interpolate(durations, percentile) for percentile in percentiles}
+    # END duration_percentiles function
+
+    def failures_per_day(self):
+        """
+        Number of failed builds per day (UTC) of their start time
+
+        Returns:
+            dict: number of failed builds for every day with failures, keyed by ISO date (YYYY-MM-DD)
+        """
+        numpy = _optional('numpy')
+        failing = [code for code, status in enumerate(self._status_names) if status not in STATUS_OK]
+        if numpy is not None:
+            started = self._column(self._started)
+            mask = numpy.isin(self._column(self._statuses), failing) & ~numpy.isnan(started)
+            days, counts = numpy.unique(numpy.floor(started[mask] / 86400).astype('int64'), return_counts=True)
+            daily = zip(days.tolist(), counts.tolist())
+        else:
+            failing = set(failing)
+            daily = collections.Counter(
+                int(started // 86400)
+                for code, started in zip(self._statuses, self._started)
+                if code in failing and not math.isnan(started)
+            ).items()
+        return {
+            (_EPOCH_DATE + datetime.timedelta(days=day)).isoformat(): count
+            for day, count in sorted(daily)
+        }
+    # END failures_per_day function
+
+    def _status_mask(self, statuses):
+        return [code for code, status in enumerate(self._status_names) if status in statuses]
+
+    def _column(self, column):
+        numpy = _optional('numpy')
+        return numpy.frombuffer(column, dtype=column.typecode) if len(column) else numpy.array([], dtype=column.typecode)
+
+    def _durations(self):
+        numpy = _optional('numpy')
+        if numpy is not None:
+            durations = self._column(self._ended) - self._column(self._started)
+            return durations[~numpy.isnan(durations) & (durations >= 0)]
+        return [
+            ended - started
+            for started, ended in zip(self._started, self._ended)
+            if not math.isnan(started) and not math.isnan(ended) and ended >= started
+        ]
+    # END _durations function
+# END HistoryFrame class
+
+_EPOCH_DATE = datetime.date(1970, 1, 1)
+
+def _code(value, table, codes):
+    """
+    Code of a value in a table of distinct values, adding it to the table if needed
+    """
+    code = codes.get(value)
+    if code is None:
+        code = codes[value] = len(table)
+        table.append(value)
+    return code
+
+def _interpolate(ordered, percentile):
+    """
+    Linearly interpolated percentile of a sorted list, matching numpy.percentile
+    """
+    rank = (len(ordered) - 1) * percentile / 100
+    low = math.floor(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+_HISTORY_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS builds (
+        instance TEXT NOT NULL,
+        project TEXT NOT NULL,
+        build_number INTEGER NOT NULL,
+        status TEXT,
+        started REAL,
+        ended REAL,
+        data TEXT NOT NULL,
+        PRIMARY KEY (instance, project, build_number)
+    )
+'''
+
+_OUTBOX_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        instance TEXT NOT NULL,
+        project TEXT NOT NULL,
+        service TEXT NOT NULL,
+        arguments TEXT NOT NULL,
+        state TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        created REAL NOT NULL,
+        updated REAL,
+        response TEXT,
+        error TEXT,
+        owner TEXT,
+        lease REAL
+    );
+    CREATE INDEX IF NOT EXISTS outbox_state ON outbox (instance, state, project, id);
+'''
+
+def main(argv=None):
+    """
+    Command line entry point, see `$ python -m autorabit --help`
+
+    Runs a single cijobs service function and prints its result as JSON,
+    or, with the batch subcommand, runs many operations read as NDJSON
+    concurrently over one pooled client and prints their results as NDJSON in order of completion,
+    or, with the gateway subcommand, serves a local caching RabitGateway until interrupted
+
+    Parameters:
+        argv (list): command line arguments (default sys.argv[1:])
+
+    Returns:
+        int: exit status - 0 if all operations succeeded, 1 if any failed, 2 on invalid usage
+    """
+    # imported here, so that importing the module does not pay for it
+    import argparse
+    parser = _cli_parser(argparse)
+    args = parser.parse_args(argv)
+    try:
+        client = RabitClient(
+            endpoint=args.endpoint,
+            token=args.token,
+            pool_maxsize=max(args.workers, POOL_MAXSIZE),
+            cache=args.cache,
+            retry=args.retry
+        )
+    except RabitError as e:
+        parser.error(str(e))
+    with client:
+        try:
+            if 'batch' == args.service:
+                return _cli_batch(client.cijobs, args.file, args.workers)
+            if 'gateway' == args.service:
+                return _cli_gateway(client, args.host, args.port, args.public_stats)
+            result = getattr(client.cijobs, args.service)(**_cli_kwargs(args))
+            _cli_write(result)
+        except (RabitError, OSError, ValueError) as e:
+            print(f'autorabit: {type(e).__name__}: {e}', file=sys.stderr)
+            return 1
+    return 0
+# END main function
+
+def _cli_parser(argparse):
+    parser = argparse.ArgumentParser(
+        prog='python -m autorabit',
+        description='Call the cijobs services of an AutoRABIT instance'
+    )
+    parser.add_argument('--endpoint', default=os.environ.get('AUTORABIT_ENDPOINT', 'http://localhost'),
+                        help='full URL of the AutoRABIT instance (default $AUTORABIT_ENDPOINT)')
+    parser.add_argument('--token', default=os.environ.get('AUTORABIT_TOKEN'),
+                        help='authentication token (default $AUTORABIT_TOKEN)')
+    parser.add_argument('--workers', type=int, default=BATCH_MAX_WORKERS,
+                        help=f'maximum number of batch operations in flight (default {BATCH_MAX_WORKERS})')
+    parser.add_argument('--retry', action='store_true', help='retry failed requests')
+    parser.add_argument('--cache', action='store_true', help='cache the responses of the read services')
+    services = parser.add_subparsers(dest='service', metavar='service', required=True)
+
+    def service(name, help):
+        subparser = services.add_parser(name, aliases=[name.replace('_', '-')] if '_' in name else [], help=help)
+        subparser.set_defaults(service=name)
+        subparser.add_argument('projectName', metavar='project', help='name of the CI Job')
+        return subparser
+
+    trigger = service('trigger', 'trigger a build')
+    trigger.add_argument('--title', default='automated-build', help='build label (default automated-build)')
+    poll = service('poll', 'poll the status of a build')
+    poll.add_argument('--build', dest='buildNumber', type=int, metavar='BUILD', help='build number (default latest)')
+    history = service('history', 'get the history of a range of builds')
+    history.add_argument('--from', dest='build_from', type=int, metavar='BUILD', default=-1, help='first build number')
+    history.add_argument('--to', dest='build_to', type=int, metavar='BUILD', default=-1, help='last build number')
+    history.add_argument('--build', dest='buildNumber', type=int, metavar='BUILD', help='single build number')
+    update = service('update', 'update the baseline revision')
+    update.add_argument('revision', help='new baseline revision')
+    quick_deploy = service('quick_deploy', 'trigger Quick Deploy of a validated build')
+    quick_deploy.add_argument('--build', dest='buildNumber', type=int, metavar='BUILD', help='build number (default latest)')
+    rollback = service('rollback', 'trigger a rollback of a build')
+    rollback.add_argument('--build', dest='buildNumber', type=int, metavar='BUILD', help='build number (default latest)')
+    rollback.add_argument('--validate', dest='validateDeployment', action='store_const', const=True,
+                          help='validate-only rollback')
+    rollback.add_argument('--test-level', dest='testLevel', help='Salesforce test level')
+    rollback.add_argument('--manifest', dest='_manifest', metavar='FILE',
+                          help='JSON file with constructiveChanges, destructiveChangesPre and destructiveChangesPost')
+    for name in ['rollback_details', 'rollback_history']:
+        details = service(name, f'get the {name.replace("_", " ")} of a build')
+        details.add_argument('--build', dest='buildNumber', type=int, metavar='BUILD', help='build number (default latest)')
+
+    batch = services.add_parser('batch', help='run many operations read as NDJSON')
+    batch.add_argument('file', nargs='?', default='-',
+                       help='NDJSON file of operations, e.g. {"op": "poll", "projectName": "job"} (default stdin)')
+    gateway = services.add_parser('gateway', help='serve a local caching gateway to the instance')
+    gateway.add_argument('--host', default=GATEWAY_HOST, help=f'address to listen on (default {GATEWAY_HOST})')
+    gateway.add_argument('--port', type=int, default=GATEWAY_PORT, help=f'port to listen on (default {GATEWAY_PORT})')
+    gateway.add_argument('--public-stats', action='store_true',
+                         help='serve /gateway/stats and /gateway/metrics without the token')
+    return parser
+# END _cli_parser function
+
+_CLI_OPTIONS = {'endpoint', 'token', 'workers', 'retry', 'cache', 'service'}
+
+def _cli_gateway(client, host, port, public_stats):
+    """
+    Serve a RabitGateway to the instance of the client until interrupted
+    """
+    with RabitGateway(client, host=host, port=port, public_stats=public_stats) as gateway:
+        print(f'autorabit: gateway to {client.endpoint} listening on {gateway.url}', file=sys.stderr)
+        try:
+            gateway.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    return 0
+# END _cli_gateway function
+
+def _cli_kwargs(args):
+    """
+    Service function keyword arguments of the parsed command line
+    """
+    kwargs = {
+        key: value for key, value in vars(args).items()
+        if key not in _CLI_OPTIONS and not key.startswith('_') and value is not None
+    }
+    manifest = getattr(args, '_manifest', None)
+    if manifest is not None:
+        with open(manifest, encoding='utf-8') as source:
+            kwargs.update(json.load(source))
+    return kwargs
+
+def _cli_batch(service, path, workers):
+    """
+    Run the NDJSON operations of a file (or stdin) concurrently, writing the results as they complete
+
+    Only a bounded number of operations is read ahead, so arbitrarily long inputs can be streamed
+    """
+    source = sys.stdin if '-' == path else open(path, encoding='utf-8')
+    failed = False
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        pending = set()
+        for number, line in enumerate(source, 1):
+            if not line.strip():
+                continue
+            pending.add(executor.submit(_cli_operation, service, number, line))
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    failed |= _cli_write(future.result())
+        for future in as_completed(pending):
+            failed |= _cli_write(future.result())
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        if source is not sys.stdin:
+            source.close()
+    return 1 if failed else 0
+# END _cli_batch function
+
+def _cli_operation(service, number, line):
+    """
+    Run a single NDJSON operation, e.g. {"id": 1, "op": "poll", "projectName": "job", "buildNumber": 12}
+
+    Returns:
+        dict: result record with the input line number, the id and op of the operation,
+              and either its result or the error it failed with
+    """
+    record = {'line': number}
+    try:
+        request = json.loads(line)
+        if not isinstance(request, dict):
+            raise RabitError('Operation has to be a JSON object')
+        if 'id' in request:
+            record['id'] = request.pop('id')
+        name = request.pop('op', None)
+        record['op'] = name
+        if name not in READ_SERVICES + WRITE_SERVICES:
+            raise RabitError(f'Unknown operation {name}')
+        result = getattr(service, name)(**request)
+    except (RabitError, ValueError, TypeError) as e:
+        record.update({'ok': False, 'error': f'{type(e).__name__}: {e}'})
+    else:
+        record.update({'ok': True, 'result': result})
+    return record
+# END _cli_operation function
+
+def _cli_write(record):
+    """
+    Write a JSON record as a single line to stdout
+
+    Returns:
+        bool: True if the record is a failed batch operation
+    """
+    sys.stdout.write(json.dumps(record, default=str) + '\n')
+    sys.stdout.flush()
+    return isinstance(record, dict) and record.get('ok') is False
+
+class RabitError(Exception):
+    """
+    Custom AutoRABIT exception type to help with exception handling
+
+    When exception is raised from another exception,
+    the original exception can be passed as an optional parameter `exc`
+    """
+    def __init__(self, *args, **kwargs):
+        original_exception = kwargs.pop('exc', None)
+        msg = args[0] if 0 < len(args) else ''
+        if original_exception is not None:
+            msg += f' [{original_exception}]'
+        super().__init__(msg)
+# END RabitError class
+
+class RabitStatusError(RabitError):
+    """
+    Custom AutoRABIT exception type to help with exception handling
+    """
+    pass
+# END RabitStatusError class
+
+class RabitAlreadySetError(RabitStatusError):
+    """
+    Custom AutoRABIT exception type raised by the update service
+    when the requested revision already is the baseline revision of the CI Job
+    """
+    def __init__(self, response):
+        super().__init__(response)
+        self.response = response
+# END RabitAlreadySetError class
+
+class RabitConnectError(RabitError):
+    """
+    Custom AutoRABIT exception type to help with exception handling for HTTP issues
+    """
+    pass
+# END RabitConnectError class
+
+class RabitCircuitOpenError(RabitConnectError):
+    """
+    Custom AutoRABIT exception type raised without sending the request,
+    when the circuit breaker of the retry policy is open
+    """
+    pass
+# END RabitCircuitOpenError class
+
+class RabitDeadlineError(RabitError):
+    """
+    Custom AutoRABIT exception type raised when the Deadline of the call expires,
+    before the request is sent or while waiting for its response
+    """
+    pass
+# END RabitDeadlineError class
+
+# select the fastest installed JSON library
+_json_loads = json.loads
+_json_backend = 'json'
+set_json_backend()
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,332 @@
+"""
+Benchmark of the AutoRABIT API wrapper against a local stub server
+
+The stub server implements the cijobs v1 endpoints used by autorabit.CIJobService,
+with configurable latency, payload sizes and error rate,
+so the overhead of the wrapper and the access strategies can be compared without an AutoRABIT instance
+
+Modes:
+    - sequential: one request at a time, a new connection for every request
+    - pooled: one request at a time over the keep-alive connection pool
+    - threaded: concurrent requests from a thread pool over the connection pool
+    - async: concurrent requests from AsyncCIJobService
+
+Usage:
+    $ py benchmark.py --requests 500 --concurrency 16 --latency 0.01
+    $ py benchmark.py --modes pooled async --services poll history --history-size 1000
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import autorabit
+
+MODES = ['sequential', 'pooled', 'threaded', 'async']
+SERVICES = ['trigger', 'poll', 'history', 'update', 'quick_deploy', 'rollback', 'rollback_details', 'rollback_history']
+PROJECT = 'benchmark-job'
+
+
+class StubServer:
+    """
+    Local HTTP server imitating the cijobs v1 endpoints of an AutoRABIT instance
+
+    Example:
+        >>> with StubServer(latency=0.01, error_rate=0.05) as stub:
+        >>>     autorabit.init(endpoint=stub.url, token='stub')
+    """
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, error_rate=0.0,
+                 history_size=50, manifest_size=20):
+        """
+        Parameters:
+            host (str): address to listen on (default 127.0.0.1)
+            port (int): port to listen on (default 0 - any free port)
+            latency (float): time spent on every request, in seconds
+            jitter (float): random extra time spent on every request, up to this many seconds
+            error_rate (float): fraction of requests answered with 503 Service Unavailable
+            history_size (int): number of builds returned by the history endpoint for an open range
+            manifest_size (int): number of members of every type in the rollback manifests
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.history_size = history_size
+        self.manifest_size = manifest_size
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), _make_handler(self))
+        self._thread = None
+    # END constructor
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    # END start function
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+    # END stop function
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def respond(self, method, path, query, body):
+        """
+        Build the response to a request
+
+        Returns:
+            tuple: (HTTP status, JSON-serializable body)
+        """
+        with self._lock:
+            self.requests += 1
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        if self.error_rate and random.random() < self.error_rate:
+            return 503, {'status': 'Service Unavailable'}
+        parts = path.split('/')[4:]
+        if not parts:
+            return 404, {'status': 'Not Found'}
+        if 'GET' == method:
+            return self._get(parts, query)
+        return self._post(parts, body)
+    # END respond function
+
+    def _get(self, parts, query):
+        service = parts[0]
+        if 'pollstatus' == service:
+            build = int(parts[2]) if 2 < len(parts) else self.history_size
+            return 200, {
+                'status': 'Success',
+                'cyclenum': build,
+                'rollbackstatus': 'Success',
+                'rollbackIternationNumber': 1
+            }
+        if 'history' == service:
+            build_from = int(query.get('from', ['-1'])[0])
+            build_to = int(query.get('to', ['-1'])[0])
+            if build_from < 1:
+                build_from = 1
+            if build_to < 1:
+                build_to = self.history_size
+            return 200, {'ciJobHistoryList': [_build(parts[1], number) for number in range(build_from, build_to + 1)]}
+        if 'rollback' == service and 1 < len(parts) and 'history' == parts[1]:
+            return 200, {'revertDeployments': [
+                {'revertId': iteration, 'status': 'Success', 'validateDeployment': True}
+                for iteration in range(1, 4)
+            ]}
+        if 'rollback' == service:
+            return 200, {
+                'cyclenum': int(parts[2]) if 2 < len(parts) else self.history_size,
+                'backupStatus': 'Completed',
+                'constructiveChanges': self._manifest('ApexClass', 'CustomObject'),
+                'destructiveChangesPre': self._manifest('ApexTrigger'),
+                'destructiveChangesPost': self._manifest('Flow')
+            }
+        return 404, {'status': 'Not Found'}
+    # END _get function
+
+    def _post(self, parts, body):
+        service = parts[0]
+        if 'trigger' == service:
+            return 200, {'status': 'Inprogress', 'cyclenum': self.history_size + 1}
+        if 'update' == service:
+            return 200, {'status': 'Success', 'baseLineRevision': body.get('baseLineRevision')}
+        if 'triggerquickdeploy' == service:
+            return 200, {'status': 'Quick deploy initiated successfully'}
+        if 'rollback' == service:
+            return 200, {'status': 'Inprogress', 'revertId': 1}
+        return 404, {'status': 'Not Found'}
+    # END _post function
+
+    def _manifest(self, *types):
+        return {
+            'types': [
+                {'name': name, 'members': [f'{name}{index}' for index in range(self.manifest_size)]}
+                for name in types
+            ],
+            'version': '58.0'
+        }
+    # END _manifest function
+# END StubServer class
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # a deep listen backlog, so bursts of new connections are not dropped
+    request_queue_size = 1024
+
+def _build(project, number):
+    started = 1700000000000 + number * 3600000
+    return {
+        'orgProjectName': project,
+        'buildNumber': number,
+        'overAllStatus': 'Failed' if 0 == number % 10 else 'Success',
+        'startTime': started,
+        'endTime': started + 300000
+    }
+
+def _make_handler(stub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            self._handle('GET')
+
+        def do_POST(self):
+            self._handle('POST')
+
+        def _handle(self, method):
+            url = urlparse(self.path)
+            length = int(self.headers.get('Content-Length') or 0)
+            body = json.loads(self.rfile.read(length) or b'{}') if length else {}
+            status, payload = stub.respond(method, url.path, parse_qs(url.query), body)
+            content = json.dumps(payload).encode()
+            connection = 'close' if self.close_connection else 'keep-alive'
+            # send the head and the body in a single write, to avoid delayed ACK stalls
+            head = (
+                f'HTTP/1.1 {status} {self.responses.get(status, ("",))[0]}\r\n'
+                f'Content-Type: application/json\r\n'
+                f'Content-Length: {len(content)}\r\n'
+                f'Connection: {connection}\r\n\r\n'
+            ).encode()
+            self.wfile.write(head + content)
+
+        def log_message(self, *args):
+            pass
+    return Handler
+# END _make_handler function
+
+def service_kwargs(service, stub):
+    """
+    Keyword arguments of a benchmarked service function
+    """
+    build = stub.history_size
+    return {
+        'trigger': {'projectName': PROJECT, 'title': 'benchmark'},
+        'poll': {'projectName': PROJECT, 'buildNumber': build},
+        'history': {'projectName': PROJECT, 'build_from': 1, 'build_to': build},
+        'update': {'projectName': PROJECT, 'revision': 'abcdef1234'},
+        'quick_deploy': {'projectName': PROJECT, 'buildNumber': build},
+        'rollback': {'projectName': PROJECT, 'buildNumber': build, 'validateDeployment': True},
+        'rollback_details': {'projectName': PROJECT, 'buildNumber': build},
+        'rollback_history': {'projectName': PROJECT, 'buildNumber': build}
+    }[service]
+# END service_kwargs function
+
+def timed(function, kwargs):
+    started = time.perf_counter()
+    try:
+        function(**kwargs)
+        failed = False
+    except autorabit.RabitError:
+        failed = True
+    return time.perf_counter() - started, failed
+
+async def timed_async(function, kwargs):
+    started = time.perf_counter()
+    try:
+        await function(**kwargs)
+        failed = False
+    except autorabit.RabitError:
+        failed = True
+    return time.perf_counter() - started, failed
+
+def run_sync(service, kwargs, count, concurrency, keep_alive):
+    transport = autorabit.HTTPTransport(pool_maxsize=max(concurrency, 1), keep_alive=keep_alive)
+    function = getattr(autorabit.CIJobService(transport=transport), service)
+    started = time.perf_counter()
+    if concurrency <= 1:
+        samples = [timed(function, kwargs) for _ in range(count)]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            samples = list(executor.map(lambda _: timed(function, kwargs), range(count)))
+    elapsed = time.perf_counter() - started
+    transport.close()
+    return samples, elapsed
+# END run_sync function
+
+def run_async(service, kwargs, count, concurrency):
+    async def run():
+        transport = autorabit.AsyncHTTPTransport(pool_limit=concurrency, pool_maxsize=concurrency)
+        handler = autorabit.AsyncCIJobService(transport=transport, max_concurrency=concurrency)
+        function = getattr(handler, service)
+        started = time.perf_counter()
+        try:
+            samples = await asyncio.gather(*[timed_async(function, kwargs) for _ in range(count)])
+            return samples, time.perf_counter() - started
+        finally:
+            await transport.close()
+    return asyncio.run(run())
+# END run_async function
+
+def percentile(ordered, quantile):
+    """
+    Nearest-rank percentile of a sorted list
+    """
+    index = max(0, min(len(ordered) - 1, int(round(quantile * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+def report(mode, service, samples, elapsed):
+    latencies = sorted(sample[0] for sample in samples)
+    errors = sum(1 for sample in samples if sample[1])
+    print(
+        f'{mode:<10} {service:<17} {len(samples):>7} {errors:>6} {len(samples) / elapsed:>10.1f}'
+        f' {percentile(latencies, 0.5) * 1000:>8.2f} {percentile(latencies, 0.95) * 1000:>8.2f}'
+        f' {percentile(latencies, 0.99) * 1000:>8.2f}'
+    )
+# END report function
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the AutoRABIT API wrapper against a local stub server')
+    parser.add_argument('--requests', type=int, default=200, help='requests per service and mode (default 200)')
+    parser.add_argument('--concurrency', type=int, default=16, help='concurrent requests in threaded and async modes (default 16)')
+    parser.add_argument('--latency', type=float, default=0.0, help='stub server latency in seconds (default 0)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='random extra stub server latency in seconds (default 0)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests failing with 503 (default 0)')
+    parser.add_argument('--history-size', type=int, default=50, help='builds returned by the history endpoint (default 50)')
+    parser.add_argument('--manifest-size', type=int, default=20, help='members per type in rollback manifests (default 20)')
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--services', nargs='+', choices=SERVICES, default=SERVICES)
+    args = parser.parse_args()
+
+    stub = StubServer(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        history_size=args.history_size,
+        manifest_size=args.manifest_size
+    )
+    with stub:
+        autorabit.init(endpoint=stub.url, token='benchmark')
+        print(f'{"mode":<10} {"service":<17} {"requests":>7} {"errors":>6} {"req/s":>10} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8}')
+        for mode in args.modes:
+            for service in args.services:
+                kwargs = service_kwargs(service, stub)
+                if 'async' == mode:
+                    samples, elapsed = run_async(service, kwargs, args.requests, args.concurrency)
+                else:
+                    samples, elapsed = run_sync(
+                        service, kwargs, args.requests,
+                        args.concurrency if 'threaded' == mode else 1,
+                        keep_alive='sequential' != mode
+                    )
+                report(mode, service, samples, elapsed)
+# END main function
+
+if __name__ == '__main__':
+    main()
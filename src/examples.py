@@ -27,6 +27,14 @@ while 'Inprogress' == response['status']:
     response = ci.poll(projectName=job, buildNumber=build_num)
 print(f'{job}_{build_num}: {response["status"]}')
 
+# alternatively, let the watcher poll the build
+# it adapts the polling interval to the usual duration of the job
+# and can watch any number of builds at once
+watcher = autorabit.BuildWatcher()
+future = watcher.watch(projectName=job, buildNumber=build_num)
+response = future.result() # blocks until the build is finished
+print(f'{job}_{build_num}: {response["status"]}')
+
 # trigger a quick deploy on a successful validation job
 # the job must be a validate-only,
 # running the required minimum of unit tests to cover the payload
@@ -77,6 +85,16 @@ while 'Inprogress' == response['rollbackstatus']:
     time.sleep(2) # wait for 2 seconds
     response = ci.poll(projectName=job, buildNumber=build_num)
 print(f'{job}_{build_num}_{iteration}: {response["rollbackstatus"]}')
+# or, using the watcher
+response = watcher.watch(projectName=job, buildNumber=build_num, rollback=True, iteration=iteration).result()
+print(f'{job}_{build_num}_{iteration}: {response["rollbackstatus"]}')
+watcher.close()
+
+# or, to roll back many jobs at once, use the rollback pipeline
+# it runs the steps above (details, rollback validation, polling) for all builds concurrently
+with autorabit.RollbackPipeline(validate=True, callback=print) as pipeline:
+    for rollback in pipeline.run([(job, build_num)]):
+        print(f'{rollback.projectName}_{rollback.buildNumber}_{rollback.iteration}: {rollback.state}')
 
 # alternatively, get the history of rollback iterations for a given job
 rollback_history = ci.rollback_history(projectName=job, buildNumber=build_num)
@@ -0,0 +1,24 @@
+"""
+Shared fixtures: a stub AutoRABIT server from the benchmark harness, and a client connected to it
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+import autorabit
+from benchmark import StubServer
+
+
+@pytest.fixture
+def stub():
+    with StubServer() as server:
+        yield server
+
+
+@pytest.fixture
+def client(stub):
+    with autorabit.RabitClient(endpoint=stub.url, token='stub') as client:
+        yield client
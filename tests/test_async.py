@@ -0,0 +1,64 @@
+"""
+AsyncCIJobService and the asyncio connection pools of a client
+"""
+import asyncio
+
+import pytest
+
+import autorabit
+
+
+def _sessions(client):
+    return [session for session, _ in client.async_transport._sessions.values()]
+
+
+def test_service_functions(client):
+    async def run():
+        cijobs = client.async_cijobs()
+        poll, history = await asyncio.gather(
+            cijobs.poll(projectName='job', buildNumber=3),
+            cijobs.history(projectName='job', build_from=1, build_to=5)
+        )
+        with pytest.raises(autorabit.RabitError):
+            await cijobs.poll()
+        return poll, history
+
+    poll, history = asyncio.run(run())
+    assert 3 == poll['cyclenum']
+    assert [1, 2, 3, 4, 5] == [build['buildNumber'] for build in history]
+
+
+def test_closing_a_handler_keeps_the_client_open(client):
+    async def run():
+        other = client.async_cijobs()
+        async with client.async_cijobs() as cijobs:
+            await cijobs.poll(projectName='job', buildNumber=1)
+        return await other.poll(projectName='job', buildNumber=2)
+
+    assert 2 == asyncio.run(run())['cyclenum']
+
+
+def test_sessions_are_closed_with_their_loop(client):
+    pytest.importorskip('aiohttp')
+
+    async def run():
+        await client.async_cijobs().poll(projectName='job', buildNumber=1)
+        return _sessions(client)
+
+    first = asyncio.run(run())
+    second = asyncio.run(run())
+    assert 1 == len(first) and first[0].closed
+    assert second[0] is not first[0] and second[0].closed
+
+
+def test_aclose(client):
+    pytest.importorskip('aiohttp')
+
+    async def run():
+        await client.async_cijobs().poll(projectName='job', buildNumber=1)
+        sessions = _sessions(client)
+        await client.aclose()
+        return sessions
+
+    assert all(session.closed for session in asyncio.run(run()))
+    assert {} == client.async_transport._sessions
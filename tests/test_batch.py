@@ -0,0 +1,77 @@
+"""
+Batch service functions: concurrent calls, completion order and collected errors
+"""
+import threading
+import time
+
+import autorabit
+
+
+def _slow_and_broken(stub, slow, broken):
+    """
+    Delay the requests of one CI Job and fail the ones of another, recording the peak number in flight
+    """
+    respond = stub.respond
+    lock = threading.Lock()
+    active = [0, 0]
+
+    def responding(method, path, query, body):
+        with lock:
+            active[0] += 1
+            active[1] = max(active)
+        try:
+            if f'/{broken}' in path or broken == body.get('projectName'):
+                with stub._lock:
+                    stub.requests += 1
+                return 400, {'status': 'Bad Request'}
+            if f'/{slow}' in path or slow == body.get('projectName'):
+                time.sleep(0.3)
+            else:
+                time.sleep(0.02)
+            return respond(method, path, query, body)
+        finally:
+            with lock:
+                active[0] -= 1
+
+    stub.respond = responding
+    return active
+
+
+def test_order_of_completion(stub, client):
+    _slow_and_broken(stub, 'slow', 'broken')
+    results = list(client.cijobs.poll_many([('slow', 1), ('job', 2), ('broken', 3), ('job', 4)]))
+    assert 4 == len(results)
+    assert ('slow', 1) == (results[-1].request['projectName'], results[-1].request['buildNumber'])
+    assert results[-1].ok and 1 == results[-1].result['cyclenum']
+    failed = [result for result in results if not result.ok]
+    assert ['broken'] == [result.request['projectName'] for result in failed]
+    assert isinstance(failed[0].error, autorabit.RabitError)
+    assert failed[0].result is None
+
+
+def test_invalid_items_collected(client):
+    results = list(client.cijobs.history_many(['job', {'build_from': 1}], build_from=1, build_to=5))
+    by_project = {result.request.get('projectName'): result for result in results}
+    assert 5 == len(by_project['job'].result)
+    assert isinstance(by_project[None].error, autorabit.RabitError)
+
+
+def test_max_workers(stub, client):
+    active = _slow_and_broken(stub, 'slow', 'broken')
+    results = list(client.cijobs.poll_many([('job', build) for build in range(1, 25)], max_workers=3))
+    assert all(result.ok for result in results)
+    assert list(range(1, 25)) == sorted(result.request['buildNumber'] for result in results)
+    assert 3 == active[1]
+
+
+def test_abandoned_triggers_all_sent(stub, client):
+    _slow_and_broken(stub, 'slow', 'broken')
+    jobs = [f'job{number}' for number in range(10)]
+    batch = client.cijobs.trigger_many(jobs, max_workers=2, title='nightly')
+    first = next(batch)
+    assert first.ok and 'nightly' == first.request['title']
+    del batch
+    deadline = time.monotonic() + 5
+    while stub.requests < 10 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert 10 == stub.requests
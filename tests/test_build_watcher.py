@@ -0,0 +1,79 @@
+"""
+BuildWatcher: polling until completion and learning the durations of the jobs
+"""
+import time
+
+import autorabit
+
+
+def _requests_by_service(stub):
+    """
+    Count the requests served by the stub per service path
+    """
+    respond = stub.respond
+    counts = {}
+
+    def counting(method, path, query, body):
+        service = path.split('/')[4]
+        counts[service] = counts.get(service, 0) + 1
+        return respond(method, path, query, body)
+
+    stub.respond = counting
+    return counts
+
+
+def _finished_at(stub, started, ended=None):
+    """
+    Answer the polls with a finished build started (and ended) the given number of seconds ago
+    """
+    respond = stub.respond
+
+    def timed(method, path, query, body):
+        status, response = respond(method, path, query, body)
+        if 'pollstatus' in path:
+            response['startTime'] = int((time.time() - started) * 1000)
+            if ended is not None:
+                response['endTime'] = int((time.time() - ended) * 1000)
+        return status, response
+
+    stub.respond = timed
+
+
+def test_watch_until_finished(client, stub):
+    stub.history_size = 5
+    with autorabit.BuildWatcher(client.cijobs, min_interval=0.01) as watcher:
+        futures = [watcher.watch('job', number) for number in range(6, 9)]
+    assert [6, 7, 8] == [future.result()['cyclenum'] for future in futures]
+    # the previous builds of the stub last 300 s
+    assert 300 == watcher.expected_duration('job')
+
+
+def test_rollback_watch_loads_no_history(client, stub):
+    counts = _requests_by_service(stub)
+    with autorabit.BuildWatcher(client.cijobs, min_interval=0.01) as watcher:
+        assert 'Success' == watcher.watch('job', 5, rollback=True).result()['rollbackstatus']
+    assert {'pollstatus': 1} == counts
+    assert watcher.expected_duration('job') is None
+
+
+def test_duration_counts_from_the_start_of_the_build(client, stub):
+    _finished_at(stub, started=100)
+    with autorabit.BuildWatcher(client.cijobs, min_interval=0.01, history_size=0) as watcher:
+        watcher.watch('job', 1).result()
+    assert 99 < watcher.expected_duration('job') < 102
+
+
+def test_duration_from_start_and_end_time(client, stub):
+    _finished_at(stub, started=100, ended=40)
+    with autorabit.BuildWatcher(client.cijobs, min_interval=0.01, history_size=0) as watcher:
+        watcher.watch('job', 1).result()
+    assert 59 < watcher.expected_duration('job') < 61
+
+
+def test_durations_measured_from_watch_only_stand_in(client, stub):
+    with autorabit.BuildWatcher(client.cijobs, min_interval=0.01, history_size=0) as watcher:
+        watcher.watch('job', 1).result()
+        assert watcher.expected_duration('job') < 1
+        _finished_at(stub, started=100)
+        watcher.watch('job', 2).result()
+        assert 99 < watcher.expected_duration('job') < 102
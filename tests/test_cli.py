@@ -0,0 +1,59 @@
+"""
+Command line entry point against the stub server
+"""
+import json
+
+import autorabit
+
+
+def _main(stub, capsys, *argv):
+    status = autorabit.main(['--endpoint', stub.url, '--token', 'stub', *argv])
+    return status, capsys.readouterr()
+
+
+def test_single_call(stub, capsys):
+    status, output = _main(stub, capsys, 'poll', 'job', '--build', '7')
+    assert 0 == status
+    assert 7 == json.loads(output.out)['cyclenum']
+
+
+def test_batch(stub, capsys, tmp_path):
+    path = tmp_path / 'operations.ndjson'
+    path.write_text(
+        '{"id": "a", "op": "poll", "projectName": "job", "buildNumber": 3}\n'
+        '\n'
+        '{"id": "b", "op": "history", "projectName": "job", "build_from": 1, "build_to": 2}\n'
+    )
+    status, output = _main(stub, capsys, '--workers', '2', 'batch', str(path))
+    assert 0 == status
+    records = {record['id']: record for record in map(json.loads, output.out.splitlines())}
+    assert {'line': 1, 'id': 'a', 'op': 'poll', 'ok': True} == {k: v for k, v in records['a'].items() if k != 'result'}
+    assert 3 == records['a']['result']['cyclenum']
+    assert 3 == records['b']['line']
+    assert 2 == len(records['b']['result'])
+
+
+def test_batch_with_bad_lines(stub, capsys, tmp_path):
+    path = tmp_path / 'operations.ndjson'
+    path.write_text(
+        '{"op": "poll", "projectName": "job", "buildNumber": 1}\n'
+        'not json\n'
+        '{"op": "launch", "projectName": "job"}\n'
+        '[1, 2]\n'
+        '{"op": "poll"}\n'
+    )
+    status, output = _main(stub, capsys, 'batch', str(path))
+    assert 1 == status
+    records = sorted(map(json.loads, output.out.splitlines()), key=lambda record: record['line'])
+    assert [True, False, False, False, False] == [record['ok'] for record in records]
+    assert records[1]['error'].startswith('JSONDecodeError')
+    assert 'Unknown operation launch' in records[2]['error']
+    assert 'JSON object' in records[3]['error']
+    assert 'RabitError' in records[4]['error']
+
+
+def test_failed_call(capsys):
+    # nothing listens on the discard port
+    status = autorabit.main(['--endpoint', 'http://127.0.0.1:9', '--token', 'stub', 'poll', 'job'])
+    assert 1 == status
+    assert capsys.readouterr().err.startswith('autorabit: RabitConnectError')
@@ -0,0 +1,63 @@
+"""
+RabitClient: settings, and isolation between the clients of different instances
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import autorabit
+from benchmark import StubServer
+
+
+class TokenTransport(autorabit.HTTPTransport):
+    """
+    Transport recording the URL and token of every request
+    """
+    def __init__(self):
+        super().__init__()
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def request(self, method, url, **kwargs):
+        with self._lock:
+            self.sent.append((url.split('/api/')[0], kwargs['headers']['token']))
+        return super().request(method, url, **kwargs)
+
+
+@pytest.mark.parametrize('setting', ['timout', 'retries', 'cach'])
+def test_unknown_settings_are_rejected(stub, setting):
+    with pytest.raises(TypeError):
+        autorabit.RabitClient(endpoint=stub.url, token='stub', **{setting: True})
+
+
+def test_init_rejects_unknown_settings(stub):
+    previous = autorabit._default_client
+    with pytest.raises(TypeError):
+        autorabit.init(endpoint=stub.url, token='stub', retyr=True)
+    assert previous is autorabit._default_client
+
+
+def test_clients_share_no_state():
+    with StubServer() as prod_stub, StubServer() as uat_stub:
+        prod_transport, uat_transport = TokenTransport(), TokenTransport()
+        prod = autorabit.RabitClient(endpoint=prod_stub.url, token='prod', cache=True, metrics=True,
+                                     transport=prod_transport)
+        uat = autorabit.RabitClient(endpoint=uat_stub.url, token='uat', cache=True, metrics=True,
+                                    transport=uat_transport)
+        with prod, uat:
+            def call(number):
+                client = prod if number % 2 else uat
+                return client.cijobs.poll(projectName='job', buildNumber=number % 4)
+
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                list(executor.map(call, range(40)))
+            assert {(prod_stub.url, 'prod')} == set(prod_transport.sent)
+            assert {(uat_stub.url, 'uat')} == set(uat_transport.sent)
+            # builds 1 and 3 went to prod, 0 and 2 to UAT: every cache only holds the responses of its own client
+            assert (2, 2) == (len(prod.cache), len(uat.cache))
+            assert (2, 2) == (prod_stub.requests, uat_stub.requests)
+            assert 2 == prod.metrics.summary()['poll']['requests']
+            assert 2 == uat.metrics.summary()['poll']['requests']
+            uat.cache.invalidate()
+            assert 2 == len(prod.cache)
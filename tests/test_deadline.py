@@ -0,0 +1,62 @@
+"""
+Deadlines bound the time spent waiting for the rate limits as well as the requests themselves
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+import autorabit
+
+
+def _client(stub, limit):
+    return autorabit.RabitClient(endpoint=stub.url, token='stub', rate_limit=autorabit.RateLimiter(reads=limit))
+
+
+def test_rate_limit_wait_is_bounded(stub):
+    with _client(stub, autorabit.RateLimit(rate=0.5, burst=1)) as client:
+        client.cijobs.poll(projectName='job', buildNumber=1)
+        started = time.monotonic()
+        with autorabit.Deadline(0.3), pytest.raises(autorabit.RabitDeadlineError):
+            client.cijobs.poll(projectName='job', buildNumber=1)
+        assert time.monotonic() - started < 0.3
+        assert 1 == stub.requests
+
+
+def test_slot_wait_is_bounded(stub):
+    limit = autorabit.RateLimit(max_in_flight=1)
+    limit.acquire()
+    with _client(stub, limit) as client:
+        started = time.monotonic()
+        with autorabit.Deadline(0.2), pytest.raises(autorabit.RabitDeadlineError):
+            client.cijobs.poll(projectName='job', buildNumber=1)
+        assert time.monotonic() - started < 0.4
+    assert 0 == stub.requests
+    limit.release()
+    assert 0 == limit._in_flight
+
+
+def test_timeout_counts_from_admission(stub):
+    stub.latency = 0.8
+    limit = autorabit.RateLimit(max_in_flight=1)
+    limit.acquire()
+    threading.Timer(0.3, limit.release).start()
+    with _client(stub, limit) as client:
+        started = time.monotonic()
+        with autorabit.Deadline(1), pytest.raises(autorabit.RabitDeadlineError):
+            client.cijobs.poll(projectName='job', buildNumber=1)
+        assert time.monotonic() - started < 1.05
+
+
+def test_async_rate_limit_wait_is_bounded(stub):
+    async def run():
+        async with _client(stub, autorabit.RateLimit(rate=0.5, burst=1)) as client:
+            cijobs = client.async_cijobs()
+            await cijobs.poll(projectName='job', buildNumber=1)
+            with autorabit.Deadline(0.3), pytest.raises(autorabit.RabitDeadlineError):
+                await cijobs.poll(projectName='job', buildNumber=1)
+
+    started = time.monotonic()
+    asyncio.run(run())
+    assert time.monotonic() - started < 0.3
@@ -0,0 +1,82 @@
+"""
+The trial request of the circuit breaker must not keep it open when it ends at a deadline
+"""
+import asyncio
+import time
+
+import pytest
+
+import autorabit
+
+
+@pytest.fixture
+def flaky(stub):
+    """
+    Stub answering 503 once, then taking longer than the deadlines of the tests
+    """
+    respond = stub.respond
+    calls = []
+
+    def flaky_respond(*args):
+        calls.append(args)
+        if 1 == len(calls):
+            return 503, {'status': 'Service Unavailable'}
+        if 2 == len(calls):
+            time.sleep(1.5)
+        return respond(*args)
+
+    stub.respond = flaky_respond
+    return stub
+
+
+def _policy():
+    return autorabit.RetryPolicy(max_attempts=1, breaker_threshold=1, breaker_cooldown=0.1)
+
+
+def test_probe_released_at_deadline(flaky):
+    retry = _policy()
+    with autorabit.RabitClient(endpoint=flaky.url, token='stub', retry=retry) as client:
+        with pytest.raises(autorabit.RabitStatusError):
+            client.cijobs.poll(projectName='job', buildNumber=1)
+        assert retry.circuit_open
+        time.sleep(0.1)
+        with autorabit.Deadline(0.4), pytest.raises(autorabit.RabitDeadlineError):
+            client.cijobs.poll(projectName='job', buildNumber=1)
+        assert client.cijobs.poll(projectName='job', buildNumber=1)['status'] == 'Success'
+        assert not retry.circuit_open
+
+
+def test_async_probe_released_at_deadline(flaky):
+    retry = _policy()
+
+    async def run():
+        async with autorabit.RabitClient(endpoint=flaky.url, token='stub', retry=retry) as client:
+            cijobs = client.async_cijobs()
+            with pytest.raises(autorabit.RabitStatusError):
+                await cijobs.poll(projectName='job', buildNumber=1)
+            await asyncio.sleep(0.1)
+            with autorabit.Deadline(0.4), pytest.raises(autorabit.RabitDeadlineError):
+                await cijobs.poll(projectName='job', buildNumber=1)
+            return await cijobs.poll(projectName='job', buildNumber=1)
+
+    assert asyncio.run(run())['status'] == 'Success'
+    assert not retry.circuit_open
+
+
+def test_async_probe_released_on_cancel(flaky):
+    retry = _policy()
+
+    async def run():
+        async with autorabit.RabitClient(endpoint=flaky.url, token='stub', retry=retry) as client:
+            cijobs = client.async_cijobs()
+            with pytest.raises(autorabit.RabitStatusError):
+                await cijobs.poll(projectName='job', buildNumber=1)
+            await asyncio.sleep(0.1)
+            probe = asyncio.ensure_future(cijobs.poll(projectName='job', buildNumber=1))
+            await asyncio.sleep(0.2)
+            probe.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await probe
+            return await cijobs.poll(projectName='job', buildNumber=1)
+
+    assert asyncio.run(run())['status'] == 'Success'
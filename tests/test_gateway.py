@@ -0,0 +1,36 @@
+"""
+RabitGateway in front of the stub server
+"""
+import pytest
+import requests
+
+import autorabit
+
+
+@pytest.fixture
+def gateway(client):
+    with autorabit.RabitGateway(client, port=0) as gateway:
+        yield gateway.start()
+
+
+@pytest.mark.parametrize('path', ['/gateway/stats', '/gateway/metrics'])
+def test_stats_require_token(gateway, path):
+    assert 401 == requests.get(gateway.url + path).status_code
+    assert 401 == requests.get(gateway.url + path, headers={'token': 'other'}).status_code
+    assert 200 == requests.get(gateway.url + path, headers={'token': 'stub'}).status_code
+
+
+@pytest.mark.parametrize('path', ['/gateway/stats', '/gateway/metrics'])
+def test_public_stats(client, path):
+    with autorabit.RabitGateway(client, port=0, public_stats=True) as gateway:
+        gateway.start()
+        assert 200 == requests.get(gateway.url + path).status_code
+        assert 401 == requests.get(gateway.url + '/api/cijobs/v1/pollstatus/job/1').status_code
+
+
+def test_reads_are_cached(gateway, stub):
+    with autorabit.RabitClient(endpoint=gateway.url, token='stub') as client:
+        for _ in range(3):
+            assert 'Success' == client.cijobs.poll(projectName='job', buildNumber=1)['status']
+    stats = requests.get(gateway.url + '/gateway/stats', headers={'token': 'stub'}).json()
+    assert (2, 1) == (stats['cache']['hits'], stats['cache']['misses'])
@@ -0,0 +1,52 @@
+"""
+Request hedging of the sync service handlers against the stub server
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import autorabit
+
+
+def test_hedging_does_not_cap_concurrency(stub):
+    stub.latency = 0.2
+    respond = stub.respond
+    lock = threading.Lock()
+    active = [0, 0]
+
+    def counting(*args):
+        with lock:
+            active[0] += 1
+            active[1] = max(active)
+        try:
+            return respond(*args)
+        finally:
+            with lock:
+                active[0] -= 1
+
+    stub.respond = counting
+    hedge = autorabit.HedgePolicy(max_workers=4)
+    with autorabit.RabitClient(endpoint=stub.url, token='stub', hedge=hedge, pool_maxsize=16) as client:
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            list(executor.map(lambda number: client.cijobs.poll(projectName='job', buildNumber=number), range(16)))
+    assert 16 == active[1]
+    assert 16 == hedge.requests
+
+
+def test_slow_request_is_hedged(stub):
+    respond = stub.respond
+    calls = []
+
+    def first_slow(*args):
+        calls.append(args)
+        if 1 == len(calls):
+            time.sleep(1)
+        return respond(*args)
+
+    stub.respond = first_slow
+    hedge = autorabit.HedgePolicy(max_delay=0.1)
+    with autorabit.RabitClient(endpoint=stub.url, token='stub', hedge=hedge) as client:
+        started = time.monotonic()
+        client.cijobs.poll(projectName='job', buildNumber=1)
+        assert time.monotonic() - started < 0.8
+    assert (1, 1) == (hedge.hedges, hedge.wins)
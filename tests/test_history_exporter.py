@@ -0,0 +1,44 @@
+"""
+HistoryExporter checkpoints against the stub server
+"""
+import json
+import os
+
+import autorabit
+
+
+def _export(client, path):
+    exporter = autorabit.HistoryExporter(str(path), service=client.cijobs, chunk_size=10)
+    results = exporter.export(['job-a', 'job-b'])
+    assert [result.error for result in results] == [None, None]
+    return [result.result for result in results]
+
+
+def _rows(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_export_resumes_without_duplicates(client, tmp_path):
+    path = tmp_path / 'history.ndjson'
+    assert _export(client, path) == [50, 50]
+    assert _export(client, path) == [0, 0]
+    assert len(_rows(path)) == 100
+
+
+def test_missing_output_starts_over(client, tmp_path):
+    path = tmp_path / 'history.ndjson'
+    _export(client, path)
+    os.remove(path)
+    assert os.path.exists(f'{path}.checkpoint')
+    assert _export(client, path) == [50, 50]
+    assert len(_rows(path)) == 100
+
+
+def test_truncated_output_starts_over(client, tmp_path):
+    path = tmp_path / 'history.ndjson'
+    _export(client, path)
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) // 2)
+    assert _export(client, path) == [50, 50]
+    assert len(_rows(path)) == 100
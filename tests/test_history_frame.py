@@ -0,0 +1,34 @@
+"""
+BuildRecord and HistoryFrame: records of the history service results and their aggregations
+"""
+import pytest
+
+import autorabit
+
+
+def test_from_history(client):
+    frame = autorabit.HistoryFrame.from_history(client.cijobs.history(projectName='job', build_from=1, build_to=20))
+    assert 20 == len(frame)
+    assert ['job'] == frame.projects
+    # every tenth build of the stub fails, the builds take 300 seconds
+    assert {'Success': 18, 'Failed': 2} == frame.status_counts()
+    assert 0.9 == frame.success_rate()
+    assert [300.0] * 20 == frame.durations()
+    assert autorabit.BuildRecord.from_history(client.cijobs.history(projectName='job', build_from=7, build_to=7)[0]) \
+        == frame[6]
+
+
+def test_missing_build_number():
+    builds = [
+        {'buildNumber': '1', 'overAllStatus': 'Success'},
+        {'overAllStatus': 'Success'},
+        {'buildNumber': None, 'overAllStatus': 'Failed'},
+        {'buildNumber': 'latest', 'overAllStatus': 'Failed'},
+        {'buildNumber': 2, 'overAllStatus': 'Failed'},
+    ]
+    frame = autorabit.HistoryFrame.from_history(builds, projectName='job')
+    assert [1, 2] == [record.buildNumber for record in frame]
+    with pytest.raises(autorabit.RabitError, match='buildNumber'):
+        autorabit.BuildRecord.from_history(builds[1], projectName='job')
+    with pytest.raises(autorabit.RabitError, match='buildNumber'):
+        frame.append(builds[3])
@@ -0,0 +1,69 @@
+"""
+HistoryStore: incremental sync of the build history into a local SQLite database
+"""
+import autorabit
+
+
+def _running_builds(stub, running):
+    """
+    Report some builds as still in progress, and record the (from, to) range of every history request
+    """
+    respond = stub.respond
+    ranges = []
+
+    def responding(method, path, query, body):
+        status, payload = respond(method, path, query, body)
+        if '/history/' in path:
+            ranges.append((int(query['from'][0]), int(query['to'][0])))
+            for build in payload['ciJobHistoryList']:
+                if build['buildNumber'] in running:
+                    build['overAllStatus'] = autorabit.STATUS_INPROGRESS
+                    del build['endTime']
+        return status, payload
+
+    stub.respond = responding
+    return ranges
+
+
+def test_incremental_sync(stub, client):
+    ranges = _running_builds(stub, set())
+    with autorabit.HistoryStore(':memory:', client.cijobs) as store:
+        assert 50 == store.sync('job', chunk_size=20)
+        assert 50 == store.high_water_mark('job')
+        assert [(1, 20), (21, 40), (41, 50)] == ranges
+        del ranges[:]
+        assert 0 == store.sync('job')
+        assert [] == ranges
+        stub.history_size = 55
+        assert 5 == store.sync('job')
+        assert [(51, 55)] == ranges
+        assert list(range(1, 56)) == [build['buildNumber'] for build in store.history('job')]
+        assert {'Success': 50, 'Failed': 5} == store.status_counts('job')
+        assert [(51, 'Success', 300.0)] == store.durations('job', 51, 51)
+        assert None is store.high_water_mark('other')
+
+
+def test_running_builds_refreshed(stub, client):
+    running = {49, 50}
+    ranges = _running_builds(stub, running)
+    with autorabit.HistoryStore(':memory:', client.cijobs) as store:
+        store.sync('job')
+        assert {'Success': 44, 'Failed': 4, autorabit.STATUS_INPROGRESS: 2} == store.status_counts('job')
+        # running builds have no duration yet
+        assert [48] == [row[0] for row in store.durations('job', 48, 50)]
+        running.clear()
+        del ranges[:]
+        assert 2 == store.sync('job')
+        assert [(49, 49), (50, 50)] == ranges
+        assert {'Success': 45, 'Failed': 5} == store.status_counts('job')
+        assert [48, 49, 50] == [row[0] for row in store.durations('job', 48, 50)]
+
+
+def test_instances_kept_apart(stub, client, tmp_path):
+    path = str(tmp_path / 'history.db')
+    with autorabit.HistoryStore(path, client.cijobs) as store:
+        store.sync('job')
+    with autorabit.HistoryStore(path, client.cijobs, instance='uat') as store:
+        assert [] == store.history('job')
+    with autorabit.HistoryStore(path, client.cijobs) as store:
+        assert 50 == len(store.history('job'))
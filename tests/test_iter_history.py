@@ -0,0 +1,66 @@
+"""
+iter_history: builds requested in chunks of bounded size and yielded one at a time
+"""
+import time
+
+import pytest
+
+import autorabit
+
+
+def _record_ranges(stub):
+    """
+    Record the (from, to) range of every history request
+    """
+    respond = stub.respond
+    ranges = []
+
+    def recording(method, path, query, body):
+        if '/history/' in path:
+            ranges.append((int(query['from'][0]), int(query['to'][0])))
+        return respond(method, path, query, body)
+
+    stub.respond = recording
+    return ranges
+
+
+def test_chunks(stub, client):
+    ranges = _record_ranges(stub)
+    builds = list(client.cijobs.iter_history(projectName='job', build_from=3, build_to=27, chunk_size=10))
+    assert list(range(3, 28)) == [build['buildNumber'] for build in builds]
+    assert [(3, 12), (13, 22), (23, 27)] == ranges
+
+
+def test_newest_first_to_latest(stub, client):
+    ranges = _record_ranges(stub)
+    builds = list(client.cijobs.iter_history(projectName='job', chunk_size=20, newest_first=True))
+    # the latest build of the stub is the 50th
+    assert list(range(50, 0, -1)) == [build['buildNumber'] for build in builds]
+    assert [(41, 50), (21, 40), (1, 20)] == ranges
+
+
+def test_prefetch(stub, client):
+    ranges = _record_ranges(stub)
+    builds = client.cijobs.iter_history(projectName='job', build_from=1, build_to=30, chunk_size=10, prefetch=True)
+    assert 1 == next(builds)['buildNumber']
+    # the second chunk is requested in the background while the first one is consumed
+    deadline = time.monotonic() + 5
+    while len(ranges) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [(1, 10), (11, 20)] == sorted(ranges)
+    assert list(range(2, 31)) == [build['buildNumber'] for build in builds]
+    assert 3 == len(ranges)
+
+
+def test_lazy(stub, client):
+    ranges = _record_ranges(stub)
+    builds = client.cijobs.iter_history(projectName='job', build_from=1, build_to=30, chunk_size=10)
+    assert [] == ranges
+    for _ in range(11):
+        next(builds)
+    assert [(1, 10), (11, 20)] == ranges
+
+
+def test_invalid_chunk_size(client):
+    with pytest.raises(autorabit.RabitError):
+        list(client.cijobs.iter_history(projectName='job', build_from=1, build_to=10, chunk_size=0))
@@ -0,0 +1,73 @@
+"""
+JSONStream: incremental decoding of the array of a response body, whatever the chunks it is split into
+"""
+import json
+
+import pytest
+
+import autorabit
+
+BODY = {
+    'status': 'Success ] , { "ciJobHistoryList": [',
+    'ciJobHistoryList': [
+        {'buildNumber': 1, 'overAllStatus': 'Success', 'comment': 'déploiement ✓ "quoted" [1]'},
+        {'buildNumber': 12345678901234, 'ratio': -1.5e-3, 'tags': [], 'steps': [{'name': '{}'}]},
+        {'buildNumber': 3, 'overAllStatus': None, 'flags': [True, False]},
+    ],
+    'total': 3
+}
+
+
+def _chunks(data, size):
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 7, 64, 4096])
+def test_split_chunks(size):
+    data = json.dumps(BODY, ensure_ascii=False, indent=1).encode()
+    stream = autorabit.JSONStream(_chunks(data, size), 'ciJobHistoryList')
+    assert BODY['ciJobHistoryList'] == list(stream)
+    assert 3 == stream.items
+    # the body after the array is not read
+    end = data.rindex(b']') + 1
+    assert end <= stream.bytes_read < end + size
+
+
+def test_lazy_decoding():
+    elements = [{'buildNumber': number} for number in range(100)]
+    chunks = _chunks(json.dumps({'ciJobHistoryList': elements}).encode(), 10)
+    read = []
+
+    def reading():
+        for chunk in chunks:
+            read.append(chunk)
+            yield chunk
+
+    stream = autorabit.JSONStream(reading(), 'ciJobHistoryList')
+    assert {'buildNumber': 0} == next(stream)
+    assert len(read) < len(chunks) / 10
+    stream.close()
+    assert [] == list(stream)
+
+
+@pytest.mark.parametrize('body', [
+    b'{"status": "Failed"}',
+    b'{"ciJobHistoryList": [{"buildNumber": 1}',
+    b'{"ciJobHistoryList": [{"buildNumber": 1}, {"buildNu',
+    b'["ciJobHistoryList"]',
+])
+def test_malformed(body):
+    with pytest.raises(autorabit.RabitStatusError):
+        list(autorabit.JSONStream(_chunks(body, 5), 'ciJobHistoryList'))
+
+
+def test_empty_array():
+    assert [] == list(autorabit.JSONStream([b'{"ciJobHistoryList": [ ]}'], 'ciJobHistoryList'))
+
+
+def test_history_stream(client):
+    with client.cijobs.history_stream(projectName='job', build_from=1, build_to=40, measure_memory=True) as stream:
+        builds = list(stream)
+    assert client.cijobs.history(projectName='job', build_from=1, build_to=40) == builds
+    assert 40 == stream.items
+    assert stream.peak_memory is not None
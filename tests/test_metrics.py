@@ -0,0 +1,82 @@
+"""
+Metrics: request events, latency summary and the Prometheus output
+"""
+import pytest
+
+import autorabit
+
+
+@pytest.fixture
+def measured(stub):
+    """
+    Client recording its requests in a Metrics registry, retrying quickly; the first request gets a 503
+    """
+    respond = stub.respond
+    calls = []
+
+    def responding(*args):
+        calls.append(args)
+        if 1 == len(calls):
+            return 503, {'status': 'Service Unavailable'}
+        return respond(*args)
+
+    stub.respond = responding
+    metrics = autorabit.Metrics(buckets=[0.5, 5])
+    events = []
+    metrics.add_callback(events.append)
+    with autorabit.RabitClient(endpoint=stub.url, token='stub', metrics=metrics,
+                               retry=autorabit.RetryPolicy(backoff=0.01)) as client:
+        yield client, metrics, events
+
+
+def test_events(measured):
+    client, metrics, events = measured
+    client.cijobs.poll(projectName='job', buildNumber=1)
+    client.cijobs.update(projectName='job', revision='0123456789abcdef')
+    with pytest.raises(autorabit.RabitError):
+        client.cijobs.poll()
+    assert ['poll', 'update'] == [event.service for event in events]
+    poll, update = events
+    assert (200, 1, None) == (poll.status, poll.retries, poll.error)
+    assert 'GET' == poll.method and 0 == poll.request_bytes and 0 < poll.response_bytes
+    assert (200, 0, 'POST') == (update.status, update.retries, update.method)
+    assert 0 < update.request_bytes
+
+
+def test_failed_request_recorded(measured, stub):
+    client, metrics, events = measured
+    stub.respond = lambda *args: (404, {'status': 'Not Found'})
+    with pytest.raises(autorabit.RabitError):
+        client.cijobs.poll(projectName='job', buildNumber=1)
+    assert 404 == events[-1].status
+    assert events[-1].error is not None
+    error = f'autorabit_request_errors_total{{service="poll",error="{events[-1].error}"}} 1'
+    assert error in metrics.prometheus().splitlines()
+
+
+def test_summary(measured):
+    client, metrics, events = measured
+    for build in range(1, 5):
+        client.cijobs.poll(projectName='job', buildNumber=build)
+    summary = metrics.summary()
+    assert ['poll'] == list(summary)
+    assert 4 == summary['poll']['requests']
+    assert 0.5 == summary['poll']['p50'] == summary['poll']['p99']
+    assert 0 < summary['poll']['mean'] < 0.5
+    metrics.reset()
+    assert {} == metrics.summary()
+    assert metrics.percentile('poll', 0.5) is None
+
+
+def test_prometheus(measured):
+    client, metrics, events = measured
+    client.cijobs.poll(projectName='job', buildNumber=1)
+    client.cijobs.poll(projectName='job', buildNumber=2)
+    lines = metrics.prometheus().splitlines()
+    assert '# TYPE autorabit_request_duration_seconds histogram' in lines
+    assert 'autorabit_request_duration_seconds_bucket{service="poll",le="0.5"} 2' in lines
+    assert 'autorabit_request_duration_seconds_bucket{service="poll",le="+Inf"} 2' in lines
+    assert 'autorabit_request_duration_seconds_count{service="poll"} 2' in lines
+    assert 'autorabit_requests_total{service="poll",status="200"} 2' in lines
+    assert 'autorabit_request_retries_total{service="poll"} 1' in lines
+    assert '# TYPE autorabit_response_bytes_total counter' in lines
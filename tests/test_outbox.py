@@ -0,0 +1,84 @@
+"""
+Outbox: recovery after a restart and processes sharing one outbox file
+"""
+import sqlite3
+import time
+
+import autorabit
+
+
+def _interrupt(path, instance, project, lease):
+    """
+    Store an operation left in state 'sending' by another process, with its lease ending in lease seconds
+    """
+    with sqlite3.connect(path) as db:
+        return db.execute(
+            'INSERT INTO outbox (instance, project, service, arguments, state, created, owner, lease)'
+            ' VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (instance, project, 'trigger', '{"projectName":"%s"}' % project, 'sending', time.time(),
+             'stopped', time.time() + lease)).lastrowid
+
+
+def test_restart_recovery(client, tmp_path):
+    path = str(tmp_path / 'outbox.db')
+    autorabit.Outbox(path, client.cijobs, rate=None).close()
+    interrupted = _interrupt(path, client.cijobs._endpoint, 'job', lease=-1)
+    with sqlite3.connect(path) as db:
+        waiting = db.execute(
+            'INSERT INTO outbox (instance, project, service, arguments, state, created) VALUES (?, ?, ?, ?, ?, ?)',
+            (client.cijobs._endpoint, 'job', 'trigger', '{"projectName":"job"}', 'pending', time.time())).lastrowid
+    with autorabit.Outbox(path, client.cijobs, rate=None) as outbox:
+        assert outbox.wait(timeout=5)
+        assert 'failed' == outbox.handle(interrupted).state
+        assert outbox.handle(interrupted).error.startswith('Interrupted')
+        assert 'sent' == outbox.handle(waiting).state
+        assert 'Inprogress' == outbox.handle(waiting).response['status']
+
+
+def test_live_lease_is_not_recovered(client, tmp_path):
+    path = str(tmp_path / 'outbox.db')
+    autorabit.Outbox(path, client.cijobs, rate=None).close()
+    claimed = _interrupt(path, client.cijobs._endpoint, 'job', lease=60)
+    with autorabit.Outbox(path, client.cijobs, rate=None) as outbox:
+        blocked = outbox.submit('trigger', projectName='job', title='blocked')
+        other = outbox.submit('trigger', projectName='other')
+        assert 'Inprogress' == other.result(timeout=5)['status']
+        time.sleep(0.2)
+        # the other process still sends the operation, the next one of its CI Job waits for it
+        assert 'sending' == outbox.handle(claimed).state
+        assert 'pending' == blocked.state
+
+
+def test_expired_lease_unblocks_job(client, tmp_path):
+    path = str(tmp_path / 'outbox.db')
+    autorabit.Outbox(path, client.cijobs, rate=None).close()
+    claimed = _interrupt(path, client.cijobs._endpoint, 'job', lease=0.3)
+    with autorabit.Outbox(path, client.cijobs, rate=None, lease=0.3) as outbox:
+        waiting = outbox.submit('trigger', projectName='job', title='next')
+        assert 'Inprogress' == waiting.result(timeout=5)['status']
+        assert 'failed' == outbox.handle(claimed).state
+
+
+def test_shared_file_sends_once(client, stub, tmp_path):
+    path = str(tmp_path / 'outbox.db')
+    with autorabit.Outbox(path, client.cijobs, rate=None, lease=0.3) as first, \
+            autorabit.Outbox(path, client.cijobs, rate=None, lease=0.3) as second:
+        handles = [(first if i % 2 else second).submit('trigger', projectName=f'job{i % 4}', title=str(i))
+                   for i in range(20)]
+        assert first.wait(timeout=10) and second.wait(timeout=10)
+        assert all('sent' == handle.state for handle in handles)
+    assert 20 == stub.requests
+
+
+def test_pending_sent_on_reopen(client, stub, tmp_path):
+    path = str(tmp_path / 'outbox.db')
+    outbox = autorabit.Outbox(path, client.cijobs, rate=2)
+    handles = [outbox.submit('trigger', projectName=f'job{i}') for i in range(3)]
+    handles[0].result(timeout=5)
+    outbox.close()
+    # the rate limit let the first operation through only, the others were not claimed
+    assert 1 == stub.requests
+    with autorabit.Outbox(path, client.cijobs, rate=None) as outbox:
+        assert outbox.wait(timeout=5)
+        assert all('sent' == outbox.handle(handle.id).state for handle in handles)
+    assert 3 == stub.requests
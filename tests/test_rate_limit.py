@@ -0,0 +1,128 @@
+"""
+RateLimit: token bucket rate, requests in flight and the order of admission
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import autorabit
+
+
+def _peak_in_flight(stub):
+    """
+    Record the peak number of requests served by the stub at once
+    """
+    respond = stub.respond
+    lock = threading.Lock()
+    active = [0, 0]
+
+    def counting(*args):
+        with lock:
+            active[0] += 1
+            active[1] = max(active)
+        try:
+            return respond(*args)
+        finally:
+            with lock:
+                active[0] -= 1
+
+    stub.respond = counting
+    return active
+
+
+def test_rate():
+    limit = autorabit.RateLimit(rate=50, burst=5)
+    started = time.monotonic()
+    for _ in range(15):
+        limit.acquire()
+    # 5 tokens at once, then 10 more at 50 per second
+    assert 0.18 < time.monotonic() - started < 0.4
+
+
+def test_rate_of_requests(stub):
+    limiter = autorabit.RateLimiter(reads=autorabit.RateLimit(rate=50, burst=1))
+    with autorabit.RabitClient(endpoint=stub.url, token='stub', rate_limit=limiter) as client:
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda number: client.cijobs.poll(projectName='job', buildNumber=number), range(11)))
+        assert time.monotonic() - started > 0.18
+
+
+def test_max_in_flight(stub):
+    stub.latency = 0.05
+    active = _peak_in_flight(stub)
+    limiter = autorabit.RateLimiter(reads=autorabit.RateLimit(max_in_flight=3))
+    with autorabit.RabitClient(endpoint=stub.url, token='stub', rate_limit=limiter) as client:
+        with ThreadPoolExecutor(max_workers=12) as executor:
+            list(executor.map(lambda number: client.cijobs.poll(projectName='job', buildNumber=number), range(24)))
+    assert 3 == active[1]
+    assert 0 == limiter.reads._in_flight
+
+
+def test_async_max_in_flight(stub):
+    stub.latency = 0.05
+    active = _peak_in_flight(stub)
+    limiter = autorabit.RateLimiter(reads=autorabit.RateLimit(max_in_flight=3))
+
+    async def run():
+        async with autorabit.RabitClient(endpoint=stub.url, token='stub', rate_limit=limiter) as client:
+            cijobs = client.async_cijobs()
+            await asyncio.gather(*(cijobs.poll(projectName='job', buildNumber=number) for number in range(24)))
+
+    asyncio.run(run())
+    assert 3 == active[1]
+
+
+def test_slots_are_handed_over_in_order():
+    limit = autorabit.RateLimit(max_in_flight=1)
+    limit.acquire()
+    admitted = []
+    threads = []
+    for number in range(5):
+        thread = threading.Thread(target=lambda number=number: (limit.acquire(), admitted.append(number)))
+        thread.start()
+        threads.append(thread)
+        # let the thread queue up before the next one
+        time.sleep(0.02)
+    for _ in range(5):
+        limit.release()
+        time.sleep(0.02)
+    for thread in threads:
+        thread.join()
+    assert [0, 1, 2, 3, 4] == admitted
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    limit = autorabit.RateLimit(max_in_flight=1)
+
+    async def run():
+        await limit.acquire_async()
+        cancelled = asyncio.ensure_future(limit.acquire_async())
+        waiting = asyncio.ensure_future(limit.acquire_async())
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        limit.release()
+        await asyncio.wait_for(waiting, 1)
+        assert cancelled.cancelled()
+        limit.release()
+
+    asyncio.run(run())
+    assert 0 == limit._in_flight
+
+
+def test_cancelled_waiter_gives_its_token_back():
+    limit = autorabit.RateLimit(rate=10, burst=1)
+
+    async def run():
+        await limit.acquire_async()
+        waiting = asyncio.ensure_future(limit.acquire_async())
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        await asyncio.sleep(0.1)
+        started = time.monotonic()
+        await limit.acquire_async()
+        return time.monotonic() - started
+
+    # without the refund, the next token would be 0.2 s after the first one
+    assert asyncio.run(run()) < 0.05
@@ -0,0 +1,85 @@
+"""
+RecordingTransport and ReplayTransport: responses recorded to a cassette are served back offline
+"""
+import time
+
+import pytest
+
+import autorabit
+from benchmark import StubServer
+
+
+def _scripted(stub):
+    """
+    Answer the first poll as still in progress, and the polls of build 99 with 404
+    """
+    respond = stub.respond
+    polls = []
+
+    def responding(method, path, query, body):
+        if path.endswith('/pollstatus/job/99'):
+            return 404, {'status': 'Not Found'}
+        status, payload = respond(method, path, query, body)
+        if '/pollstatus/' in path:
+            polls.append(path)
+            if 1 == len(polls):
+                payload['status'] = autorabit.STATUS_INPROGRESS
+        return status, payload
+
+    stub.respond = responding
+
+
+def _calls(client):
+    return [
+        client.cijobs.poll(projectName='job', buildNumber=3)['status'],
+        client.cijobs.poll(projectName='job', buildNumber=3)['status'],
+        client.cijobs.history(projectName='job', build_from=1, build_to=5),
+        client.cijobs.update(projectName='job', revision='0123456789abcdef'),
+    ]
+
+
+@pytest.mark.parametrize('name', ['cassette.jsonl', 'cassette.jsonl.gz'])
+def test_round_trip(tmp_path, name):
+    path = str(tmp_path / name)
+    with StubServer() as stub:
+        _scripted(stub)
+        with autorabit.RabitClient(endpoint=stub.url, token='secret',
+                                   transport=autorabit.RecordingTransport(path)) as client:
+            recorded = _calls(client)
+            with pytest.raises(autorabit.RabitError):
+                client.cijobs.poll(projectName='job', buildNumber=99)
+    assert [autorabit.STATUS_INPROGRESS, 'Success'] == recorded[:2]
+    # the stub is gone, the replay needs no network and runs against any endpoint
+    replay = autorabit.ReplayTransport(path, speed=0)
+    with autorabit.RabitClient(endpoint='http://replay.invalid', token='replay', transport=replay) as client:
+        assert recorded == _calls(client)
+        # the last response recorded for a request is repeated
+        assert 'Success' == client.cijobs.poll(projectName='job', buildNumber=3)['status']
+        with pytest.raises(autorabit.RabitError):
+            client.cijobs.poll(projectName='job', buildNumber=99)
+        # requests which were not recorded fail like an unreachable instance
+        with pytest.raises(autorabit.RabitConnectError):
+            client.cijobs.poll(projectName='job', buildNumber=4)
+    assert 5 == len(replay.interactions)
+    assert all('secret' not in str(interaction) for interaction in replay.interactions)
+
+
+def test_replay_speed(tmp_path):
+    path = str(tmp_path / 'cassette.jsonl')
+    with StubServer(latency=0.2) as stub:
+        with autorabit.RabitClient(endpoint=stub.url, token='stub',
+                                   transport=autorabit.RecordingTransport(path)) as client:
+            client.cijobs.poll(projectName='job', buildNumber=3)
+    for speed, low, high in [(1, 0.19, 0.4), (4, 0.04, 0.15), (0, 0, 0.04)]:
+        with autorabit.RabitClient(endpoint=stub.url, token='stub',
+                                   transport=autorabit.ReplayTransport(path, speed=speed)) as client:
+            started = time.monotonic()
+            client.cijobs.poll(projectName='job', buildNumber=3)
+            assert low <= time.monotonic() - started < high
+
+
+def test_not_a_cassette(tmp_path):
+    path = tmp_path / 'history.jsonl'
+    path.write_text('{"buildNumber": 1}\n')
+    with pytest.raises(autorabit.RabitError):
+        autorabit.ReplayTransport(str(path))
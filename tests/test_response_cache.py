@@ -0,0 +1,61 @@
+"""
+ResponseCache: expiry, invalidation and coalescing of concurrent identical requests
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import autorabit
+
+
+def test_cached_until_invalidated(client, stub):
+    cache = autorabit.ResponseCache()
+    cijobs = autorabit.CIJobService(client=client, cache=cache)
+    first = cijobs.poll(projectName='job', buildNumber=1)
+    first['status'] = 'modified'
+    assert 'Success' == cijobs.poll(projectName='job', buildNumber=1)['status']
+    assert (1, 1, 1) == (stub.requests, cache.hits, cache.misses)
+    cache.invalidate('job')
+    cijobs.poll(projectName='job', buildNumber=1)
+    assert 2 == stub.requests
+
+
+def test_expired_responses_are_requested_again(client, stub):
+    cijobs = autorabit.CIJobService(client=client, cache=autorabit.ResponseCache(ttl={'history': 0.05}))
+    cijobs.history(projectName='job')
+    time.sleep(0.1)
+    cijobs.history(projectName='job')
+    assert 2 == stub.requests
+
+
+def test_concurrent_requests_are_coalesced(client, stub):
+    stub.latency = 0.2
+    cache = autorabit.ResponseCache()
+    cijobs = autorabit.CIJobService(client=client, cache=cache)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: cijobs.history(projectName='job'), range(8)))
+    assert 1 == stub.requests
+    assert 7 == cache.coalesced
+    assert all(result == results[0] for result in results)
+
+
+def test_cancelled_follower_does_not_cancel_the_others():
+    cache = autorabit.ResponseCache()
+
+    async def call():
+        await asyncio.sleep(0.2)
+        return {'status': 'Success'}
+
+    async def run():
+        key = ('poll', 'job', 'url', None)
+        leader = asyncio.ensure_future(cache.aget_or_call('poll', key, call))
+        await asyncio.sleep(0.01)
+        followers = [asyncio.ensure_future(cache.aget_or_call('poll', key, call)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        followers[0].cancel()
+        return await asyncio.gather(leader, *followers, return_exceptions=True)
+
+    leader, cancelled, *others = asyncio.run(run())
+    assert isinstance(cancelled, asyncio.CancelledError)
+    assert [{'status': 'Success'}] * 3 == [leader] + others
+    assert 3 == cache.coalesced
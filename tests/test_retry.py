@@ -0,0 +1,107 @@
+"""
+RetryPolicy: retried failures, write safety, retry budget and circuit breaker transitions
+"""
+import time
+
+import pytest
+import requests
+
+import autorabit
+
+
+def _failing(stub, statuses):
+    """
+    Answer the next requests with the given HTTP statuses, then normally
+    """
+    respond = stub.respond
+    statuses = list(statuses)
+
+    def responding(*args):
+        if statuses:
+            with stub._lock:
+                stub.requests += 1
+            return statuses.pop(0), {'status': 'Error'}
+        return respond(*args)
+
+    stub.respond = responding
+
+
+def _client(stub, **kwargs):
+    policy = autorabit.RetryPolicy(backoff=0.01, **kwargs)
+    return policy, autorabit.RabitClient(endpoint=stub.url, token='stub', retry=policy)
+
+
+def test_retried_until_success(stub):
+    _failing(stub, [503, 502])
+    policy, client = _client(stub)
+    with client:
+        assert 3 == client.cijobs.poll(projectName='job', buildNumber=3)['cyclenum']
+    assert 3 == stub.requests
+    assert 2 == policy.retries
+
+
+def test_attempts_exhausted(stub):
+    _failing(stub, [503] * 10)
+    policy, client = _client(stub, max_attempts=3)
+    with client, pytest.raises(autorabit.RabitError):
+        client.cijobs.poll(projectName='job', buildNumber=3)
+    assert 3 == stub.requests
+
+
+def test_writes_retried_only_when_not_processed(stub):
+    _failing(stub, [503, 502])
+    policy, client = _client(stub)
+    with client:
+        # 503 is retried, the request was rejected; 502 is not, the build may have been triggered
+        with pytest.raises(autorabit.RabitError):
+            client.cijobs.trigger(projectName='job', title='nightly')
+    assert 2 == stub.requests
+    assert 1 == policy.retries
+
+
+def test_budget(stub):
+    _failing(stub, [503] * 10)
+    policy, client = _client(stub, budget=1, budget_ratio=0, breaker_threshold=None)
+    with client:
+        for _ in range(3):
+            with pytest.raises(autorabit.RabitError):
+                client.cijobs.poll(projectName='job', buildNumber=3)
+    # the first request takes the only retry, the others get none
+    assert 4 == stub.requests
+    assert 1 == policy.retries
+
+
+def test_retry_after():
+    policy = autorabit.RetryPolicy(backoff=5, max_backoff=10)
+    response = requests.Response()
+    response.status_code = 503
+    response.headers['Retry-After'] = '0.25'
+    assert 0.25 == policy.delay('poll', 1, response=response)
+    response.headers['Retry-After'] = '60'
+    assert policy.delay('poll', 1, response=response) is None
+
+
+def test_breaker_transitions(stub):
+    _failing(stub, [503] * 4)
+    policy, client = _client(stub, max_attempts=1, breaker_threshold=3, breaker_cooldown=0.2)
+    with client:
+        for _ in range(3):
+            with pytest.raises(autorabit.RabitError):
+                client.cijobs.poll(projectName='job', buildNumber=3)
+        # open: requests fail fast without reaching the instance
+        assert policy.circuit_open
+        with pytest.raises(autorabit.RabitCircuitOpenError):
+            client.cijobs.poll(projectName='job', buildNumber=3)
+        assert 3 == stub.requests
+        time.sleep(0.25)
+        # half-open: the failed trial request opens the breaker again
+        with pytest.raises(autorabit.RabitError):
+            client.cijobs.poll(projectName='job', buildNumber=3)
+        assert policy.circuit_open
+        assert 4 == stub.requests
+        time.sleep(0.25)
+        # the successful trial request closes it
+        assert 3 == client.cijobs.poll(projectName='job', buildNumber=3)['cyclenum']
+        assert not policy.circuit_open
+        assert 3 == client.cijobs.poll(projectName='job', buildNumber=3)['cyclenum']
+    assert 6 == stub.requests
@@ -0,0 +1,65 @@
+"""
+RollbackManifest: loading, editing, comparing and combining rollback package manifests
+"""
+import pytest
+
+import autorabit
+
+
+@pytest.fixture
+def manifest(client):
+    return autorabit.RollbackManifest.from_details(client.cijobs.rollback_details(projectName='job', buildNumber=7))
+
+
+def test_from_details(manifest):
+    # the stub has 20 members of every type: two constructive types, one destructive type before and after
+    assert 80 == len(manifest)
+    assert 'ApexClass0' == manifest.members('constructiveChanges', 'ApexClass')[0]
+    assert ['destructiveChangesPre'] == manifest.sections('ApexTrigger', 'ApexTrigger3')
+    assert manifest.contains('Flow', 'Flow19')
+    assert not manifest.contains('Flow', 'Flow19', 'constructiveChanges')
+    assert '58.0' == manifest.to_json()['destructiveChangesPost']['version']
+
+
+def test_edit(manifest):
+    assert 2 == manifest.add('constructiveChanges', 'ApexClass', ['ApexClass0', 'Extra', 'Other'])
+    assert 'Other' == manifest.members('constructiveChanges', 'ApexClass')[-1]
+    assert 1 == manifest.remove('ApexClass', 'Extra')
+    assert 2 == manifest.move('ApexTrigger', ['ApexTrigger1', 'ApexTrigger2', 'Missing'],
+                              'destructiveChangesPre', 'destructiveChangesPost')
+    assert ['destructiveChangesPost'] == manifest.sections('ApexTrigger', 'ApexTrigger1')
+    assert 20 == manifest.remove('Flow', [f'Flow{index}' for index in range(20)])
+    assert 81 - 20 == len(manifest)
+    packages = manifest.to_json()
+    assert [{'name': 'ApexTrigger', 'members': ['ApexTrigger1', 'ApexTrigger2']}] == \
+        packages['destructiveChangesPost']['types']
+    # the edited manifest is passed as it is to the rollback service
+    assert autorabit.RollbackManifest(**packages) == manifest
+
+
+def test_diff_and_merge(manifest):
+    other = autorabit.RollbackManifest(**manifest.to_json())
+    other.remove('ApexClass', 'ApexClass5')
+    other.add('destructiveChangesPre', 'CustomField', 'Account.Rating__c')
+    added, removed = manifest.diff(other)
+    assert [('ApexClass', 'ApexClass5')] == added.members('constructiveChanges')
+    assert 1 == len(added)
+    assert [('CustomField', 'Account.Rating__c')] == removed.members('destructiveChangesPre')
+    assert 1 == len(removed)
+    assert (manifest & other) == manifest - added
+    merged = manifest.merge(other)
+    assert 81 == len(merged)
+    assert merged == manifest | other
+    assert {'constructiveChanges': {'types': [{'name': 'ApexClass', 'members': ['ApexClass5']}], 'version': '58.0'}} \
+        == added.to_json()
+
+
+def test_invalid():
+    with pytest.raises(autorabit.RabitError):
+        autorabit.RollbackManifest(constructiveChanges=['ApexClass'])
+    with pytest.raises(autorabit.RabitError):
+        autorabit.RollbackManifest(destructiveChangesPre={'types': [{'members': ['x']}]})
+    with pytest.raises(autorabit.RabitError):
+        autorabit.RollbackManifest().add('constructive', 'ApexClass', 'x')
+    single = autorabit.RollbackManifest(constructiveChanges={'types': {'name': 'ApexClass', 'members': 'Only'}})
+    assert ['Only'] == single.members('constructiveChanges', 'ApexClass')
@@ -0,0 +1,72 @@
+"""
+RollbackPipeline: failed watches end the jobs, and the arguments passed on to the rollback service
+"""
+import pytest
+
+import autorabit
+
+
+class FailingWatcher:
+    def watch(self, **kwargs):
+        raise autorabit.RabitError('watcher is down')
+
+    def close(self):
+        pass
+
+
+def rollbacks_in_progress(stub):
+    respond = stub.respond
+
+    def in_progress(method, path, query, body):
+        if 'POST' == method:
+            return 200, {'status': 'Inprogress', 'revertId': 1}
+        return respond(method, path, query, body)
+    stub.respond = in_progress
+
+
+def test_pipeline_finishes_when_watch_raises(client, stub):
+    rollbacks_in_progress(stub)
+    with autorabit.RollbackPipeline(service=client.cijobs, watcher=FailingWatcher()) as pipeline:
+        jobs = pipeline.run([('job', 1), ('other', 2)])
+    assert [job.state for job in jobs] == ['failed', 'failed']
+    assert all('watcher is down' in str(job.error) for job in jobs)
+
+
+def test_pipeline_finishes_when_the_watched_rollback_cannot_be_polled(client, stub):
+    respond = stub.respond
+
+    def failing_polls(method, path, query, body):
+        if 'pollstatus' in path:
+            return 500, {'status': 'Internal Server Error'}
+        if 'POST' == method:
+            return 200, {'status': 'Inprogress', 'revertId': 1}
+        return respond(method, path, query, body)
+    stub.respond = failing_polls
+    watcher = autorabit.BuildWatcher(service=client.cijobs, min_interval=0.01, max_errors=1, history_size=0)
+    with autorabit.RollbackPipeline(service=client.cijobs, watcher=watcher) as pipeline:
+        jobs = pipeline.run([('job', 1)])
+        assert pipeline.wait(timeout=5)
+    watcher.close()
+    assert 'failed' == jobs[0].state
+    assert isinstance(jobs[0].error, autorabit.RabitStatusError)
+
+
+@pytest.mark.parametrize('argument', ['validateDeployment', 'constructiveChanges', 'buildNumber'])
+def test_pipeline_rejects_arguments_it_sets(client, argument):
+    with pytest.raises(autorabit.RabitError, match=argument):
+        autorabit.RollbackPipeline(service=client.cijobs, **{argument: True})
+
+
+def test_pipeline_passes_other_arguments_to_rollback(client, stub):
+    bodies = []
+    respond = stub.respond
+
+    def recording(method, path, query, body):
+        if 'POST' == method:
+            bodies.append(body)
+        return respond(method, path, query, body)
+    stub.respond = recording
+    with autorabit.RollbackPipeline(service=client.cijobs, validate=False, testLevel='RunLocalTests') as pipeline:
+        pipeline.run([('job', 1)])
+    assert 'RunLocalTests' == bodies[0]['testLevel']
+    assert bodies[0]['validateDeployment'] is False
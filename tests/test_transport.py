@@ -0,0 +1,52 @@
+"""
+HTTPTransport: keep-alive connections shared by the threads of a client
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import autorabit
+
+
+def _count_connections(stub):
+    """
+    Count the connections accepted by the stub
+    """
+    process_request = stub._server.process_request
+    lock = threading.Lock()
+    connections = [0]
+
+    def counting(request, client_address):
+        with lock:
+            connections[0] += 1
+        return process_request(request, client_address)
+
+    stub._server.process_request = counting
+    return connections
+
+
+def test_connection_reused(stub, client):
+    connections = _count_connections(stub)
+    for build in range(1, 21):
+        client.cijobs.poll(projectName='job', buildNumber=build)
+    assert 20 == stub.requests
+    assert 1 == connections[0]
+
+
+def test_pool_shared_by_threads(stub):
+    connections = _count_connections(stub)
+    with autorabit.RabitClient(endpoint=stub.url, token='stub', pool_maxsize=4) as client:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            for _ in range(3):
+                list(executor.map(lambda build: client.cijobs.poll(projectName='job', buildNumber=build),
+                                  range(1, 41)))
+    assert 120 == stub.requests
+    # every thread has its own session, but they all take their connections from the same pool
+    assert connections[0] <= 4
+
+
+def test_keep_alive_disabled(stub):
+    connections = _count_connections(stub)
+    with autorabit.RabitClient(endpoint=stub.url, token='stub', keep_alive=False) as client:
+        for build in range(1, 6):
+            client.cijobs.poll(projectName='job', buildNumber=build)
+    assert 5 == connections[0]
@@ -0,0 +1,44 @@
+"""
+update_many: outcome of every job, told by the status of the update response
+"""
+import autorabit
+
+
+def _update_responses(stub, responses):
+    """
+    Answer the baseline revision updates of some CI Jobs with the given bodies
+    """
+    respond = stub.respond
+
+    def responding(method, path, query, body):
+        if path.endswith('/update/baselinerevision') and body['projectName'] in responses:
+            with stub._lock:
+                stub.requests += 1
+            return 200, responses[body['projectName']]
+        return respond(method, path, query, body)
+
+    stub.respond = responding
+
+
+def test_outcomes(client, stub):
+    _update_responses(stub, {
+        'set': {'status': 'Revision is already the baseline'},
+        'broken': {'status': 'Failed', 'message': 'CI Job was already deleted'},
+    })
+    results = client.cijobs.update_many(['written', 'set', 'broken'], revision='0123456789abcdef')
+    assert ['written', 'set', 'broken'] == [result.projectName for result in results]
+    assert ['updated', 'unchanged', 'failed'] == [result.outcome for result in results]
+    assert '0123456789' == results[0].response['baseLineRevision']
+    assert isinstance(results[2].error, autorabit.RabitStatusError)
+    assert not isinstance(results[2].error, autorabit.RabitAlreadySetError)
+
+
+def test_known_baselines_skipped(client, stub):
+    _update_responses(stub, {'set': {'status': 'Revision is already the baseline'}})
+    client.cijobs.update_many(['written', 'set'], revision='0123456789')
+    sent = stub.requests
+    results = client.cijobs.update_many(['written', 'set', 'new'], revision='0123456789')
+    assert ['skipped', 'skipped', 'updated'] == [result.outcome for result in results]
+    assert sent + 1 == stub.requests
+    results = client.cijobs.update_many(['written'], revision='0123456789', force=True)
+    assert ['updated'] == [result.outcome for result in results]